@@ -0,0 +1,224 @@
+"""Times a request to every URL in docmngr/urls.py against generated corpora of several scales.
+
+Each request runs in a transaction that is rolled back, so writes don't change the corpus for the
+next round, and with an empty response cache (see docmngr.cache). The number of queries a
+request makes is recorded along with its timings (extra_info in the saved results).
+
+Needs pytest-benchmark (dev dependency). Corpora are generated with a fixed seed, so results
+saved on one commit can be compared with those of another:
+
+    pytest benchmarks/bench_endpoints.py --benchmark-autosave [--corpus-scales small,medium,large]
+    <change things>
+    pytest benchmarks/bench_endpoints.py --benchmark-autosave --benchmark-compare
+"""
+
+import json
+
+import pytest
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver
+
+
+def _json(data):
+    return {"data": json.dumps(data), "content_type": "application/json"}
+
+
+# Benchmarked requests by name: the URL pattern they're for, and a function making the request
+# (method, path, body) from a Corpus.
+REQUESTS = {
+    "openapi": ("openapi", lambda c: ("GET", "/openapi", {})),
+    "swagger-ui": ("swagger-ui/", lambda c: ("GET", "/swagger-ui/", {})),
+    "get top folders": ("folders/", lambda c: ("GET", "/folders/", {})),
+    "get whole hierarchy": ("folders/", lambda c: ("GET", "/folders/?depth=all", {})),
+    "create folder": (
+        "folders/",
+        lambda c: (
+            "POST",
+            "/folders/",
+            _json({"name": "new", "parent_folder": c.folder}),
+        ),
+    ),
+    "get folder": (
+        "folders/<int:pk>/",
+        lambda c: ("GET", f"/folders/{c.root_folder}/", {}),
+    ),
+    "get folder subtree": (
+        "folders/<int:pk>/",
+        lambda c: ("GET", f"/folders/{c.root_folder}/?depth=all", {}),
+    ),
+    "rename folder": (
+        "folders/<int:pk>/",
+        lambda c: ("PUT", f"/folders/{c.folder}/", _json({"name": "renamed"})),
+    ),
+    "delete folder subtree": (
+        "folders/<int:pk>/",
+        lambda c: ("DELETE", f"/folders/{c.root_folder}/", {}),
+    ),
+    "restore folder": (
+        "folders/<int:pk>/restore/",
+        lambda c: ("POST", f"/folders/{c.deleted_folder}/restore/", {}),
+    ),
+    "get folder documents": (
+        "folders/<int:folder_pk>/documents/",
+        lambda c: ("GET", f"/folders/{c.folder}/documents/", {}),
+    ),
+    "get full folder documents": (
+        "folders/<int:folder_pk>/documents/",
+        lambda c: ("GET", f"/folders/{c.folder}/documents/?full=1", {}),
+    ),
+    "stream folder documents": (
+        "folders/<int:folder_pk>/documents/",
+        lambda c: ("GET", f"/folders/{c.folder}/documents/?stream=1", {}),
+    ),
+    "search documents": (
+        "documents/search/",
+        lambda c: ("GET", "/documents/search/?q=password+reset", {}),
+    ),
+    "create documents in bulk": (
+        "documents/bulk/",
+        lambda c: (
+            "POST",
+            "/documents/bulk/",
+            _json(
+                [
+                    {
+                        "title": f"bulk {i}",
+                        "content": "<p>bulk content</p>" * 20,
+                        "folder": c.folder,
+                        "topics": [c.topic],
+                    }
+                    for i in range(100)
+                ]
+            ),
+        ),
+    ),
+    "add documents to topics in bulk": (
+        "documents/topics/",
+        lambda c: (
+            "POST",
+            "/documents/topics/",
+            _json({"documents": c.documents[:100], "topics": c.topics[:3]}),
+        ),
+    ),
+    "get document": (
+        "documents/<int:pk>/",
+        lambda c: ("GET", f"/documents/{c.document}/", {}),
+    ),
+    "update document": (
+        "documents/<int:pk>/",
+        lambda c: (
+            "PUT",
+            f"/documents/{c.document}/",
+            _json({"content": "<p>Replaced content</p>"}),
+        ),
+    ),
+    "get document revisions": (
+        "documents/<int:document_pk>/revisions/",
+        lambda c: ("GET", f"/documents/{c.document}/revisions/", {}),
+    ),
+    "get document revision": (
+        "documents/<int:document_pk>/revisions/<int:number>/",
+        # The revision before a snapshot, with the most deltas to apply
+        lambda c: ("GET", f"/documents/{c.document}/revisions/10/", {}),
+    ),
+    "restore document revision": (
+        "documents/<int:document_pk>/revisions/<int:number>/restore/",
+        lambda c: ("POST", f"/documents/{c.document}/revisions/1/restore/", {}),
+    ),
+    "create document": (
+        "documents/",
+        lambda c: (
+            "POST",
+            "/documents/",
+            _json({"title": "new", "content": "<p>content</p>", "folder": c.folder}),
+        ),
+    ),
+    "get topic": ("topics/<int:pk>/", lambda c: ("GET", f"/topics/{c.topic}/", {})),
+    "rename topic": (
+        "topics/<int:pk>/",
+        lambda c: ("PUT", f"/topics/{c.topic}/", _json({"name": "renamed"})),
+    ),
+    "get topic documents": (
+        "topics/<int:topic_pk>/documents/",
+        lambda c: ("GET", f"/topics/{c.topic}/documents/", {}),
+    ),
+    "get topics": ("topics/", lambda c: ("GET", "/topics/", {})),
+    "create topic": ("topics/", lambda c: ("POST", "/topics/", _json({"name": "new"}))),
+    "add document to topic": (
+        "documents/<int:document_pk>/topics/<int:topic_pk>/",
+        lambda c: ("POST", f"/documents/{c.document}/topics/{c.topics[-1]}/", {}),
+    ),
+    "get changes": ("changes/", lambda c: ("GET", "/changes/", {})),
+    "get job": ("jobs/<int:pk>/", lambda c: ("GET", f"/jobs/{c.job}/", {})),
+    "get cache stats": ("cache/stats/", lambda c: ("GET", "/cache/stats/", {})),
+    "async get top folders": (
+        "async/folders/",
+        lambda c: ("GET", "/async/folders/", {}),
+    ),
+    "async get folder": (
+        "async/folders/<int:pk>/",
+        lambda c: ("GET", f"/async/folders/{c.root_folder}/", {}),
+    ),
+    "async get folder documents": (
+        "async/folders/<int:folder_pk>/documents/",
+        lambda c: ("GET", f"/async/folders/{c.folder}/documents/", {}),
+    ),
+    "async get document": (
+        "async/documents/<int:pk>/",
+        lambda c: ("GET", f"/async/documents/{c.document}/", {}),
+    ),
+    "async get topic": (
+        "async/topics/<int:pk>/",
+        lambda c: ("GET", f"/async/topics/{c.topic}/", {}),
+    ),
+    "async get topic documents": (
+        "async/topics/<int:topic_pk>/documents/",
+        lambda c: ("GET", f"/async/topics/{c.topic}/documents/", {}),
+    ),
+    "async get topics": ("async/topics/", lambda c: ("GET", "/async/topics/", {})),
+}
+
+
+def _routes(patterns, prefix=""):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _routes(pattern.url_patterns, prefix + str(pattern.pattern))
+        else:
+            yield prefix + str(pattern.pattern)
+
+
+def test_every_url_is_benchmarked():
+    assert set(_routes(get_resolver().url_patterns)) == {
+        route for route, _ in REQUESTS.values()
+    }
+
+
+@pytest.mark.parametrize("name", REQUESTS)
+def test_endpoint(benchmark, django_db_blocker, corpus, name):
+    route, make_request = REQUESTS[name]
+    method, path, body = make_request(corpus)
+    client = Client()
+
+    def request():
+        with transaction.atomic():
+            response = client.generic(method, path, **body)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            transaction.set_rollback(True)
+        return response
+
+    cache = caches[settings.DOCMNGR_CACHE_ALIAS]
+    with django_db_blocker.unblock():
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        assert response.status_code < 400, response.content
+
+        benchmark.group = name
+        benchmark.extra_info["scale"] = corpus.scale
+        benchmark.extra_info["queries"] = len(queries)
+        benchmark.pedantic(request, setup=cache.clear, rounds=20, warmup_rounds=2)
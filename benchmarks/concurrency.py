@@ -0,0 +1,157 @@
+"""Compares the throughput of the sync views under WSGI with the async views under ASGI.
+
+See docmngr.async_views. Starts gunicorn (sync and threaded workers) and uvicorn with the same
+number of worker processes, and has many concurrent clients fetch a document over and over
+from each. Adds a few documents to the development database, and deletes them afterwards.
+
+Every request has a unique `_` query param so the sync views can't serve it from the response
+cache (see docmngr.cache), which the async views don't use. The servers run without rate and
+concurrency limits (see docmngr.throttling), which would turn most of the clients away.
+
+Needs gunicorn, uvicorn and httpx (dev dependencies).
+
+Usage: python benchmarks/concurrency.py [--workers 2] [--concurrency 200] [--duration 10]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "docmngr.settings")
+os.environ["DOCMNGR_THROTTLING"] = "off"
+
+import django  # noqa: E402
+
+django.setup()
+
+import httpx  # noqa: E402
+
+from docmngr.models import Document, Folder, Topic  # noqa: E402
+
+
+def servers(workers, threads, port):
+    """Returns (name, command, URL path prefix) of the servers to compare."""
+    bind = f"127.0.0.1:{port}"
+    return [
+        (
+            "gunicorn sync",
+            ["gunicorn", "-w", str(workers), "-b", bind, "docmngr.wsgi:application"],
+            "",
+        ),
+        (
+            f"gunicorn {threads} threads",
+            ["gunicorn", "-w", str(workers), "--threads", str(threads), "-b", bind]
+            + ["docmngr.wsgi:application"],
+            "",
+        ),
+        (
+            "uvicorn async",
+            ["uvicorn", "--workers", str(workers), "--port", str(port), "--log-level"]
+            + ["warning", "docmngr.asgi:application"],
+            "/async",
+        ),
+    ]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {url} didn't start")
+
+
+async def load(url, concurrency, duration):
+    """Fetches url with concurrency clients for duration seconds, returns the latencies."""
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+
+        async def client_loop(index):
+            nonlocal errors
+            n = 0
+            while time.monotonic() < deadline:
+                n += 1
+                start = time.monotonic()
+                try:
+                    response = await client.get(url, params={"_": f"{index}-{n}"})
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.monotonic() - start)
+
+        await asyncio.gather(*(client_loop(index) for index in range(concurrency)))
+
+    if errors:
+        print(f"  {errors} errors")
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=int, default=10)
+    args = parser.parse_args()
+
+    folder = Folder.objects.create(name=f"benchmark {time.time_ns()}")
+    topic = Topic.objects.create(name=f"benchmark {time.time_ns()}")
+    document = Document.objects.create(
+        title="benchmark", content="lorem ipsum " * 500, folder=folder
+    )
+    document.topics.add(topic)
+
+    print(
+        f"{args.workers} worker processes, {args.concurrency} concurrent clients, "
+        f"{args.duration}s each\n"
+    )
+    print(f"{'server':<22}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+
+    try:
+        port = free_port()
+        for name, command, prefix in servers(args.workers, args.threads, port):
+            url = f"http://127.0.0.1:{port}{prefix}/documents/{document.id}/"
+            server = subprocess.Popen(command, cwd=ROOT)
+            try:
+                wait_until_up(url)
+                latencies = asyncio.run(load(url, args.concurrency, args.duration))
+            finally:
+                server.terminate()
+                server.wait()
+
+            latencies.sort()
+            print(
+                f"{name:<22}{len(latencies) / args.duration:>10.0f}"
+                f"{statistics.median(latencies) * 1000:>10.1f}"
+                f"{latencies[int(len(latencies) * 0.99)] * 1000:>10.1f}"
+            )
+    finally:
+        document.delete()
+        topic.delete()
+        folder.delete()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Fixtures for the endpoint benchmarks, see bench_endpoints.py."""
+
+from dataclasses import dataclass
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from docmngr import jobs
+from docmngr.models import Document, Folder, Job, Topic
+
+# Options of the generate_corpus command for each scale.
+SCALES = {
+    "small": {"folders": 50, "documents": 200, "topics": 10},
+    "medium": {"folders": 500, "documents": 2000, "topics": 30},
+    "large": {"folders": 5000, "documents": 20000, "topics": 100},
+}
+
+# How many times the benchmarked document is edited, so it has deltas to apply.
+REVISIONS = 12
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--corpus-scales",
+        default="small,medium",
+        help=f"Comma separated scales of the corpus to benchmark with, of {', '.join(SCALES)}",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "corpus" in metafunc.fixturenames:
+        scales = metafunc.config.getoption("corpus_scales").split(",")
+        metafunc.parametrize("corpus", scales, indirect=True, scope="session")
+
+
+@dataclass
+class Corpus:
+    """Ids of typical objects of a generated corpus, to make requests about."""
+
+    scale: str
+    # The top folder with the biggest subtree
+    root_folder: int
+    # A folder with many documents
+    folder: int
+    # A deleted folder (its subtree too)
+    deleted_folder: int
+    # A document of median size, with REVISIONS + 1 revisions
+    document: int
+    # The topic with the most documents
+    topic: int
+    topics: list
+    documents: list
+    # A queued background job
+    job: int
+
+
+@pytest.fixture(scope="session")
+def corpus(request, django_db_setup, django_db_blocker):
+    """Generates a corpus of the requested scale, with the same seed every time."""
+    with django_db_blocker.unblock():
+        Folder.objects.all().delete()
+        Topic.objects.all().delete()
+        call_command(
+            "generate_corpus", **SCALES[request.param], seed=0, stdout=StringIO()
+        )
+
+        folders = Folder.objects.filter(parent_folder=None).order_by("id")
+        root_folder = max(
+            folders, key=lambda folder: folder.descendants(include_self=True).count()
+        )
+        deleted_folder = (
+            Folder.objects.exclude(pk=root_folder.id)
+            .filter(children=None)
+            .order_by("id")
+            .first()
+        )
+        deleted_folder.set_subtree_deleted(True)
+
+        folder = Folder.without_deleted().order_by("-documents_count", "id").first()
+        topic = Topic.objects.order_by("-documents_count", "id").first()
+
+        documents = Document.without_deleted().order_by("content_length", "id")
+        document = documents[documents.count() // 2]
+        content = document.content
+        for i in range(REVISIONS):
+            document.content = content.replace("</p>", f" edit {i}</p>", i + 1)
+            document.save()
+
+        yield Corpus(
+            scale=request.param,
+            root_folder=root_folder.id,
+            folder=folder.id,
+            deleted_folder=deleted_folder.id,
+            document=document.id,
+            topic=topic.id,
+            topics=list(Topic.objects.order_by("id").values_list("id", flat=True)),
+            documents=list(documents.order_by("id").values_list("id", flat=True)),
+            job=jobs.enqueue("recount_documents").id,
+        )
+
+        Folder.objects.all().delete()
+        Topic.objects.all().delete()
+        Job.objects.all().delete()
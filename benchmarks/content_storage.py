@@ -0,0 +1,178 @@
+"""Compares storing document content compressed in its own table with storing it inline.
+
+See Document.content. Creates documents of generated, near-duplicate rich text (like real
+documents written from the same templates) and copies them into two temporary tables: one like
+the document table is now and one like it used to be, content column included, so both are
+free of dead rows (Document.save_contents updates every row it inserts, and earlier runs leave
+rolled back rows behind). Compares their size on disk (without indexes) and the latency of
+typical queries. Runs inside a transaction on the development database and rolls it back
+afterwards.
+
+Usage: python benchmarks/content_storage.py [--size 2000] [--paragraphs 40] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "docmngr.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+
+from docmngr.models import Document, DocumentContent, Folder  # noqa: E402
+
+PARAGRAPHS = [
+    "<p>To request access to <b>{system}</b>, open a ticket with the help desk and "
+    "select the <i>{system} access</i> category.</p>",
+    "<p>Your manager approves the request, after which access is granted within "
+    "{days} business days.</p>",
+    '<ul><li>Log in at <a href="https://{system}.example.com">{system}</a></li>'
+    "<li>Go to settings</li><li>Enable two factor authentication</li></ul>",
+    "<p>If {system} shows an error, clear your browser cache and try again before "
+    "contacting support.</p>",
+]
+SYSTEMS = ["payroll", "crm", "wiki", "billing", "inventory", "analytics"]
+
+
+def generate_content(paragraphs):
+    return "".join(
+        random.choice(PARAGRAPHS).format(
+            system=random.choice(SYSTEMS), days=random.randint(1, 5)
+        )
+        for _ in range(paragraphs)
+    )
+
+
+def create_corpus(size, paragraphs):
+    folder = Folder.objects.create(name="benchmark")
+    contents = [generate_content(paragraphs) for _ in range(size)]
+    documents = Document.objects.bulk_create(
+        Document(title=f"document {i}", content=content, folder=folder)
+        for i, content in enumerate(contents)
+    )
+
+    ids = [document.id for document in documents]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TEMPORARY TABLE split_document AS
+            SELECT * FROM docmngr_document WHERE id = ANY(%s);
+            CREATE TEMPORARY TABLE split_content AS
+            SELECT * FROM docmngr_documentcontent WHERE document_id = ANY(%s);
+            CREATE TEMPORARY TABLE inline_document AS
+            SELECT d.*, c.content
+            FROM docmngr_document d
+            JOIN unnest(%s::bigint[], %s::text[]) AS c(id, content) ON c.id = d.id;
+            ALTER TABLE split_document ADD PRIMARY KEY (id);
+            ALTER TABLE split_content ADD PRIMARY KEY (document_id);
+            ALTER TABLE inline_document ADD PRIMARY KEY (id);
+            ANALYZE split_document, split_content, inline_document;
+            """,
+            [ids, ids, ids, contents],
+        )
+
+    return folder, documents
+
+
+def query(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def table_size(table):
+    """Returns the size of the table and its TOAST table, without indexes."""
+    return query("SELECT pg_table_size(%s)", [table])[0][0]
+
+
+def best_of(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--paragraphs", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with transaction.atomic():
+        folder, documents = create_corpus(args.size, args.paragraphs)
+        ids = [document.id for document in documents]
+        contents = [document.content for document in documents]
+        raw_size = sum(len(content.encode()) for content in contents)
+
+        print(f"{args.size} documents, {raw_size / args.size / 1024:.1f} KiB each\n")
+
+        content = table_size("split_content")
+        metadata = table_size("split_document")
+        inline = table_size("inline_document")
+        print(f"{'size on disk (KiB)':<34}{'split':>12}{'inline':>12}")
+        for name, split_size, inline_size in [
+            ("document table", metadata, inline),
+            ("content table", content, 0),
+            ("total", metadata + content, inline),
+        ]:
+            print(f"{name:<34}{split_size / 1024:>12.0f}{inline_size / 1024:>12.0f}")
+        print()
+
+        timings = [
+            (
+                "list folder (no content)",
+                lambda: query(
+                    "SELECT id, title, excerpt FROM split_document WHERE folder_id = %s",
+                    [folder.id],
+                ),
+                lambda: query(
+                    "SELECT id, title, excerpt FROM inline_document WHERE folder_id = %s",
+                    [folder.id],
+                ),
+            ),
+            (
+                "scan titles",
+                lambda: query(
+                    "SELECT count(*) FROM split_document WHERE title LIKE '%%99%%'"
+                ),
+                lambda: query(
+                    "SELECT count(*) FROM inline_document WHERE title LIKE '%%99%%'"
+                ),
+            ),
+            (
+                "get 100 documents",
+                lambda: [
+                    DocumentContent.decompress(
+                        query(
+                            "SELECT data FROM split_document d "
+                            "JOIN split_content c ON c.document_id = d.id "
+                            "WHERE d.id = %s",
+                            [pk],
+                        )[0][0]
+                    )
+                    for pk in ids[:100]
+                ],
+                lambda: [
+                    query("SELECT content FROM inline_document WHERE id = %s", [pk])
+                    for pk in ids[:100]
+                ],
+            ),
+        ]
+
+        print(f"{'latency (ms)':<34}{'split':>12}{'inline':>12}")
+        for name, split_query, inline_query in timings:
+            split = best_of(split_query, args.repeat)
+            inline = best_of(inline_query, args.repeat)
+            print(f"{name:<34}{split * 1000:>12.1f}{inline * 1000:>12.1f}")
+
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
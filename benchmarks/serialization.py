@@ -0,0 +1,130 @@
+"""Compares serializing big document and folder listings with DRF serializers vs the fast path.
+
+See docmngr.fast_serializers and docmngr.renderers. Creates the data it needs inside a transaction
+on the development database and rolls it back afterwards.
+
+Usage: python benchmarks/serialization.py [--size 5000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "docmngr.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import transaction  # noqa: E402
+from django.db.models import Prefetch  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from docmngr.fast_serializers import (  # noqa: E402
+    document_values,
+    serialize_document_rows,
+    serialize_rows,
+    value_fields,
+)
+from docmngr.models import (  # noqa: E402
+    Document,
+    DocumentSerializer,
+    DocumentSummarySerializer,
+    Folder,
+    FolderSerializer,
+    Topic,
+)
+from docmngr.renderers import ORJSONRenderer, orjson  # noqa: E402
+
+
+def create_corpus(size):
+    folder = Folder.objects.create(name="benchmark")
+    Folder.objects.bulk_create(
+        Folder(name=f"folder {i}", parent_folder=folder) for i in range(size)
+    )
+    topics = Topic.objects.bulk_create(Topic(name=f"topic {i}") for i in range(3))
+    documents = Document.objects.bulk_create(
+        Document(title=f"document {i}", content="lorem ipsum " * 50, folder=folder)
+        for i in range(size)
+    )
+    Membership = Topic.documents.through
+    Membership.objects.bulk_create(
+        Membership(document=document, topic=topic)
+        for document in documents
+        for topic in topics
+    )
+    return folder
+
+
+def listings(folder):
+    """Returns (name, serializer path, fast path) of the listings to compare."""
+    documents = Document.objects.filter(folder=folder).order_by("created_at", "id")
+    folders = Folder.objects.filter(parent_folder=folder)
+    topics = Prefetch("topics", queryset=Topic.objects.order_by("id"))
+
+    def documents_listing(serializer_class):
+        return (
+            lambda: serializer_class(
+                documents.prefetch_related(topics), many=True
+            ).data,
+            lambda: serialize_document_rows(
+                document_values(documents, serializer_class), serializer_class
+            ),
+        )
+
+    return [
+        ("document summaries", *documents_listing(DocumentSummarySerializer)),
+        ("full documents", *documents_listing(DocumentSerializer)),
+        (
+            "folders",
+            lambda: FolderSerializer(folders, many=True).data,
+            lambda: serialize_rows(
+                folders.values(*value_fields(FolderSerializer)), FolderSerializer
+            ),
+        ),
+    ]
+
+
+def best_of(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    renderers = [("json", JSONRenderer())]
+    if orjson is not None:
+        renderers.append(("orjson", ORJSONRenderer()))
+
+    print(f"{args.size} objects, best of {args.repeat}, fetching included\n")
+    print(f"{'listing':<20}{'path':<28}{'seconds':>10}{'speedup':>10}")
+
+    with transaction.atomic():
+        folder = create_corpus(args.size)
+
+        for name, serializer_path, fast_path in listings(folder):
+            expected = JSONRenderer().render(serializer_path())
+            assert JSONRenderer().render(fast_path()) == expected, name
+
+            baseline = best_of(
+                lambda: JSONRenderer().render(serializer_path()), args.repeat
+            )
+            print(f"{name:<20}{'serializer + json':<28}{baseline:>10.3f}{1:>9.1f}x")
+            for renderer_name, renderer in renderers:
+                seconds = best_of(lambda: renderer.render(fast_path()), args.repeat)
+                path = f"fast path + {renderer_name}"
+                print(
+                    f"{name:<20}{path:<28}{seconds:>10.3f}{baseline / seconds:>9.1f}x"
+                )
+
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
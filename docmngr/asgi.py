@@ -11,6 +11,16 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'docmngr.settings')
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "docmngr.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from docmngr import push  # noqa: E402 (needs the settings configured)
+
+
+async def application(scope, receive, send):
+    # Live change events are streamed outside of Django, see docmngr.push.
+    if scope["type"] == "http" and scope["path"] == "/events/":
+        return await push.event_stream(scope, receive, send)
+
+    return await django_application(scope, receive, send)
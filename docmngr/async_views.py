@@ -0,0 +1,204 @@
+"""Async versions of the read endpoints, mounted under /async/ (e.g. /async/folders/).
+
+Rationale: The sync views tie up a worker (process or thread) for as long as a request waits on
+the database, so serving more concurrent requests means running more of them. Served by an ASGI
+server (see the README), these use Django's async ORM instead and one process can keep many
+requests in flight.
+
+Responses are the same as the corresponding views in docmngr.views, byte for byte. They don't
+go through the response cache or send ETags though, see docmngr.cache and docmngr.conditional.
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import Http404, HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, MethodNotAllowed, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from docmngr.fast_serializers import (
+    document_values,
+    aserialize_document_rows,
+    serialize_rows,
+    value_fields,
+)
+from docmngr.models import (
+    Document,
+    DocumentSerializer,
+    DocumentSummarySerializer,
+    Folder,
+    FolderSerializer,
+    Topic,
+    TopicSerializer,
+)
+from docmngr.pagination import KeysetPagination
+from docmngr.timing import measure
+from docmngr.views import nest_folders, parse_depth
+
+
+def async_api_view(view_func):
+    """Decorator making an async GET view behave like an @api_view(["GET"]) one.
+
+    The view gets a DRF Request (for query_params etc.) and API exceptions are turned into the
+    same error responses DRF would give.
+    """
+
+    @wraps(view_func)
+    async def inner(request, *args, **kwargs):
+        try:
+            if request.method not in ("GET", "HEAD"):
+                raise MethodNotAllowed(request.method)
+            return await view_func(Request(request), *args, **kwargs)
+        except Http404:
+            return render(
+                {"detail": NotFound.default_detail}, status.HTTP_404_NOT_FOUND
+            )
+        except APIException as exc:
+            return render({"detail": exc.detail}, exc.status_code)
+
+    return inner
+
+
+def render(data, status_code=status.HTTP_200_OK, headers=None):
+    """Renders data like a DRF Response would be with the default JSON renderer."""
+    renderer = next(
+        (
+            renderer_class()
+            for renderer_class in api_settings.DEFAULT_RENDERER_CLASSES
+            if issubclass(renderer_class, JSONRenderer)
+        ),
+        JSONRenderer(),
+    )
+    with measure("render"):
+        content = renderer.render(data)
+    response = HttpResponse(
+        content,
+        content_type=renderer.media_type,
+        status=status_code,
+        headers=headers,
+    )
+    # Same as DRF, empty responses have no content type.
+    if not response.content:
+        del response["Content-Type"]
+    return response
+
+
+@async_api_view
+async def get_folders(request, pk=None):
+    """Same as FoldersView.get."""
+    if "depth" in request.query_params:
+        return await _get_subtree(request, pk)
+
+    if pk:
+        folders = Folder.without_deleted().filter(Q(pk=pk) | Q(parent_folder=pk))
+    else:
+        folders = Folder.without_deleted().filter(parent_folder=None)
+
+    rows = [row async for row in folders.values(*value_fields(FolderSerializer))]
+    if pk is not None and not rows:
+        return render(None, status.HTTP_404_NOT_FOUND)
+
+    return render(serialize_rows(rows, FolderSerializer))
+
+
+async def _get_subtree(request, pk):
+    """Same as FoldersView._get_subtree."""
+    try:
+        max_depth = parse_depth(request.query_params["depth"])
+    except ValueError as error:
+        return render({"depth": [str(error)]}, status.HTTP_400_BAD_REQUEST)
+
+    # The async ORM doesn't do raw SQL.
+    folders = await sync_to_async(Folder.subtree_values)(pk=pk, max_depth=max_depth)
+    roots = nest_folders(serialize_rows(folders, FolderSerializer))
+
+    if pk is None:
+        return render(roots)
+
+    if not roots:
+        return render(None, status.HTTP_404_NOT_FOUND)
+
+    return render(roots[0])
+
+
+@async_api_view
+async def get_document(request, pk):
+    """Same as DocumentsView.get."""
+    try:
+        row = await document_values(
+            Document.without_deleted(), DocumentSerializer
+        ).aget(pk=pk)
+    except Document.DoesNotExist:
+        raise Http404
+
+    return render((await aserialize_document_rows([row], DocumentSerializer))[0])
+
+
+@async_api_view
+async def get_topics(request, pk=None):
+    """Same as TopicsView.get."""
+    if pk is not None:
+        try:
+            row = await Topic.objects.values(*value_fields(TopicSerializer)).aget(pk=pk)
+        except Topic.DoesNotExist:
+            raise Http404
+        return render(serialize_rows([row], TopicSerializer)[0])
+
+    paginator = KeysetPagination()
+    # created_at is needed for the cursor.
+    rows = await paginator.apaginate_queryset(
+        Topic.objects.values("created_at", *value_fields(TopicSerializer)), request
+    )
+    return _render_page(paginator, serialize_rows(rows, TopicSerializer))
+
+
+@async_api_view
+async def get_documents_for_topic(request, topic_pk):
+    """Same as views.get_documents_for_topic, without streaming."""
+    if not await Topic.objects.filter(pk=topic_pk).aexists():
+        raise Http404
+
+    return await _list_documents(
+        request, Document.objects.filter(topics=topic_pk, is_deleted=False)
+    )
+
+
+@async_api_view
+async def get_documents_for_folder(request, folder_pk):
+    """Same as views.get_documents_for_folder, without streaming."""
+    if not await Folder.without_deleted().filter(pk=folder_pk).aexists():
+        raise Http404
+
+    documents = Document.objects.filter(folder=folder_pk, is_deleted=False)
+    topic_id = request.query_params.get("topic")
+    if topic_id is not None:
+        documents = documents.filter(topics__id=topic_id)
+
+    return await _list_documents(request, documents)
+
+
+async def _list_documents(request, documents):
+    """Same as views._list_documents, without streaming."""
+    if request.query_params.get("full") in ("1", "true"):
+        serializer_class = DocumentSerializer
+    else:
+        serializer_class = DocumentSummarySerializer
+
+    paginator = KeysetPagination()
+    rows = await paginator.apaginate_queryset(
+        document_values(documents, serializer_class), request
+    )
+    return _render_page(
+        paginator, await aserialize_document_rows(rows, serializer_class)
+    )
+
+
+def _render_page(paginator, data):
+    """Same as KeysetPagination.get_paginated_response."""
+    next_link = paginator.get_next_link()
+    headers = {"Link": f'<{next_link}>; rel="next"'} if next_link is not None else {}
+    return render(data, headers=headers)
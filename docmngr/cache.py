@@ -0,0 +1,192 @@
+"""Read-through cache of rendered GET responses, invalidated with generation counters.
+
+Every cached response depends on a few named generations, e.g. "document:12" for a document or
+"folder-documents:3" for the documents listing of a folder. The current values of those
+generations are part of the cache key, so bumping a generation on write makes every response
+that depends on it unreachable, without having to know which responses were cached. Stale
+entries are left for the cache backend to evict (LRU/TTL).
+
+Generation names:
+    folder:<pk>               A folder and its direct children ("folder:root" for top folders)
+    subtree:<pk>              Any folder below a folder ("subtree:root" for the whole hierarchy)
+    document:<pk>             A document
+    folder-documents:<pk>     The documents of a folder
+    topic-documents:<pk>      The documents of a topic
+    topics                    Any topic, e.g. a rename shows up in every document response
+    global                    Anything, bumped by writes touching too many objects to track
+                              one by one (subtree deletes, bulk tagging)
+
+Uses the cache alias in the DOCMNGR_CACHE_ALIAS setting, which works with any Django cache
+backend, e.g. local memory in tests and development and Redis in production.
+"""
+
+import time
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from docmngr import replicas
+
+GLOBAL = "global"
+
+_KEY_PREFIX = "docmngr"
+
+
+def cached(get_generations):
+    """Decorator caching the rendered responses of a GET view.
+
+    get_generations is called with the view's arguments and should return the names of the
+    generations the response depends on (see module docstring). Only 200 responses are cached,
+    and not streamed ones.
+    Cached responses still answer conditional requests with 304, see docmngr.conditional.
+
+    Responses carry an `X-Cache: HIT` or `X-Cache: MISS` header.
+
+    Works on function views (below @api_view) and, with method_decorator, on APIView methods.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def inner(request, *args, **kwargs):
+            if request.method != "GET":
+                return view_func(request, *args, **kwargs)
+
+            cache = _get_cache()
+            names = list(get_generations(request, *args, **kwargs)) + [GLOBAL]
+            key = _response_key(request, _get_generations(cache, names))
+
+            entry = cache.get(key)
+            if entry is not None:
+                _count(cache, "hits")
+                content, headers = entry
+                response = get_conditional_response(
+                    request,
+                    etag=headers.get("ETag"),
+                    last_modified=parse_http_date_safe(headers.get("Last-Modified")),
+                )
+                if response is None:
+                    response = HttpResponse(content, headers=headers)
+                response["X-Cache"] = "HIT"
+                return response
+
+            _count(cache, "misses")
+            timeout = settings.DOCMNGR_CACHE_TIMEOUT
+            if replicas.reading_from_replica():
+                # Could be from before the write that bumped the generations, see docmngr.replicas.
+                timeout = min(timeout, settings.DOCMNGR_REPLICA_PIN_SECONDS)
+            response = view_func(request, *args, **kwargs)
+            # Streamed responses are too big to cache, see views._stream_documents.
+            if response.status_code == 200 and not response.streaming:
+                # Cache the final bytes, so hits skip rendering as well as the database.
+                response.add_post_render_callback(
+                    lambda rendered: cache.set(
+                        key,
+                        (rendered.content, dict(rendered.headers)),
+                        timeout,
+                    )
+                )
+            response["X-Cache"] = "MISS"
+            return response
+
+        return inner
+
+    return decorator
+
+
+def invalidate(*names):
+    """Bumps the named generations, making responses depending on them stale.
+
+    Bumps once the current transaction commits, otherwise a concurrent request could cache the
+    old data under the new generation.
+    """
+    names = set(names)
+    if not names:
+        return
+
+    def bump():
+        cache = _get_cache()
+        for name in names:
+            key = _generation_key(name)
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Not in the cache, any new value is as good as a bump. See _get_generations.
+                cache.add(key, time.time_ns(), None)
+
+    transaction.on_commit(bump)
+
+
+def folder_generations(folder):
+    """Names of the generations changed by a change to the folder itself (not its subtree).
+
+    For a move, call this both before and after so both the old and new places are covered.
+    """
+    ancestor_ids = folder.ancestor_ids
+    parent = ancestor_ids[-1] if ancestor_ids else "root"
+
+    return [f"folder:{folder.id}", f"folder:{parent}", "subtree:root"] + [
+        f"subtree:{pk}" for pk in ancestor_ids + [folder.id]
+    ]
+
+
+def get_stats():
+    """Returns the number of cache hits and misses, across all processes sharing the cache."""
+    cache = _get_cache()
+    counts = cache.get_many([_stats_key("hits"), _stats_key("misses")])
+    return {
+        "hits": counts.get(_stats_key("hits"), 0),
+        "misses": counts.get(_stats_key("misses"), 0),
+    }
+
+
+def _get_cache():
+    return caches[settings.DOCMNGR_CACHE_ALIAS]
+
+
+def _get_generations(cache, names):
+    keys = [_generation_key(name) for name in names]
+    generations = cache.get_many(keys)
+
+    for key in keys:
+        if key not in generations:
+            # Start missing generations (new, or evicted) at the current time rather than 0,
+            # so an evicted generation can't come back at a value old responses were cached with.
+            cache.add(key, time.time_ns(), None)
+            generations[key] = cache.get(key)
+
+    return [generations[key] for key in keys]
+
+
+def _response_key(request, generations):
+    # The same URL renders differently depending on the requested format. Responses rendered from
+    # a replica are kept apart, so clients reading their own writes from the primary never get
+    # them (see docmngr.replicas).
+    state = [
+        request.get_full_path(),
+        request.META.get("HTTP_ACCEPT", ""),
+        generations,
+        replicas.reading_from_replica(),
+    ]
+    return f"{_KEY_PREFIX}:response:{md5(repr(state).encode()).hexdigest()}"
+
+
+def _generation_key(name):
+    return f"{_KEY_PREFIX}:generation:{name}"
+
+
+def _stats_key(name):
+    return f"{_KEY_PREFIX}:stats:{name}"
+
+
+def _count(cache, name):
+    try:
+        cache.incr(_stats_key(name))
+    except ValueError:
+        if not cache.add(_stats_key(name), 1, None):
+            cache.incr(_stats_key(name))
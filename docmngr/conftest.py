@@ -1,10 +1,17 @@
 import pytest
 
+from django.core.cache import cache
 from rest_framework.test import APIClient
 
 from docmngr.models import Document, Folder, Topic
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Don't let cached responses leak from one test into the next."""
+    cache.clear()
+
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -43,6 +50,14 @@ def child_folder(transactional_db, parent_folder):
     return folder
 
 
+@pytest.fixture
+def grandchild_folder(transactional_db, child_folder):
+    folder = Folder(name="grandchild_1", parent_folder=child_folder)
+    folder.save()
+
+    return folder
+
+
 @pytest.fixture
 def deleted_folder(transactional_db, parent_folder):
     folder = Folder(name="child_2", parent_folder=parent_folder, is_deleted=True)
@@ -0,0 +1,208 @@
+"""Fast serialization of database rows for the read-only list endpoints.
+
+Rationale: Instantiating a model plus running every DRF field's to_representation for each of
+thousands of objects dominates the time spent on big listings. These functions build the same
+representations straight from `.values()` rows instead, so listings skip both.
+
+The output is the same as the serializer's, field for field and in the same order, so it renders
+to exactly the same JSON. See docmngr/tests/test_fast_serializers.py.
+
+Example:
+    rows = Folder.without_deleted().values(*value_fields(FolderSerializer))
+    return Response(serialize_rows(rows, FolderSerializer))
+"""
+
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from docmngr.models import DocumentContent, Topic
+from docmngr.timing import timed
+
+_SUPPORTED_FIELDS = (
+    serializers.BaseSerializer,
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.DateField,
+    serializers.DateTimeField,
+    serializers.IntegerField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+def value_fields(serializer_class):
+    """Names of the serializer's fields that can be fetched with `.values()`.
+
+    That's all of them except nested serializers, which serialize_rows takes separately.
+    """
+    return [
+        name
+        for name, _ in _get_fields(serializer_class)
+        if name not in _nested(serializer_class)
+    ]
+
+
+@timed("serialize")
+def serialize_rows(rows, serializer_class, **nested):
+    """Returns what `serializer_class(objects, many=True).data` would for the objects of the rows.
+
+    rows: Dicts with (at least) the value_fields of the serializer, e.g. from `.values()`
+    nested: Representations of the nested fields by the id of the row, e.g.
+            `topics=document_topics(ids)` for a document serializer. Rows missing from it get []
+    """
+    fields = [
+        (name, None if name in nested else _get_converter(field))
+        for name, field in _get_fields(serializer_class)
+    ]
+
+    results = []
+    for row in rows:
+        result = {}
+        for name, convert in fields:
+            if name in nested:
+                result[name] = nested[name].get(row["id"], [])
+            elif convert is not None and row[name] is not None:
+                result[name] = convert(row[name])
+            else:
+                result[name] = row[name]
+        results.append(result)
+
+    return results
+
+
+def document_topics(document_ids):
+    """Returns the representations of the documents' topics by document id, using one query.
+
+    Same as the `topics` field of DocumentSerializer, topics are ordered by id.
+    """
+    return _group_topics(_document_topics_queryset(document_ids))
+
+
+async def adocument_topics(document_ids):
+    """Same as document_topics, for async views."""
+    return _group_topics(
+        [membership async for membership in _document_topics_queryset(document_ids)]
+    )
+
+
+def document_values(documents, serializer_class):
+    """Returns `documents.values()` with what serialize_document_rows needs for serializer_class.
+
+    The content (see Document.content) is only read when the serializer includes it.
+    """
+    fields = value_fields(serializer_class)
+    if "content" not in fields:
+        return documents.values(*fields)
+
+    fields.remove("content")
+    return documents.values(*fields, content_data=F("stored_content__data"))
+
+
+@timed("serialize")
+def serialize_document_rows(rows, serializer_class):
+    """serialize_rows for DocumentSerializer and DocumentSummarySerializer, topics included.
+
+    rows should come from document_values.
+    """
+    rows = _decompress_contents(rows)
+    topics = document_topics([row["id"] for row in rows])
+    return serialize_rows(rows, serializer_class, topics=topics)
+
+
+async def aserialize_document_rows(rows, serializer_class):
+    """Same as serialize_document_rows, for async views. rows must be a list."""
+    rows = _decompress_contents(rows)
+    topics = await adocument_topics([row["id"] for row in rows])
+    return serialize_rows(rows, serializer_class, topics=topics)
+
+
+def _decompress_contents(rows):
+    rows = list(rows)
+    for row in rows:
+        if "content_data" in row:
+            data = row.pop("content_data")
+            row["content"] = (
+                DocumentContent.decompress(data) if data is not None else ""
+            )
+    return rows
+
+
+def _document_topics_queryset(document_ids):
+    Membership = Topic.documents.through
+    return (
+        Membership.objects.filter(document_id__in=document_ids)
+        .order_by("topic_id")
+        .values_list("document_id", "topic_id", "topic__name")
+    )
+
+
+def _group_topics(memberships):
+    topics = defaultdict(list)
+    for document_id, topic_id, name in memberships:
+        topics[document_id].append({"id": topic_id, "name": name})
+
+    return topics
+
+
+@lru_cache(maxsize=None)
+def _get_fields(serializer_class):
+    """Returns the (name, field) pairs of the serializer in output order."""
+    fields = tuple(serializer_class().fields.items())
+    for name, field in fields:
+        if not isinstance(field, _SUPPORTED_FIELDS):
+            raise TypeError(
+                f"{serializer_class.__name__}.{name}: {type(field).__name__} isn't supported"
+            )
+    return fields
+
+
+@lru_cache(maxsize=None)
+def _nested(serializer_class):
+    return {
+        name
+        for name, field in _get_fields(serializer_class)
+        if isinstance(field, serializers.BaseSerializer)
+    }
+
+
+def _get_converter(field):
+    """Returns the function converting a field's database value to its representation.
+
+    None for fields whose database values already are their representation.
+    """
+    if isinstance(field, serializers.DateTimeField):
+        return _get_datetime_converter(field)
+    if isinstance(field, serializers.DateField):
+        return field.to_representation
+    return None
+
+
+def _get_datetime_converter(field):
+    """Same as DateTimeField.to_representation, minus its per value lookups of the settings and
+    current time zone, which take most of the time for the usual ISO 8601 output.
+    """
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if (
+        not settings.USE_TZ
+        or hasattr(field, "timezone")
+        or output_format is None
+        or output_format.lower() != ISO_8601
+    ):
+        return field.to_representation
+
+    current_timezone = timezone.get_current_timezone()
+
+    def convert(value):
+        if value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(current_timezone).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    return convert
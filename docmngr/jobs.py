@@ -0,0 +1,163 @@
+"""Background jobs, for operations too slow to run while a client waits for the response.
+
+Rationale: Deleting a big subtree or retagging thousands of documents kept a web worker busy
+for as long as the queries took, and clients waiting on it timed out. Views now queue those as
+jobs past DOCMNGR_JOB_THRESHOLD rows and return 202 with the job, whose status clients poll at
+/jobs/<id>/. Jobs are rows of the Job table, so they need nothing but Postgres.
+
+Job functions are registered with @job and queued with enqueue(), in the current transaction
+(so they're only seen by workers once it commits, and not at all if it rolls back). Arguments
+and return values must be JSON serializable. `python manage.py run_worker` runs them, see
+docmngr.models.Job for how workers claim them.
+
+A job raising an exception is retried up to DOCMNGR_JOB_MAX_ATTEMPTS times in all, waiting
+DOCMNGR_JOB_RETRY_DELAY seconds before the first retry and twice as long before each next one,
+then fails. Jobs can run more than once (see Job), make them safe to repeat.
+
+Workers are separate processes: invalidated cached responses and pushed events only reach the
+web processes with a shared cache (e.g. Redis) and push backend (PostgresBackend).
+
+Example:
+    @job
+    def recount_documents():
+        ...
+
+    job = enqueue("recount_documents")
+"""
+
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from docmngr import cache
+from docmngr.models import Document, Folder, Job, Topic
+
+logger = logging.getLogger(__name__)
+
+# Job functions by name
+_JOBS = {}
+
+
+def job(func):
+    """Decorator registering a job function under its name, see enqueue()."""
+    _JOBS[func.__name__] = func
+    return func
+
+
+def enqueue(name, **arguments):
+    """Queues a call of the named job function, returns the Job."""
+    if name not in _JOBS:
+        raise ValueError(f"Unknown job {name}")
+
+    return Job.objects.create(
+        name=name,
+        arguments=arguments,
+        max_attempts=settings.DOCMNGR_JOB_MAX_ATTEMPTS,
+    )
+
+
+def run_next():
+    """Claims the next due job and runs it. Returns the job, None if there was none."""
+    job = Job.claim(settings.DOCMNGR_JOB_TIMEOUT)
+    if job is None:
+        return None
+
+    if job.attempts > job.max_attempts:
+        # Claimed again after its last attempt's worker was lost.
+        job.finish(status="failed", finished_at=timezone.now())
+        logger.warning("Job %s (%s) timed out", job.id, job.name)
+        return job
+
+    logger.info("Running job %s (%s), attempt %s", job.id, job.name, job.attempts)
+    try:
+        result = _JOBS[job.name](**job.arguments)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception("Job %s (%s) failed", job.id, job.name)
+        if job.attempts < job.max_attempts:
+            delay = settings.DOCMNGR_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            # Jitter, so jobs that failed together aren't retried together.
+            delay *= random.uniform(0.5, 1.5)
+            job.finish(
+                status="queued",
+                error=error,
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+        else:
+            job.finish(status="failed", error=error, finished_at=timezone.now())
+        return job
+
+    job.finish(status="succeeded", result=result, finished_at=timezone.now())
+    return job
+
+
+def work(stop, poll_interval, burst=False):
+    """Runs jobs until the stop event is set, or until none are due if burst is true.
+
+    Waits poll_interval seconds after finding no job due. Meant to run in a thread of its own,
+    closes the thread's database connections when done.
+    """
+    try:
+        while not stop.is_set():
+            if run_next() is None:
+                if burst:
+                    return
+                stop.wait(poll_interval)
+    finally:
+        connections.close_all()
+
+
+# #########################
+# ####  Job functions   ###
+# #########################
+
+
+@job
+def set_subtree_deleted(folder_id, is_deleted):
+    """Deletes or restores a folder's subtree, see Folder.set_subtree_deleted."""
+    folder = Folder.objects.get(pk=folder_id)
+    folder_count, document_count = folder.set_subtree_deleted(is_deleted)
+    cache.invalidate(cache.GLOBAL)
+    return {"folders": folder_count, "documents": document_count}
+
+
+@job
+def modify_topics_in_bulk(topic_ids, document_ids, add):
+    """Adds every document to every topic, or removes them, see Topic.add_documents_in_bulk.
+
+    Returns the number of (document, topic) pairs that changed, e.g. `{"added": 120}`.
+    """
+    with transaction.atomic():
+        if add:
+            result = {"added": Topic.add_documents_in_bulk(topic_ids, document_ids)}
+        else:
+            result = {
+                "removed": Topic.remove_documents_in_bulk(topic_ids, document_ids)
+            }
+        cache.invalidate(cache.GLOBAL)
+
+    return result
+
+
+@job
+def recount_documents():
+    """Fixes the documents_count of folders and topics, see Document.recount."""
+    with transaction.atomic():
+        folders, topics = Document.recount()
+
+    if folders or topics:
+        cache.invalidate(cache.GLOBAL)
+    return {"folders": folders, "topics": topics}
+
+
+@job
+def reindex_documents(batch_size=1000):
+    """Sets the search vectors of every document again, see Document.reindex."""
+    count = Document.reindex(batch_size)
+    cache.invalidate(cache.GLOBAL)
+    return {"documents": count}
@@ -0,0 +1,98 @@
+"""File format shared by the export_corpus and import_corpus commands.
+
+A corpus is a directory with one file per table, e.g. folders.ndjson or folders.csv. NDJSON files
+have one JSON object per line, CSV files a header row. Rows are written and read one at a time,
+so memory use doesn't depend on the size of the corpus.
+"""
+
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+FORMATS = ["ndjson", "csv"]
+
+# Columns of each table, in the order they are imported (referenced tables first).
+TABLES = {
+    "folders": [
+        "id",
+        "name",
+        "parent_folder",
+        "is_deleted",
+        "created_at",
+        "updated_at",
+    ],
+    "topics": ["id", "name", "created_at", "updated_at"],
+    "documents": [
+        "id",
+        "title",
+        "folder",
+        "is_deleted",
+        "created_at",
+        "updated_at",
+        "content",
+    ],
+    "memberships": ["topic", "document"],
+}
+
+# Columns that can be null, CSV has no way to tell null from an empty string.
+NULLABLE_COLUMNS = {"parent_folder"}
+
+# Document contents can be far bigger than the default limit of 128 KiB.
+csv.field_size_limit(sys.maxsize)
+
+
+def corpus_path(directory, table, format):
+    return Path(directory) / f"{table}.{format}"
+
+
+def write_rows(file, format, columns, rows):
+    """Writes rows (sequences of values in the order of columns) to file, returns their count."""
+    count = 0
+    if format == "csv":
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(
+                value.isoformat() if hasattr(value, "isoformat") else value
+                for value in row
+            )
+            count += 1
+    else:
+        for row in rows:
+            file.write(
+                json.dumps(
+                    dict(zip(columns, row)), default=lambda value: value.isoformat()
+                )
+            )
+            file.write("\n")
+            count += 1
+
+    return count
+
+
+def read_rows(file, format, columns):
+    """Reads the rows written by write_rows, yields lists of values in the order of columns."""
+    if format == "csv":
+        for row in csv.DictReader(file):
+            yield [
+                (
+                    None
+                    if column in NULLABLE_COLUMNS and row[column] == ""
+                    else row[column]
+                )
+                for column in columns
+            ]
+    else:
+        for line in file:
+            if line.strip():
+                row = json.loads(line)
+                yield [row.get(column) for column in columns]
+
+
+def report(stdout, table, count, started):
+    seconds = time.monotonic() - started
+    stdout.write(
+        f"{table}: {count} rows in {seconds:.1f}s ({count / max(seconds, 1e-6):.0f} rows/s)"
+    )
@@ -0,0 +1,72 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from docmngr.management.commands._corpus import (
+    FORMATS,
+    TABLES,
+    corpus_path,
+    report,
+    write_rows,
+)
+from docmngr.models import Document, DocumentContent, Folder, Topic
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports all folders, topics, documents and topic memberships to a directory of NDJSON or "
+        "CSV files, see import_corpus."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument("--format", choices=FORMATS, default="ndjson")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Rows fetched from the database at a time",
+        )
+
+    def handle(self, directory, format, chunk_size, **options):
+        # One snapshot for all tables, so memberships only refer to exported documents etc.
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+
+            Path(directory).mkdir(parents=True, exist_ok=True)
+            for table, rows in self._get_rows(chunk_size).items():
+                started = time.monotonic()
+                with open(
+                    corpus_path(directory, table, format), "w", newline=""
+                ) as file:
+                    count = write_rows(file, format, TABLES[table], rows)
+                report(self.stdout, table, count, started)
+
+    @staticmethod
+    def _get_rows(chunk_size):
+        """Row iterators of each table. They use server-side cursors, see QuerySet.iterator."""
+        Membership = Topic.documents.through
+        documents = (
+            Document.objects.order_by("id")
+            .values_list(*TABLES["documents"][:-1], "stored_content__data")
+            .iterator(chunk_size)
+        )
+
+        return {
+            "folders": Folder.objects.order_by("id")
+            .values_list(*TABLES["folders"])
+            .iterator(chunk_size),
+            "topics": Topic.objects.order_by("id")
+            .values_list(*TABLES["topics"])
+            .iterator(chunk_size),
+            "documents": (
+                (*row, DocumentContent.decompress(data) if data is not None else "")
+                for *row, data in documents
+            ),
+            "memberships": Membership.objects.order_by("id")
+            .values_list(*TABLES["memberships"])
+            .iterator(chunk_size),
+        }
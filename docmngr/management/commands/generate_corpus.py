@@ -0,0 +1,197 @@
+import math
+import random
+import time
+from collections import Counter
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from docmngr import cache
+from docmngr.management.commands._corpus import report
+from docmngr.models import Document, Folder, Topic
+
+WORDS = """
+access account action address agent answer application approval area article assistant
+audit backup balance benefit billing board branch budget building business calendar call
+campaign card case change channel check claim client code company compliance computer
+contact content contract cost customer data database deadline delivery department
+deployment design desk device document email employee equipment error escalation event
+expense feedback file finance form goal guide hardware help holiday incident inventory
+invoice issue item job key laptop leave license list login machine manager meeting message
+network note office onboarding order outage password payment payroll phone plan policy
+portal printer priority problem procedure process product project purchase quality quote
+record refund release report request resource review role room safety sales schedule
+security server service setting shift shipment site software staff status step storage
+supplier support system task team template ticket time training travel update user vendor
+version visitor warehouse website week workflow
+""".split()
+
+TAGS = ["p", "p", "p", "li", "h2", "blockquote"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a synthetic corpus of folders, topics and documents, for benchmarks. The same "
+        "options (and seed) always generate the same corpus."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--folders", type=int, default=100)
+        parser.add_argument(
+            "--max-depth", type=int, default=6, help="Max depth of the folder tree"
+        )
+        parser.add_argument(
+            "--nesting",
+            type=float,
+            default=0.3,
+            help=(
+                "Chance (0 to 1) of a new folder going below the previous one rather than a "
+                "random one. Higher makes deeper, narrower trees"
+            ),
+        )
+        parser.add_argument("--documents", type=int, default=1000)
+        parser.add_argument(
+            "--median-size",
+            type=int,
+            default=4000,
+            help="Median size of document contents in characters, sizes are log-normal",
+        )
+        parser.add_argument("--topics", type=int, default=20)
+        parser.add_argument(
+            "--zipf",
+            type=float,
+            default=1.1,
+            help="Exponent of the Zipf distribution documents are assigned to topics by",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, **options):
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        # Names are unique within a corpus, the seed keeps them apart from other corpora.
+        self.prefix = f"corpus {options['seed']}"
+
+        with transaction.atomic():
+            folders = self._create_folders(
+                options["folders"], options["max_depth"], options["nesting"]
+            )
+            topics = self._create_topics(options["topics"])
+            documents = self._create_documents(
+                options["documents"], folders, options["median_size"]
+            )
+            if topics:
+                self._assign_topics(documents, topics, options["zipf"])
+
+        cache.invalidate(cache.GLOBAL)
+
+    def _create_folders(self, count, max_depth, nesting):
+        """Creates a random folder tree, returns the folders."""
+        started = time.monotonic()
+
+        # Pick every folder's parent (an index into parents, or None) first.
+        parents = []
+        depths = []
+        for i in range(count):
+            if i == 0 or self.random.random() < 0.05:
+                parent = None
+            elif self.random.random() < nesting and depths[i - 1] < max_depth:
+                parent = i - 1
+            else:
+                parent = self.random.randrange(i)
+                while parent is not None and depths[parent] >= max_depth:
+                    parent = parents[parent]
+            parents.append(parent)
+            depths.append(0 if parent is None else depths[parent] + 1)
+
+        folders = [
+            Folder(name=f"{self.prefix} folder {i} {self.random.choice(WORDS)}")
+            for i in range(count)
+        ]
+        for folder, parent in zip(folders, parents):
+            folder.parent_folder = None if parent is None else folders[parent]
+
+        # A level at a time, parents need ids before their children can be created. bulk_create
+        # skips Folder.save(), so paths are set here.
+        for depth in range(max(depths, default=-1) + 1):
+            level = [
+                folder
+                for folder, folder_depth in zip(folders, depths)
+                if folder_depth == depth
+            ]
+            Folder.objects.bulk_create(level, batch_size=self.batch_size)
+
+            for folder in level:
+                parent_path = (
+                    "/" if folder.parent_folder is None else folder.parent_folder.path
+                )
+                folder.path = f"{parent_path}{folder.id}/"
+            Folder.objects.bulk_update(level, ["path"], batch_size=self.batch_size)
+
+        report(self.stdout, "folders", count, started)
+        return folders
+
+    def _create_topics(self, count):
+        started = time.monotonic()
+        names = [f"{self.prefix} topic {i}" for i in range(count)]
+        Topic.objects.bulk_create(
+            [Topic(name=name) for name in names], ignore_conflicts=True
+        )
+        topics = Topic.objects.in_bulk(names, field_name="name")
+
+        report(self.stdout, "topics", count, started)
+        return [topics[name] for name in names]
+
+    def _create_documents(self, count, folders, median_size):
+        started = time.monotonic()
+        documents = Document.objects.bulk_create(
+            (
+                Document(
+                    title=" ".join(self.random.choices(WORDS, k=4)).capitalize(),
+                    content=self._generate_content(median_size),
+                    folder=self.random.choice(folders),
+                )
+                for _ in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+
+        report(self.stdout, "documents", count, started)
+        return documents
+
+    def _generate_content(self, median_size):
+        """Returns rich text of log-normally distributed size, around median_size characters."""
+        size = min(median_size * math.exp(self.random.gauss(0, 1)), median_size * 50)
+        paragraphs = []
+        length = 0
+        while length < size:
+            tag = self.random.choice(TAGS)
+            words = " ".join(self.random.choices(WORDS, k=self.random.randint(5, 60)))
+            paragraphs.append(f"<{tag}>{words.capitalize()}.</{tag}>")
+            length += len(paragraphs[-1])
+
+        return "".join(paragraphs)
+
+    def _assign_topics(self, documents, topics, exponent):
+        """Adds each document to 0-3 topics, picked from a Zipf distribution over topics."""
+        started = time.monotonic()
+        Membership = Topic.documents.through
+        weights = list(
+            accumulate(1 / rank**exponent for rank in range(1, len(topics) + 1))
+        )
+
+        memberships = []
+        for document in documents:
+            picked = self.random.choices(
+                topics, cum_weights=weights, k=self.random.randint(0, 3)
+            )
+            memberships.extend(
+                Membership(topic=topic, document=document) for topic in set(picked)
+            )
+        Membership.objects.bulk_create(memberships, batch_size=self.batch_size)
+        Document.update_counts(
+            topics=Counter(membership.topic_id for membership in memberships)
+        )
+
+        report(self.stdout, "memberships", len(memberships), started)
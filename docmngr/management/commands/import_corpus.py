@@ -0,0 +1,260 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, transaction
+
+from docmngr import cache
+from docmngr.management.commands._corpus import (
+    FORMATS,
+    TABLES,
+    corpus_path,
+    read_rows,
+    report,
+)
+from docmngr.models import Document, DocumentContent, Folder, Topic
+
+# Rows are loaded into temporary tables with COPY first, then moved into the real ones with
+# INSERT ... SELECT, which is where ids get remapped. new_id is the id a row ends up with.
+CREATE_STAGING_TABLES = """
+CREATE TEMPORARY TABLE import_folders (
+    id bigint PRIMARY KEY, name text, parent_folder_id bigint, is_deleted boolean,
+    created_at timestamptz, updated_at timestamptz, new_id bigint {folder_id}
+) ON COMMIT DROP;
+CREATE TEMPORARY TABLE import_topics (
+    id bigint PRIMARY KEY, name text, created_at timestamptz, updated_at timestamptz,
+    new_id bigint {topic_id}, merged boolean NOT NULL DEFAULT false
+) ON COMMIT DROP;
+CREATE TEMPORARY TABLE import_documents (
+    id bigint PRIMARY KEY, title text, folder_id bigint, is_deleted boolean,
+    created_at timestamptz, updated_at timestamptz, content text, data bytea,
+    new_id bigint {document_id}
+) ON COMMIT DROP;
+CREATE TEMPORARY TABLE import_memberships (topic_id bigint, document_id bigint) ON COMMIT DROP;
+"""
+
+# Every row references rows imported along with it, checked before remapping ids.
+DANGLING_REFERENCES = """
+SELECT 'folder ' || id FROM import_folders f
+WHERE parent_folder_id IS NOT NULL
+    AND NOT EXISTS (SELECT FROM import_folders p WHERE p.id = f.parent_folder_id)
+UNION ALL
+SELECT 'document ' || id FROM import_documents d
+WHERE NOT EXISTS (SELECT FROM import_folders f WHERE f.id = d.folder_id)
+UNION ALL
+SELECT 'membership of document ' || document_id FROM import_memberships m
+WHERE NOT EXISTS (SELECT FROM import_topics t WHERE t.id = m.topic_id)
+    OR NOT EXISTS (SELECT FROM import_documents d WHERE d.id = m.document_id)
+LIMIT 1
+"""
+
+# Imported topics are merged with existing ones of the same name when remapping ids.
+MERGE_TOPICS = """
+UPDATE import_topics i SET new_id = t.id, merged = true FROM docmngr_topic t WHERE t.name = i.name
+"""
+
+# Rows referencing something that isn't imported keep the reference (when keeping ids).
+INSERT_ROWS = """
+INSERT INTO docmngr_folder (id, name, parent_folder_id, is_deleted, created_at, updated_at, path,
+    documents_count)
+SELECT f.new_id, f.name, coalesce(p.new_id, f.parent_folder_id), f.is_deleted, f.created_at,
+    f.updated_at, '', 0
+FROM import_folders f
+LEFT JOIN import_folders p ON p.id = f.parent_folder_id;
+
+WITH RECURSIVE paths AS (
+    SELECT f.new_id AS id, coalesce(p.path, '/') || f.new_id || '/' AS path
+    FROM import_folders f
+    LEFT JOIN docmngr_folder p ON p.id = f.parent_folder_id
+    WHERE NOT EXISTS (SELECT FROM import_folders i WHERE i.id = f.parent_folder_id)
+  UNION ALL
+    SELECT f.new_id, paths.path || f.new_id || '/'
+    FROM import_folders f
+    JOIN import_folders p ON p.id = f.parent_folder_id
+    JOIN paths ON paths.id = p.new_id
+)
+UPDATE docmngr_folder SET path = paths.path FROM paths WHERE docmngr_folder.id = paths.id;
+
+INSERT INTO docmngr_topic (id, name, created_at, updated_at, documents_count)
+SELECT new_id, name, created_at, updated_at, 0 FROM import_topics WHERE NOT merged;
+
+INSERT INTO docmngr_document (id, title, folder_id, is_deleted, created_at, updated_at,
+    content_length, excerpt)
+SELECT d.new_id, d.title, coalesce(f.new_id, d.folder_id), d.is_deleted, d.created_at,
+    d.updated_at, 0, ''
+FROM import_documents d
+LEFT JOIN import_folders f ON f.id = d.folder_id;
+
+INSERT INTO docmngr_documentcontent (document_id, data)
+SELECT new_id, data FROM import_documents;
+
+INSERT INTO docmngr_documentrevision (document_id, number, created_at, title, is_snapshot, data)
+SELECT new_id, 1, updated_at, title, true, data FROM import_documents;
+
+INSERT INTO docmngr_topic_documents (topic_id, document_id)
+SELECT DISTINCT coalesce(t.new_id, m.topic_id), coalesce(d.new_id, m.document_id)
+FROM import_memberships m
+LEFT JOIN import_topics t ON t.id = m.topic_id
+LEFT JOIN import_documents d ON d.id = m.document_id;
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports folders, topics, documents and topic memberships from a directory written by "
+        "export_corpus, in one transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument("--format", choices=FORMATS, default="ndjson")
+        parser.add_argument(
+            "--remap-ids",
+            action="store_true",
+            help=(
+                "Give imported rows new ids instead of keeping theirs, e.g. to import into a "
+                "database that already has data. Topics are merged with existing ones of the "
+                "same name."
+            ),
+        )
+
+    def handle(self, directory, format, remap_ids, **options):
+        for table in TABLES:
+            if not corpus_path(directory, table, format).exists():
+                raise CommandError(f"{corpus_path(directory, table, format)} not found")
+
+        started = time.monotonic()
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                self._create_staging_tables(cursor, remap_ids)
+                counts = {
+                    table: self._copy(cursor, directory, table, format)
+                    for table in TABLES
+                }
+
+                if remap_ids:
+                    cursor.execute(DANGLING_REFERENCES)
+                    dangling = cursor.fetchone()
+                    if dangling is not None:
+                        raise CommandError(
+                            f"{dangling[0]} refers to something not in the corpus, which "
+                            "can't be imported with --remap-ids"
+                        )
+                    cursor.execute(MERGE_TOPICS)
+
+                insert_started = time.monotonic()
+                cursor.execute(INSERT_ROWS)
+                Document.update_derived_fields(
+                    "(SELECT new_id AS id, content FROM import_documents) AS c"
+                )
+                # The rows were inserted with raw SQL, so nothing has counted them.
+                Document.recount()
+                if not remap_ids:
+                    # The sequences don't know about the ids that were inserted.
+                    for sql in connection.ops.sequence_reset_sql(
+                        no_style(), [Folder, Topic, Document]
+                    ):
+                        cursor.execute(sql)
+                report(self.stdout, "insert", sum(counts.values()), insert_started)
+        except IntegrityError as error:
+            raise CommandError(f"Import failed, nothing was imported: {error}")
+
+        cache.invalidate(cache.GLOBAL)
+        report(self.stdout, "total", sum(counts.values()), started)
+
+    @staticmethod
+    def _create_staging_tables(cursor, remap_ids):
+        if remap_ids:
+            new_id = "DEFAULT nextval(pg_get_serial_sequence('{table}', 'id'))"
+        else:
+            new_id = "GENERATED ALWAYS AS (id) STORED"
+
+        cursor.execute(
+            CREATE_STAGING_TABLES.format(
+                folder_id=new_id.format(table=Folder._meta.db_table),
+                topic_id=new_id.format(table=Topic._meta.db_table),
+                document_id=new_id.format(table=Document._meta.db_table),
+            )
+        )
+
+    def _copy(self, cursor, directory, table, format):
+        """Streams a table of the corpus into its staging table, returns the number of rows."""
+        started = time.monotonic()
+        columns = TABLES[table]
+        with open(corpus_path(directory, table, format), newline="") as file:
+            rows = read_rows(file, format, columns)
+            if table == "documents":
+                rows = _with_compressed_content(rows)
+                columns = [*columns, "data"]
+
+            cursor.copy_expert(
+                f"COPY import_{table} ({', '.join(_column(c) for c in columns)}) FROM STDIN",
+                CopyFile(rows),
+            )
+            count = cursor.rowcount
+
+        report(self.stdout, table, count, started)
+        return count
+
+
+def _with_compressed_content(rows):
+    """Adds the compressed content to document rows, see Document.content.
+
+    The plain content is loaded too, for search_vector etc.
+    """
+    for *row, content in rows:
+        content = content or ""
+        yield (*row, content, DocumentContent.compress(content))
+
+
+def _column(name):
+    """The staging table column of a corpus column."""
+    return (
+        f"{name}_id"
+        if name in ("parent_folder", "folder", "topic", "document")
+        else name
+    )
+
+
+class CopyFile:
+    """Read-only file-like object turning rows into the text format of COPY FROM STDIN.
+
+    Rows are converted as COPY reads, so they never all have to be in memory.
+    """
+
+    def __init__(self, rows):
+        self._lines = ("\t".join(map(_copy_value, row)) + "\n" for row in rows)
+        self._buffer = ""
+
+    def read(self, size=-1):
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        for line in self._lines:
+            chunks.append(line)
+            length += len(line)
+            if 0 <= size <= length:
+                break
+
+        data = "".join(chunks)
+        if size < 0:
+            self._buffer = ""
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def _copy_value(value):
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, bytes):
+        return r"\\x" + value.hex()
+
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
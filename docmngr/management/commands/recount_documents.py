@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from docmngr import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Recounts the documents of every folder and topic, fixing the documents_count of those "
+        "that drifted. See Document.update_counts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Queue it as a job for run_worker rather than running it now",
+        )
+
+    def handle(self, background, **options):
+        if background:
+            job = jobs.enqueue("recount_documents")
+            self.stdout.write(f"Queued job {job.id}")
+            return
+
+        result = jobs.recount_documents()
+        self.stdout.write(
+            f"Fixed the counts of {result['folders']} folders and {result['topics']} topics"
+        )
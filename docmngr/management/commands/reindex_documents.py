@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from docmngr import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Sets the search vectors (and the other fields derived from the content) of every "
+        "document again, e.g. after changing Document.SEARCH_CONFIG."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Queue it as a job for run_worker rather than running it now",
+        )
+
+    def handle(self, batch_size, background, **options):
+        if background:
+            job = jobs.enqueue("reindex_documents", batch_size=batch_size)
+            self.stdout.write(f"Queued job {job.id}")
+            return
+
+        result = jobs.reindex_documents(batch_size)
+        self.stdout.write(f"Reindexed {result['documents']} documents")
@@ -0,0 +1,99 @@
+import multiprocessing
+import signal
+import threading
+from contextlib import contextmanager
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs background jobs (see docmngr.jobs) until stopped with SIGINT or SIGTERM, which "
+        "lets the jobs being run finish first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Number of worker processes, each running --threads jobs at a time",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=1,
+            help="Number of jobs each process runs at a time, in threads",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait after finding no job due",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once no job is due, e.g. to run from cron",
+        )
+
+    def handle(self, processes, threads, poll_interval, burst, **options):
+        if processes == 1:
+            run_threads(threads, poll_interval, burst)
+            return
+
+        # Spawned rather than forked, forking a process with threads and connections is unsafe.
+        connections.close_all()
+        context = multiprocessing.get_context("spawn")
+        workers = [
+            context.Process(target=run_process, args=(threads, poll_interval, burst))
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+
+        def stop(signum, frame):
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+
+        with _handling_signals(stop):
+            for worker in workers:
+                worker.join()
+
+
+def run_process(threads, poll_interval, burst):
+    """Entry point of a worker process."""
+    django.setup()
+    run_threads(threads, poll_interval, burst)
+
+
+def run_threads(count, poll_interval, burst):
+    """Runs jobs in count threads until SIGINT or SIGTERM (or none are due, if burst)."""
+    # Not imported at the top, spawned processes import this module before setting Django up.
+    from docmngr import jobs
+
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=jobs.work, args=(stop, poll_interval, burst))
+        for _ in range(count)
+    ]
+    with _handling_signals(lambda signum, frame: stop.set()):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+
+@contextmanager
+def _handling_signals(handler):
+    """Handles SIGINT and SIGTERM with handler, restoring the previous handlers after."""
+    signums = [signal.SIGINT, signal.SIGTERM]
+    previous = [signal.signal(signum, handler) for signum in signums]
+    try:
+        yield
+    finally:
+        for signum, previous_handler in zip(signums, previous):
+            signal.signal(signum, previous_handler)
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+POPULATE_PATHS = """
+WITH RECURSIVE paths AS (
+    SELECT id, '/' || id || '/' AS path
+    FROM docmngr_folder
+    WHERE parent_folder_id IS NULL
+  UNION ALL
+    SELECT f.id, p.path || f.id || '/'
+    FROM docmngr_folder f
+    JOIN paths p ON f.parent_folder_id = p.id
+)
+UPDATE docmngr_folder SET path = paths.path FROM paths WHERE docmngr_folder.id = paths.id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docmngr", "0009_folder_unique within parent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="folder",
+            name="path",
+            field=models.TextField(default="", editable=False),
+        ),
+        migrations.RunSQL(POPULATE_PATHS, reverse_sql=migrations.RunSQL.noop),
+        migrations.AlterField(
+            model_name="document",
+            name="folder",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="documents",
+                to="docmngr.folder",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="folder",
+            name="name",
+            field=models.CharField(max_length=240),
+        ),
+        migrations.AddIndex(
+            model_name="folder",
+            index=models.Index(
+                fields=["path"], name="folder_path_idx", opclasses=["text_pattern_ops"]
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:45
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Keep in sync with Document.SEARCH_CONFIG.
+SEARCH_VECTOR = """
+    setweight(to_tsvector('english', coalesce({row}.title, '')), 'A')
+    || setweight(to_tsvector('english', coalesce({row}.content, '')), 'B')
+"""
+
+CREATE_TRIGGER = f"""
+CREATE FUNCTION docmngr_document_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {SEARCH_VECTOR.format(row="NEW")};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER docmngr_document_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, content ON docmngr_document
+    FOR EACH ROW EXECUTE FUNCTION docmngr_document_search_vector_update();
+
+UPDATE docmngr_document SET search_vector = {SEARCH_VECTOR.format(row="docmngr_document")};
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER docmngr_document_search_vector_update ON docmngr_document;
+DROP FUNCTION docmngr_document_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docmngr", "0010_folder_path"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, reverse_sql=DROP_TRIGGER),
+        migrations.AddIndex(
+            model_name="document",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="document_search_idx"
+            ),
+        ),
+    ]
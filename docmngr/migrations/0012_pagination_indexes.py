@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docmngr", "0011_document_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["folder", "created_at", "id"],
+                name="document_folder_page_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["created_at", "id"],
+                name="document_page_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="topic",
+            index=models.Index(fields=["created_at", "id"], name="topic_page_idx"),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:47
+
+from django.db import migrations, models
+
+
+# The trigger from 0011, now also filling in the summary fields.
+UPDATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION docmngr_document_search_vector_update() RETURNS trigger AS $$
+DECLARE
+    text_content text := btrim(
+        regexp_replace(regexp_replace(coalesce(NEW.content, ''), '<[^>]*>', ' ', 'g'), '\\s+', ' ', 'g')
+    );
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(NEW.content, '')), 'B');
+    NEW.content_length := char_length(text_content);
+    NEW.excerpt := left(text_content, 200);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+UPDATE docmngr_document SET content = content;
+"""
+
+RESTORE_TRIGGER = """
+CREATE OR REPLACE FUNCTION docmngr_document_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(NEW.content, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docmngr", "0012_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="content_length",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="excerpt",
+            field=models.TextField(default="", editable=False),
+        ),
+        migrations.RunSQL(UPDATE_TRIGGER, reverse_sql=RESTORE_TRIGGER),
+    ]
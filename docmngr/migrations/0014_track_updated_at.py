@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docmngr", "0013_document_summary"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="document",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name="folder",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name="topic",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:11
+
+import zlib
+from itertools import islice
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Same as DocumentContent.COMPRESSION_LEVEL at the time of writing.
+COMPRESSION_LEVEL = 6
+BATCH_SIZE = 1000
+
+# The content is already compressed, don't let Postgres try again when storing it out of line.
+SET_STORAGE = """
+ALTER TABLE docmngr_documentcontent ALTER COLUMN data SET STORAGE EXTERNAL;
+"""
+
+# The search vector, content_length and excerpt are maintained by Document.save_contents now.
+DROP_TRIGGER = """
+DROP TRIGGER docmngr_document_search_vector_update ON docmngr_document;
+DROP FUNCTION docmngr_document_search_vector_update();
+"""
+
+# As of 0013
+CREATE_TRIGGER = """
+CREATE FUNCTION docmngr_document_search_vector_update() RETURNS trigger AS $$
+DECLARE
+    text_content text := btrim(
+        regexp_replace(regexp_replace(coalesce(NEW.content, ''), '<[^>]*>', ' ', 'g'), '\\s+', ' ', 'g')
+    );
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(NEW.content, '')), 'B');
+    NEW.content_length := char_length(text_content);
+    NEW.excerpt := left(text_content, 200);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER docmngr_document_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, content ON docmngr_document
+    FOR EACH ROW EXECUTE FUNCTION docmngr_document_search_vector_update();
+"""
+
+
+def compress_contents(apps, schema_editor):
+    Document = apps.get_model("docmngr", "Document")
+    DocumentContent = apps.get_model("docmngr", "DocumentContent")
+
+    documents = (
+        Document.objects.order_by("id")
+        .values_list("id", "content")
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    while batch := list(islice(documents, BATCH_SIZE)):
+        DocumentContent.objects.bulk_create(
+            DocumentContent(
+                document_id=pk, data=zlib.compress(content.encode(), COMPRESSION_LEVEL)
+            )
+            for pk, content in batch
+        )
+
+
+def decompress_contents(apps, schema_editor):
+    Document = apps.get_model("docmngr", "Document")
+    DocumentContent = apps.get_model("docmngr", "DocumentContent")
+
+    contents = DocumentContent.objects.values_list("document_id", "data").iterator(
+        chunk_size=BATCH_SIZE
+    )
+    for pk, data in contents:
+        Document.objects.filter(pk=pk).update(content=zlib.decompress(data).decode())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docmngr", "0014_track_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentContent",
+            fields=[
+                (
+                    "document",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stored_content",
+                        serialize=False,
+                        to="docmngr.document",
+                    ),
+                ),
+                ("data", models.BinaryField()),
+            ],
+        ),
+        migrations.RunSQL(SET_STORAGE, reverse_sql=migrations.RunSQL.noop),
+        migrations.RunPython(compress_contents, decompress_contents),
+        migrations.RunSQL(DROP_TRIGGER, reverse_sql=CREATE_TRIGGER),
+        # Lets the column be added back with existing rows when migrating backwards.
+        migrations.AlterField(
+            model_name="document",
+            name="content",
+            field=models.TextField(default=""),
+        ),
+        migrations.RemoveField(
+            model_name="document",
+            name="content",
+        ),
+    ]
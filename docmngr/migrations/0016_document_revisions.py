@@ -0,0 +1,71 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Revisions are compressed already, see 0015_document_content.
+SET_STORAGE = """
+ALTER TABLE docmngr_documentrevision ALTER COLUMN data SET STORAGE EXTERNAL;
+"""
+
+# Every existing document starts out with its current state as a snapshot revision, whose data
+# is the same as the stored content.
+ADD_FIRST_REVISIONS = """
+INSERT INTO docmngr_documentrevision (document_id, number, created_at, title, is_snapshot, data)
+SELECT d.id, 1, d.updated_at, d.title, true, c.data
+FROM docmngr_document d
+JOIN docmngr_documentcontent c ON c.document_id = d.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docmngr", "0015_document_content"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentRevision",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("number", models.PositiveIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("title", models.CharField(max_length=240)),
+                ("is_snapshot", models.BooleanField()),
+                ("data", models.BinaryField()),
+                (
+                    "document",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="revisions",
+                        to="docmngr.document",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["document", "created_at", "id"],
+                        name="revision_page_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="documentrevision",
+            constraint=models.UniqueConstraint(
+                fields=("document", "number"), name="unique revision number"
+            ),
+        ),
+        migrations.RunSQL(SET_STORAGE, reverse_sql=migrations.RunSQL.noop),
+        migrations.RunSQL(ADD_FIRST_REVISIONS, reverse_sql=migrations.RunSQL.noop),
+    ]
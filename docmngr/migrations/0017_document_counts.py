@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:42
+
+from django.db import migrations, models
+
+# Existing folders and topics start out with their actual counts, see Document.update_counts.
+COUNT_DOCUMENTS = """
+UPDATE docmngr_folder f SET documents_count = c.count
+FROM (
+    SELECT folder_id, count(*) AS count FROM docmngr_document
+    WHERE NOT is_deleted
+    GROUP BY folder_id
+) c
+WHERE f.id = c.folder_id;
+
+UPDATE docmngr_topic t SET documents_count = c.count
+FROM (
+    SELECT m.topic_id, count(*) AS count
+    FROM docmngr_topic_documents m
+    JOIN docmngr_document d ON d.id = m.document_id
+    WHERE NOT d.is_deleted
+    GROUP BY m.topic_id
+) c
+WHERE t.id = c.topic_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docmngr", "0016_document_revisions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="folder",
+            name="documents_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="topic",
+            name="documents_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(COUNT_DOCUMENTS, reverse_sql=migrations.RunSQL.noop),
+    ]
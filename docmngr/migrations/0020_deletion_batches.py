@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:53
+
+from django.db import migrations, models
+
+# Rows deleted before now were deleted along with their topmost deleted folder as far as we can
+# tell, restoring it brings them back like it used to.
+SET_DELETED_WITH = """
+UPDATE docmngr_folder f SET deleted_with = top.id
+FROM docmngr_folder top
+LEFT JOIN docmngr_folder p ON p.id = top.parent_folder_id
+WHERE top.is_deleted AND (p.id IS NULL OR NOT p.is_deleted)
+    AND f.is_deleted AND f.path LIKE top.path || '%';
+
+UPDATE docmngr_document d SET deleted_with = f.deleted_with
+FROM docmngr_folder f
+WHERE d.folder_id = f.id AND d.is_deleted AND f.is_deleted;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docmngr", "0019_jobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="deleted_with",
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="folder",
+            name="deleted_with",
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.RunSQL(SET_DELETED_WITH, reverse_sql=migrations.RunSQL.noop),
+    ]
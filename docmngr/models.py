@@ -1,11 +1,30 @@
-from django.db import models
+import json
+import re
+import zlib
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import accumulate
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection, models, transaction
+from django.db.models import Count, Max, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Concat, Length, Now, Substr
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
 
 from rest_framework import serializers
 
+from docmngr import push
+from docmngr.timing import TimedSerializerMixin
+
 
 class BaseModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now_add=True)
+    # Note that QuerySet.update() doesn't touch this, set it explicitly when doing bulk updates.
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         # This will avoid generation of migrations for the base model
@@ -22,9 +41,152 @@ class Topic(BaseModel):
 
     name = models.CharField(max_length=240, blank=False, unique=True)
     documents = models.ManyToManyField("Document", related_name="topics")
+    # Number of non-deleted documents in the topic, see Document.update_counts.
+    documents_count = models.IntegerField(default=0, editable=False)
+
+    @classmethod
+    def add_documents_in_bulk(self, topic_ids, document_ids):
+        """Adds every given document to every given topic, using one INSERT.
+
+        Ids of topics or documents that don't exist (or documents that are deleted) are ignored,
+        as are documents that are already in a topic. Documents that got added to a topic have
+        their updated_at bumped and a "tagged" Change recorded in the same statement (pushed once
+        committed, see docmngr.push), then the topics' documents_count updated.
 
+        Returns the number of (topic, document) pairs that were added.
+        """
+        Membership = self.documents.through
+        return self._modify_documents_in_bulk(
+            f"""
+            INSERT INTO {Membership._meta.db_table} (topic_id, document_id)
+            SELECT t.id, d.id
+            FROM {self._meta.db_table} t
+            CROSS JOIN {Document._meta.db_table} d
+            WHERE t.id = ANY(%s) AND d.id = ANY(%s) AND NOT d.is_deleted
+            ON CONFLICT DO NOTHING
+            RETURNING topic_id, document_id
+            """,
+            topic_ids,
+            document_ids,
+            sign=1,
+        )
+
+    @classmethod
+    def remove_documents_in_bulk(self, topic_ids, document_ids):
+        """Removes every given document from every given topic, using one DELETE.
+
+        Documents that got removed from a topic have their updated_at bumped and an "untagged"
+        Change recorded in the same statement (pushed once committed, see docmngr.push), then the
+        topics' documents_count updated.
+
+        Returns the number of (topic, document) pairs that were removed.
+        """
+        Membership = self.documents.through
+        return self._modify_documents_in_bulk(
+            f"""
+            DELETE FROM {Membership._meta.db_table}
+            WHERE topic_id = ANY(%s) AND document_id = ANY(%s)
+            RETURNING topic_id, document_id
+            """,
+            topic_ids,
+            document_ids,
+            sign=-1,
+        )
+
+    @classmethod
+    def _modify_documents_in_bulk(self, modify_sql, topic_ids, document_ids, sign):
+        action = "tagged" if sign > 0 else "untagged"
+        changes = Change.record_sql("(SELECT DISTINCT document_id FROM modified)")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH modified AS ({modify_sql}),
+                touched AS (
+                    UPDATE {Document._meta.db_table} SET updated_at = now()
+                    WHERE id IN (SELECT document_id FROM modified)
+                ),
+                recorded AS ({changes})
+                SELECT
+                    m.topic_id,
+                    count(*),
+                    count(*) FILTER (WHERE NOT d.is_deleted),
+                    array_agg(m.document_id)
+                FROM modified m
+                JOIN {Document._meta.db_table} d ON d.id = m.document_id
+                GROUP BY m.topic_id
+                """,
+                [
+                    sorted(set(topic_ids)),
+                    sorted(set(document_ids)),
+                    "document",
+                    action,
+                ],
+            )
+            modified = cursor.fetchall()
+
+        # Memberships of deleted documents aren't counted.
+        Document.update_counts(
+            topics={topic_id: sign * counted for topic_id, _, counted, _ in modified}
+        )
+
+        topic_channels = defaultdict(list)
+        for topic_id, _, _, modified_document_ids in modified:
+            for document_id in modified_document_ids:
+                topic_channels[document_id].append(f"topic:{topic_id}")
+        push.publish(
+            push.change("document", document_id, action, channels)
+            for document_id, channels in topic_channels.items()
+        )
+
+        return sum(count for _, count, _, _ in modified)
+
+    class Meta:
+        # Supports keyset pagination of the topic list, see docmngr.pagination
+        indexes = [models.Index(fields=["created_at", "id"], name="topic_page_idx")]
+
+
+@receiver(m2m_changed, sender=Topic.documents.through)
+def _count_topic_documents(sender, instance, action, pk_set, **kwargs):
+    """Updates documents_count of topics changed through the related managers.
+
+    e.g. `document.topics.add(topic)` or `topic.documents.remove(*documents)`. Counts the
+    memberships of non-deleted documents after they're added and before they're removed.
+    """
+    if action not in ("post_add", "pre_remove", "pre_clear"):
+        return
+
+    memberships = sender.objects.filter(document__is_deleted=False)
+    if isinstance(instance, Topic):
+        memberships = memberships.filter(topic=instance)
+        if pk_set is not None:
+            memberships = memberships.filter(document__in=pk_set)
+    else:
+        memberships = memberships.filter(document=instance)
+        if pk_set is not None:
+            memberships = memberships.filter(topic__in=pk_set)
+
+    sign = 1 if action == "post_add" else -1
+    Document.update_counts(
+        topics={
+            row["topic"]: sign * row["count"]
+            for row in memberships.values("topic").annotate(count=Count("id"))
+        }
+    )
+
+
+class TopicSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Topic
+        fields = ["id", "name", "documents_count"]
+
+
+class TopicSummarySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """A topic as nested in documents, without its documents_count.
+
+    Rationale: Counts change whenever any document of the topic does, leaving them out means a
+    change to one document doesn't make every cached document of the same topics stale.
+    """
 
-class TopicSerializer(serializers.ModelSerializer):
     class Meta:
         model = Topic
         fields = ["id", "name"]
@@ -43,6 +205,20 @@ class Folder(BaseModel):
         "self", on_delete=models.CASCADE, null=True, related_name="children"
     )
     is_deleted = models.BooleanField(default=False)
+    # Id of the folder whose set_subtree_deleted() deleted this one, so restoring that folder
+    # leaves alone what had been deleted before it.
+    deleted_with = models.BigIntegerField(null=True, editable=False)
+    # Materialized path of ids from the top of the hierarchy down to this folder, e.g. "/1/5/9/".
+    # Lets us answer ancestor/descendant questions with one indexed query instead of walking
+    # parent_folder. Maintained by save(), don't set it directly.
+    path = models.TextField(default="", editable=False)
+    # Number of non-deleted documents directly in the folder (not below it), see
+    # Document.update_counts.
+    documents_count = models.IntegerField(default=0, editable=False)
+
+    CYCLE_ERROR = "a folder can't be moved into itself or one of its descendants"
+    # Key of the Postgres advisory lock moves take, see _move()
+    MOVE_LOCK = 7_201_001
 
     @classmethod
     def without_deleted(self):
@@ -55,21 +231,261 @@ class Folder(BaseModel):
         """
         return self.objects.filter(is_deleted=False)
 
+    @classmethod
+    def subtree(self, pk=None, max_depth=None):
+        """Returns the non-deleted folders below (and including) a folder, using one query.
+
+        Rationale: Walking the hierarchy level-by-level costs one query per level, this
+        uses a recursive CTE instead. Deleted folders are pruned along with everything below them.
+
+        If pk is None the walk starts from the top folders in the hierarchy. If max_depth is None
+        the whole subtree is returned, otherwise only folders at most max_depth levels down.
+        Each returned folder has a `depth` attribute, 0 for the starting folder(s).
+
+        Example: Folder.subtree(pk=folder.id, max_depth=2)
+        """
+        return self.objects.raw(*self._subtree_sql(pk, max_depth, columns="*"))
+
+    @classmethod
+    def subtree_values(self, pk=None, max_depth=None):
+        """Same as subtree(), but returns dicts like `.values()` would instead of model instances.
+
+        Rationale: Listing a big hierarchy doesn't need model instances, see docmngr.fast_serializers.
+
+        Example: Folder.subtree_values(pk=folder.id)
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                *self._subtree_sql(
+                    pk,
+                    max_depth,
+                    columns=(
+                        "id, name, parent_folder_id AS parent_folder, created_at, updated_at, "
+                        "documents_count, depth"
+                    ),
+                )
+            )
+            names = [column.name for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    @classmethod
+    def _subtree_sql(self, pk, max_depth, columns):
+        table = self._meta.db_table
+        anchor = "f.id = %s" if pk is not None else "f.parent_folder_id IS NULL"
+        anchor_params = [pk] if pk is not None else []
+
+        sql = f"""
+            WITH RECURSIVE subtree AS (
+                SELECT f.*, 0 AS depth
+                FROM {table} f
+                WHERE {anchor} AND NOT f.is_deleted
+              UNION ALL
+                SELECT f.*, s.depth + 1
+                FROM {table} f
+                JOIN subtree s ON f.parent_folder_id = s.id
+                WHERE NOT f.is_deleted AND (%s IS NULL OR s.depth < %s)
+            )
+            SELECT {columns} FROM subtree ORDER BY depth, id
+            """
+        return sql, anchor_params + [max_depth, max_depth]
+
+    def save(self, *args, **kwargs):
+        """Saves the folder, keeping the materialized paths of it and its descendants in sync.
+
+        path is never written from the instance, which could have been loaded before one of its
+        ancestors moved, but computed from the database with the rows involved locked. Raises a
+        ValidationError for a move into the folder's own subtree.
+        """
+        if self._state.adding:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                self.path = self._parent_path() + f"{self.pk}/"
+                Folder.objects.filter(pk=self.pk).update(path=self.path)
+            return
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            update_fields = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+            ]
+        kwargs["update_fields"] = [name for name in update_fields if name != "path"]
+
+        with transaction.atomic():
+            stored_parent_id = Folder.objects.values_list(
+                "parent_folder_id", flat=True
+            ).get(pk=self.pk)
+            if stored_parent_id != self.parent_folder_id:
+                self._move()
+            super().save(*args, **kwargs)
+            self.path = Folder.objects.values_list("path", flat=True).get(pk=self.pk)
+
+    def _move(self):
+        """Rewrites the paths of the folder's subtree under its new parent, see save()."""
+        with connection.cursor() as cursor:
+            # One move at a time. The row locks below make a move see the paths another one
+            # committed, but two moves into each other's subtrees (A into B's child, B into A's
+            # child) would each hold a row the other rewrites, and deadlock.
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [self.MOVE_LOCK])
+
+        old_path = (
+            Folder.objects.select_for_update()
+            .values_list("path", flat=True)
+            .get(pk=self.pk)
+        )
+        parent_path = self._parent_path()
+        if parent_path.startswith(old_path):
+            raise serializers.ValidationError({"parent_folder": [self.CYCLE_ERROR]})
+
+        # Rewrite the prefix of the whole subtree with a single UPDATE.
+        new_path = parent_path + f"{self.pk}/"
+        Folder.objects.filter(path__startswith=old_path).update(
+            path=Concat(Value(new_path), Substr("path", len(old_path) + 1))
+        )
+
+    def _parent_path(self):
+        """Path of the parent folder, locked until the end of the transaction."""
+        if self.parent_folder_id is None:
+            return "/"
+        return (
+            Folder.objects.select_for_update()
+            .values_list("path", flat=True)
+            .get(pk=self.parent_folder_id)
+        )
+
+    @property
+    def ancestor_ids(self):
+        """Ids of the folders above this one, from the top of the hierarchy down."""
+        return [int(pk) for pk in self.path.strip("/").split("/")[:-1]]
+
+    def ancestors(self):
+        """Returns a queryset of the folders above this one, from the top of the hierarchy down."""
+        return Folder.objects.filter(pk__in=self.ancestor_ids).order_by(Length("path"))
+
+    def descendants(self, include_self=False):
+        """Returns a queryset of all folders below this one, at any depth."""
+        folders = Folder.objects.filter(path__startswith=self.path)
+        if not include_self:
+            folders = folders.exclude(pk=self.pk)
+        return folders
+
+    def subtree_size(self):
+        """Returns the number of folders and documents in this folder's subtree (itself included).
+
+        Deleted ones too, so it's the number of rows set_subtree_deleted could update.
+        """
+        return self.descendants(include_self=True).aggregate(
+            size=Count("id", distinct=True) + Count("documents")
+        )["size"]
+
+    def is_within(self, folder):
+        """Whether this folder is the given folder or somewhere below it."""
+        return self.path.startswith(folder.path)
+
+    def set_subtree_deleted(self, is_deleted):
+        """Soft-deletes (or restores) this folder along with every folder and document below it.
+
+        Runs a fixed number of set-based UPDATEs in one transaction however big the subtree is.
+        Restoring only brings back what deleting this folder deleted, folders and documents that
+        had been deleted on their own before stay deleted. Records one "deleted" or "restored"
+        Change, for this folder.
+
+        Returns the number of folders and documents that were flagged.
+        """
+        # No savepoint in the caller's transaction, it's all or nothing either way.
+        with transaction.atomic(savepoint=False):
+            # From the locked row, in case the folder was moved since it was loaded.
+            self.path = (
+                Folder.objects.select_for_update()
+                .values_list("path", flat=True)
+                .get(pk=self.pk)
+            )
+            deleted_with = self.id if is_deleted else None
+            if is_deleted:
+                folders = self.descendants(include_self=True).filter(is_deleted=False)
+                condition, params = "NOT is_deleted", []
+            else:
+                folders = self.descendants(include_self=True).filter(
+                    deleted_with=self.id
+                )
+                condition, params = "deleted_with = %s", [self.id]
+            folder_count = folders.update(
+                is_deleted=is_deleted, deleted_with=deleted_with, updated_at=Now()
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    UPDATE {Document._meta.db_table}
+                    SET is_deleted = %s, deleted_with = %s, updated_at = now()
+                    WHERE {condition} AND folder_id IN (
+                        SELECT id FROM {Folder._meta.db_table} WHERE path LIKE %s
+                    )
+                    RETURNING id, folder_id
+                    """,
+                    [is_deleted, deleted_with, *params, f"{self.path}%"],
+                )
+                flagged = cursor.fetchall()
+
+            delta = -1 if is_deleted else 1
+            folders = Counter(folder_id for _, folder_id in flagged)
+            Document.update_counts(
+                folders={pk: delta * count for pk, count in folders.items()},
+                documents={pk: delta for pk, _ in flagged},
+            )
+            Change.record(
+                "folder",
+                [self.id],
+                "deleted" if is_deleted else "restored",
+                push.folder_channels(self),
+            )
+
+        self.is_deleted = is_deleted
+        return folder_count, len(flagged)
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
                 fields=["parent_folder_id", "name"], name="unique within parent"
             )
         ]
+        indexes = [
+            # text_pattern_ops makes the index usable for `path LIKE '/1/5/%'` prefix matches.
+            models.Index(
+                fields=["path"], name="folder_path_idx", opclasses=["text_pattern_ops"]
+            )
+        ]
 
 
-class FolderSerializer(serializers.ModelSerializer):
+class FolderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    parent_folder = serializers.PrimaryKeyRelatedField(
+        queryset=Folder.without_deleted(), allow_null=True, required=False
+    )
+
     def create(self, data):
         return Folder.objects.create(**data)
 
+    def validate_parent_folder(self, parent_folder):
+        """Prevent moving a folder underneath itself, which would detach a cycle from the hierarchy."""
+        # Checked again with the rows locked when saving, see Folder.save.
+        if (
+            self.instance is not None
+            and parent_folder is not None
+            and parent_folder.is_within(self.instance)
+        ):
+            raise serializers.ValidationError(Folder.CYCLE_ERROR)
+        return parent_folder
+
     class Meta:
         model = Folder
-        fields = ["id", "name", "parent_folder", "created_at", "updated_at"]
+        fields = [
+            "id",
+            "name",
+            "parent_folder",
+            "created_at",
+            "updated_at",
+            "documents_count",
+        ]
 
 
 # #########################
@@ -77,6 +493,26 @@ class FolderSerializer(serializers.ModelSerializer):
 # #########################
 
 
+class DocumentQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """Same as QuerySet.bulk_create, also storing the content of the documents.
+
+        See Document.content.
+        """
+        objs = super().bulk_create(objs, *args, **kwargs)
+        Document.save_contents(
+            objs,
+            batch_size=kwargs.get("batch_size"),
+            created=not kwargs.get("update_conflicts"),
+        )
+        # Upserted documents may have been counted already, leaves them to recount_documents.
+        if not kwargs.get("update_conflicts"):
+            Document.update_counts(
+                folders=Counter(obj.folder_id for obj in objs if not obj.is_deleted)
+            )
+        return objs
+
+
 class Document(BaseModel):
     """Stores a user-created rich text document.
 
@@ -97,19 +533,609 @@ class Document(BaseModel):
         return self.objects.filter(is_deleted=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     # There maybe should be some uniqueness constraint on title,
     # within folder maybe?
     title = models.CharField(max_length=240, blank=False)
-    content = models.TextField(blank=False)
     folder = models.ForeignKey(
         Folder, on_delete=models.CASCADE, related_name="documents"
     )
     is_deleted = models.BooleanField(default=False)
+    # Id of the folder whose Folder.set_subtree_deleted() deleted this document, see Folder.
+    deleted_with = models.BigIntegerField(null=True, editable=False)
+    # Full text search index of title (weight A) and content (weight B). Kept up to date by
+    # save_contents, as the database can't read the compressed content.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # The text search configuration used both by save_contents and when querying.
+    SEARCH_CONFIG = "english"
+    # Plain text length and beginning of the content, also maintained by save_contents. These
+    # let listings summarize documents without reading the (potentially huge) content.
+    content_length = models.PositiveIntegerField(default=0, editable=False)
+    excerpt = models.TextField(default="", editable=False)
+
+    objects = DocumentQuerySet.as_manager()
+
+    # See the content property
+    _content = None
+    _content_changed = False
+    # See from_db
+    _loaded_counted_in = None
+
+    @property
+    def content(self):
+        """The rich text content of the document, stored compressed in its own table.
+
+        Rationale: Documents are scanned all the time (listings, searches, counts) and their
+        content is by far their biggest part. Kept out of the document table, only requests for a
+        document's full content read it. Rich text HTML also compresses very well.
+
+        Reads and assignments work like a regular field, the content is loaded and decompressed
+        when first read (or use `select_related("stored_content")`), and written by save() and
+        bulk_create(). Can't be used in queries, see search_vector and excerpt for that.
+        """
+        if self._content is None:
+            try:
+                self._content = self.stored_content.text
+            except DocumentContent.DoesNotExist:
+                # Unsaved, or saved without content by raw SQL
+                self._content = ""
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+        self._content_changed = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        document = super().from_db(db, field_names, values)
+        # Remember the title so save() can tell when the search vector needs updating, and where
+        # the document was counted (see update_counts).
+        document._loaded_title = document.__dict__.get("title")
+        document._loaded_counted_in = document._counted_in()
+        return document
 
+    def _counted_in(self):
+        """The folder whose documents_count includes this document, None if it isn't counted.
+
+        Also None if folder or is_deleted weren't loaded, as it can't be told then.
+        """
+        fields = self.__dict__
+        if "folder_id" not in fields or fields.get("is_deleted", True):
+            return None
+        return fields["folder_id"]
+
+    def save(self, *args, **kwargs):
+        """Saves the document, along with its content when it has been set (or the title changed)."""
+        update_fields = kwargs.get("update_fields")
+        save_content = (
+            self._state.adding
+            or self._content_changed
+            or self.title != getattr(self, "_loaded_title", None)
+        ) and (update_fields is None or "title" in update_fields)
+
+        update_counts = update_fields is None or bool(
+            {"folder", "folder_id", "is_deleted"} & set(update_fields)
+        )
+
+        with transaction.atomic():
+            created = self._state.adding
+            super().save(*args, **kwargs)
+            if save_content:
+                Document.save_contents([self], created=created)
+
+            if update_counts:
+                self._update_counts(created)
+
+    def _update_counts(self, created):
+        """Updates the counts of where the document was counted before saving and is now."""
+        before = None if created else self._loaded_counted_in
+        after = self._counted_in()
+        self._loaded_counted_in = after
+        if before == after:
+            return
+
+        folders = Counter()
+        if before is not None:
+            folders[before] -= 1
+        if after is not None:
+            folders[after] += 1
+        # Only a delete or restore changes the counts of its topics, not a move.
+        documents = {}
+        if not created and (before is None) != (after is None):
+            documents[self.id] = -1 if after is None else 1
+
+        Document.update_counts(folders=folders, documents=documents)
+
+    @classmethod
+    def save_contents(self, documents, batch_size=None, created=False):
+        """Stores the content of saved documents, and updates the fields derived from it.
+
+        Also records a revision of every document whose title or content changed, see
+        DocumentRevision. Pass created=True when all the documents are new, which saves looking
+        up their previous content.
+
+        Used by save() and bulk_create(), there's no need to call it directly.
+        """
+        batch_size = batch_size or 1000
+        for start in range(0, len(documents), batch_size):
+            end = start + batch_size
+            batch = documents[start:end]
+            contents = [document.content for document in batch]
+            datas = [DocumentContent.compress(content) for content in contents]
+
+            DocumentRevision.add_revisions(batch, contents, datas, created=created)
+            DocumentContent.objects.bulk_create(
+                [
+                    DocumentContent(document_id=document.id, data=data)
+                    for document, data in zip(batch, datas)
+                ],
+                update_conflicts=True,
+                unique_fields=["document"],
+                update_fields=["data"],
+            )
+            self.update_derived_fields(
+                "unnest(%s::bigint[], %s::text[]) AS c(id, content)",
+                [[document.id for document in batch], contents],
+            )
+
+            for document in batch:
+                document._content_changed = False
+                document._loaded_title = document.title
+                document._state.fields_cache.pop("stored_content", None)
+
+    @classmethod
+    def update_derived_fields(self, contents, params=()):
+        """Sets search_vector, content_length and excerpt of documents from their content.
 
-class DocumentSerializer(serializers.ModelSerializer):
-    topics = TopicSerializer(many=True, required=False)
+        contents is an SQL FROM item with id and content columns, params its query params. Used
+        by save_contents() and when importing, see the import_corpus command.
+
+        Example: Document.update_derived_fields("import_document AS c")
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                self._UPDATE_DERIVED_FIELDS.format(
+                    table=self._meta.db_table, contents=contents
+                ),
+                [self.SEARCH_CONFIG, self.SEARCH_CONFIG, *params],
+            )
+
+    @classmethod
+    def update_counts(self, folders=None, topics=None, documents=None):
+        """Adds to the documents_count of folders and topics, in the current transaction.
+
+        Rationale: Listings show how many documents each folder and topic has, counting them on
+        every request would mean joining/scanning the documents each time. Only non-deleted
+        documents are counted.
+
+        folders: {folder id: change of its count}
+        topics: {topic id: change of its count}
+        documents: {document id: 1 if it's now counted (restored), -1 if it isn't (deleted)},
+                   the counts of the document's topics change by that
+
+        save(), bulk_create(), Folder.set_subtree_deleted(), Topic.add/remove_documents_in_bulk and
+        the topics/documents related managers call this, anything else changing documents or
+        memberships should too (e.g. bulk_create of memberships). Updated rows get their updated_at
+        bumped, see docmngr.conditional. recount_documents fixes counts that drifted anyway, e.g.
+        because of raw SQL or hard deletes.
+
+        Example: Document.update_counts(folders={old.id: -1, new.id: 1})
+        """
+        if folders:
+            _add_to_documents_counts(Folder, _DELTAS, folders)
+        if topics:
+            _add_to_documents_counts(Topic, _DELTAS, topics)
+        if documents:
+            memberships = Topic.documents.through._meta.db_table
+            _add_to_documents_counts(
+                Topic, _DOCUMENT_TOPIC_DELTAS.format(memberships=memberships), documents
+            )
+
+    @classmethod
+    def recount(self):
+        """Sets the documents_count of every folder and topic to its actual count.
+
+        Returns the number of folders and topics whose count was off.
+        """
+        Membership = Topic.documents.through
+        with connection.cursor() as cursor:
+            counts = []
+            for model, join in [
+                (Folder, f"{self._meta.db_table} d ON d.folder_id = r.id"),
+                (
+                    Topic,
+                    f"""{Membership._meta.db_table} m ON m.topic_id = r.id
+                    LEFT JOIN {self._meta.db_table} d ON d.id = m.document_id""",
+                ),
+            ]:
+                table = model._meta.db_table
+                cursor.execute(f"""
+                    UPDATE {table} t SET documents_count = c.count, updated_at = now()
+                    FROM (
+                        SELECT r.id, count(d.id) FILTER (WHERE NOT d.is_deleted) AS count
+                        FROM {table} r
+                        LEFT JOIN {join}
+                        GROUP BY r.id
+                    ) c
+                    WHERE t.id = c.id AND t.documents_count <> c.count
+                    """)
+                counts.append(cursor.rowcount)
+
+        return tuple(counts)
+
+    @classmethod
+    def reindex(self, batch_size=1000):
+        """Sets the fields derived from the content of every document again, see save_contents.
+
+        e.g. after changing SEARCH_CONFIG. Goes through the documents in batches of batch_size,
+        each in a transaction of its own. Returns the number of documents reindexed.
+        """
+        count = 0
+        last_id = 0
+        while True:
+            batch = list(
+                DocumentContent.objects.filter(document_id__gt=last_id)
+                .order_by("document_id")
+                .values_list("document_id", "data")[:batch_size]
+            )
+            if not batch:
+                return count
+
+            with transaction.atomic():
+                self.update_derived_fields(
+                    "unnest(%s::bigint[], %s::text[]) AS c(id, content)",
+                    [
+                        [pk for pk, _ in batch],
+                        [DocumentContent.decompress(data) for _, data in batch],
+                    ],
+                )
+            count += len(batch)
+            last_id = batch[-1][0]
+
+    @classmethod
+    def highlight(self, contents, terms):
+        """Returns a snippet of each content with the search terms highlighted, using one query.
+
+        terms are in web search syntax, like in a websearch SearchQuery. Tags are stripped from
+        the contents first so they don't end up in the snippets.
+
+        Example: Document.highlight(["<p>The quick brown fox</p>"], "fox")
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT ts_headline(
+                    %s::regconfig,
+                    regexp_replace(content, '<[^>]*>', ' ', 'g'),
+                    websearch_to_tsquery(%s::regconfig, %s),
+                    'StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15'
+                )
+                FROM unnest(%s::text[]) WITH ORDINALITY AS c(content, position)
+                ORDER BY position
+                """,
+                [self.SEARCH_CONFIG, self.SEARCH_CONFIG, terms, contents],
+            )
+            return [snippet for snippet, in cursor.fetchall()]
+
+    # Same plain text as the excerpt, tags stripped and whitespace collapsed.
+    _UPDATE_DERIVED_FIELDS = r"""
+        UPDATE {table} d SET
+            search_vector = setweight(to_tsvector(%s::regconfig, d.title), 'A')
+                || setweight(to_tsvector(%s::regconfig, c.content), 'B'),
+            content_length = char_length(c.text),
+            excerpt = left(c.text, 200)
+        FROM (
+            SELECT id, content, btrim(
+                regexp_replace(regexp_replace(content, '<[^>]*>', ' ', 'g'), '\s+', ' ', 'g')
+            ) AS text
+            FROM {contents}
+        ) c
+        WHERE d.id = c.id
+    """
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="document_search_idx"),
+            # These support keyset pagination of document listings, see docmngr.pagination
+            models.Index(
+                fields=["folder", "created_at", "id"],
+                name="document_folder_page_idx",
+                condition=models.Q(is_deleted=False),
+            ),
+            models.Index(
+                fields=["created_at", "id"],
+                name="document_page_idx",
+                condition=models.Q(is_deleted=False),
+            ),
+        ]
+
+
+# Rows of (id, change of the count), from a dict.
+_DELTAS = "SELECT * FROM unnest(%s::bigint[], %s::integer[]) AS d(id, delta)"
+
+# Rows of (topic id, change of the count), from a dict of changes by document.
+_DOCUMENT_TOPIC_DELTAS = """
+    SELECT m.topic_id AS id, sum(d.delta)::integer AS delta
+    FROM unnest(%s::bigint[], %s::integer[]) AS d(document_id, delta)
+    JOIN {memberships} m USING (document_id)
+    GROUP BY m.topic_id
+"""
+
+
+def _add_to_documents_counts(model, deltas_sql, deltas):
+    """Adds the deltas made by deltas_sql from the deltas dict to the counts of model's rows."""
+    deltas = sorted((pk, delta) for pk, delta in deltas.items() if delta)
+    if not deltas:
+        return
+
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        # Rows are locked in id order, so concurrent updates of the same rows can't deadlock.
+        cursor.execute(
+            f"""
+            WITH deltas AS MATERIALIZED ({deltas_sql}),
+            locked AS MATERIALIZED (
+                SELECT id FROM {table}
+                WHERE id IN (SELECT id FROM deltas WHERE delta <> 0)
+                ORDER BY id
+                FOR UPDATE
+            )
+            UPDATE {table} t
+            SET documents_count = t.documents_count + deltas.delta, updated_at = now()
+            FROM deltas
+            JOIN locked USING (id)
+            WHERE t.id = deltas.id
+            """,
+            [[pk for pk, _ in deltas], [delta for _, delta in deltas]],
+        )
+
+
+class DocumentContent(models.Model):
+    """The compressed content of a document, see Document.content."""
+
+    document = models.OneToOneField(
+        Document,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stored_content",
+    )
+    # zlib compressed UTF-8
+    data = models.BinaryField()
+
+    COMPRESSION_LEVEL = 6
+
+    @property
+    def text(self):
+        return self.decompress(self.data)
+
+    @text.setter
+    def text(self, value):
+        self.data = self.compress(value)
+
+    @classmethod
+    def compress(self, text):
+        return zlib.compress(text.encode(), self.COMPRESSION_LEVEL)
+
+    @staticmethod
+    def decompress(data):
+        return zlib.decompress(data).decode()
+
+
+class DocumentRevision(models.Model):
+    """A past version of a document's title and content. Saving a document adds one.
+
+    Rationale: Documents are big and get saved often, keeping a full copy of every version would
+    take far too much space. Instead most revisions store a delta from the previous revision,
+    and every SNAPSHOT_INTERVAL revisions (or when the delta wouldn't be smaller) a full copy.
+    Saving only costs diffing against the current content, and reading any revision means
+    applying at most SNAPSHOT_INTERVAL - 1 deltas to the snapshot before it, see load().
+
+    Revisions are numbered from 1 per document. The latest one is the document's current state.
+    """
+
+    document = models.ForeignKey(
+        Document, on_delete=models.CASCADE, related_name="revisions"
+    )
+    number = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    title = models.CharField(max_length=240)
+    is_snapshot = models.BooleanField()
+    # zlib compressed, the content itself for snapshots (same as DocumentContent.data) or else
+    # a delta from the previous revision's content, see diff().
+    data = models.BinaryField()
+
+    SNAPSHOT_INTERVAL = 10
+    # Number of tokens that have to match for diff() to copy from the old content.
+    DIFF_WINDOW = 8
+
+    # Contents are diffed as sequences of tags, whitespace and words.
+    _TOKENS = re.compile(r"(<[^>]*>|\s+)")
+
+    @classmethod
+    def add_revisions(self, documents, contents, datas, created=False):
+        """Adds a revision for each saved document whose title or content has changed.
+
+        Has to run before the new contents are stored. datas are the compressed contents.
+        Used by Document.save_contents, there's no need to call it directly.
+        """
+        # Concurrent saves of a document can't both pick the same number, as Document.save()
+        # holds a lock on the document row by the time this runs.
+        previous = {}
+        if not created:
+            previous = {
+                document_id: rest
+                for document_id, *rest in DocumentContent.objects.filter(
+                    document__in=[document.id for document in documents]
+                )
+                .annotate(
+                    latest=Max("document__revisions__number"),
+                    latest_snapshot=Max(
+                        "document__revisions__number",
+                        filter=Q(document__revisions__is_snapshot=True),
+                    ),
+                )
+                .values_list("document", "data", "latest", "latest_snapshot")
+            }
+
+        revisions = []
+        for document, content, data in zip(documents, contents, datas):
+            previous_data, latest, latest_snapshot = previous.get(
+                document.id, (None, 0, None)
+            )
+            revision = DocumentRevision(
+                document_id=document.id,
+                number=(latest or 0) + 1,
+                title=document.title,
+                is_snapshot=True,
+                data=data,
+            )
+
+            if previous_data is not None:
+                previous_content = DocumentContent.decompress(previous_data)
+                if previous_content == content and document.title == getattr(
+                    document, "_loaded_title", None
+                ):
+                    continue
+
+                if (
+                    latest_snapshot is not None
+                    and revision.number - latest_snapshot < self.SNAPSHOT_INTERVAL
+                ):
+                    delta = self.diff(previous_content, content)
+                    if len(delta) < len(data):
+                        revision.is_snapshot = False
+                        revision.data = delta
+
+            revisions.append(revision)
+
+        self.objects.bulk_create(revisions)
+
+    @classmethod
+    def load(self, document_id, number):
+        """Returns a document's revision with its content (in `content`), using one query.
+
+        Raises DocumentRevision.DoesNotExist if the document has no such revision.
+
+        Example: DocumentRevision.load(document.id, 3).content
+        """
+        snapshot = (
+            self.objects.filter(
+                document=document_id, number__lte=number, is_snapshot=True
+            )
+            .order_by("-number")
+            .values("number")[:1]
+        )
+        revisions = list(
+            self.objects.filter(
+                document=document_id,
+                number__lte=number,
+                number__gte=models.Subquery(snapshot),
+            ).order_by("number")
+        )
+        if not revisions or revisions[-1].number != number:
+            raise self.DoesNotExist
+
+        for revision in revisions:
+            if revision.is_snapshot:
+                content = DocumentContent.decompress(revision.data)
+            else:
+                content = self.patch(content, revision.data)
+
+        revision.content = content
+        return revision
+
+    @classmethod
+    def diff(self, old, new):
+        """Returns a compressed delta that turns old into new, see patch().
+
+        The delta is a JSON list of [start, end] ranges to copy from old and strings to insert.
+
+        Rationale: This runs on every save, so it has to take linear time even for huge
+        documents, which rules out difflib. Instead runs of DIFF_WINDOW tokens of old are
+        indexed, and new is matched against old from wherever its next run is found. Deltas
+        aren't minimal but for small edits they are tiny.
+        """
+        old_tokens = self._tokenize(old)
+        offsets = list(accumulate(map(len, old_tokens), initial=0))
+        new_tokens = self._tokenize(new)
+
+        runs = defaultdict(list)
+        for i in range(len(old_tokens) - self.DIFF_WINDOW + 1):
+            end = i + self.DIFF_WINDOW
+            runs[tuple(old_tokens[i:end])].append(i)
+
+        delta = []
+        inserted = []
+        copy_start = i = None
+        # Where the last copy ended, runs found after it are preferred to keep copies in order.
+        copied = 0
+        j = 0
+        while j < len(new_tokens):
+            if i is not None and i < len(old_tokens) and old_tokens[i] == new_tokens[j]:
+                i += 1
+                j += 1
+                continue
+
+            if i is not None:
+                delta.append([offsets[copy_start], offsets[i]])
+                copied = i
+                i = None
+            end = j + self.DIFF_WINDOW
+            matches = runs.get(tuple(new_tokens[j:end]))
+            if matches is None:
+                inserted.append(new_tokens[j])
+                j += 1
+            else:
+                if inserted:
+                    delta.append("".join(inserted))
+                    inserted = []
+                after = bisect_left(matches, copied)
+                copy_start = i = matches[after if after < len(matches) else 0]
+
+        if i is not None:
+            delta.append([offsets[copy_start], offsets[i]])
+        if inserted:
+            delta.append("".join(inserted))
+
+        return zlib.compress(
+            json.dumps(delta, separators=(",", ":")).encode(),
+            DocumentContent.COMPRESSION_LEVEL,
+        )
+
+    @classmethod
+    def _tokenize(self, content):
+        return [token for token in self._TOKENS.split(content) if token]
+
+    @staticmethod
+    def patch(old, delta):
+        """Applies a delta made by diff() to old."""
+        return "".join(
+            operation if isinstance(operation, str) else old[slice(*operation)]
+            for operation in json.loads(zlib.decompress(delta))
+        )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["document", "number"], name="unique revision number"
+            )
+        ]
+        indexes = [
+            # Supports keyset pagination of revision listings, see docmngr.pagination
+            models.Index(
+                fields=["document", "created_at", "id"],
+                name="revision_page_idx",
+            ),
+        ]
+
+
+class DocumentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    topics = TopicSummarySerializer(many=True, required=False)
+    # Not a model field, see Document.content
+    content = serializers.CharField()
+    folder = serializers.PrimaryKeyRelatedField(queryset=Folder.without_deleted())
 
     class Meta:
         model = Document
@@ -122,3 +1148,272 @@ class DocumentSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+
+
+class BulkDocumentSerializer(serializers.Serializer):
+    """Validates one document of a bulk create request.
+
+    Folder and topics are plain ids here, their existence is checked for the whole batch at once
+    rather than with a query per document like DocumentSerializer would.
+    """
+
+    title = serializers.CharField(max_length=240)
+    content = serializers.CharField()
+    folder = serializers.IntegerField()
+    topics = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+
+
+class BulkTopicsSerializer(serializers.Serializer):
+    """Validates a bulk request to add or remove many documents to/from many topics."""
+
+    documents = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False
+    )
+    topics = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+
+class DocumentSummarySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Read-only summary of a document for listings, leaves out the full content.
+
+    Rationale: The content of a document can be megabytes of rich text, so listing a folder with
+    DocumentSerializer would be very heavy. Reading content_length and excerpt instead means the
+    content isn't read from the database at all.
+    """
+
+    topics = TopicSummarySerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Document
+        fields = [
+            "id",
+            "title",
+            "folder",
+            "topics",
+            "created_at",
+            "updated_at",
+            "content_length",
+            "excerpt",
+        ]
+        read_only_fields = fields
+
+
+class DocumentRevisionSummarySerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
+    """Read-only summary of a document revision for listings, leaves out the content."""
+
+    class Meta:
+        model = DocumentRevision
+        fields = ["number", "title", "created_at"]
+        read_only_fields = fields
+
+
+class DocumentRevisionSerializer(DocumentRevisionSummarySerializer):
+    """Read-only document revision, content included. See DocumentRevision.load."""
+
+    content = serializers.CharField(read_only=True)
+
+    class Meta(DocumentRevisionSummarySerializer.Meta):
+        fields = ["number", "title", "content", "created_at"]
+        read_only_fields = fields
+
+
+# #########################
+# ####     Changes      ###
+# #########################
+
+
+class Change(models.Model):
+    """A change to a folder, document or topic, in the feed clients sync from (/changes/).
+
+    Rationale: Clients used to re-download whole folders to find out what changed. With the
+    feed they fetch the changes since the last one they saw, which is an index range scan of
+    just those rows, then fetch the objects that changed.
+
+    Changes are ordered by (xid, id), xid being the id of the transaction that made them.
+    Transactions don't commit in the order they start, so a change with a lower id can become
+    visible after one with a higher id. The feed would skip it if it returned both in id order.
+    Instead it only returns changes of transactions older than every transaction still running
+    (the xmin of the current snapshot). Anything committed later has a higher xid, so it comes
+    after every change already returned. Changes of one transaction keep the order they
+    were made in.
+
+    A long running transaction holds the feed back until it ends, it doesn't lose changes.
+
+    Views record changes with Change.record, in the same transaction as the change itself. It
+    pushes them to live subscribers too, see docmngr.push.
+    Deleting or restoring a folder records one change for the whole subtree.
+    """
+
+    KINDS = ["folder", "document", "topic"]
+    ACTIONS = [
+        "created",
+        "updated",
+        "moved",
+        "deleted",
+        "restored",
+        # The document was added to/removed from topics
+        "tagged",
+        "untagged",
+    ]
+
+    xid = models.BigIntegerField(editable=False)
+    kind = models.CharField(max_length=20, choices=[(kind, kind) for kind in KINDS])
+    object_id = models.BigIntegerField()
+    action = models.CharField(
+        max_length=20, choices=[(action, action) for action in ACTIONS]
+    )
+    created_at = models.DateTimeField()
+
+    @classmethod
+    def record(self, kind, object_ids, action, channels=()):
+        """Records the same change to each of the objects, using one INSERT.
+
+        The changes are pushed to the subscribers of the objects and of the given channels
+        (e.g. the folder the objects are in) once the transaction commits, see docmngr.push.
+        """
+        object_ids = list(object_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                self.record_sql("unnest(%s::bigint[])"),
+                [kind, action, object_ids],
+            )
+
+        push.publish(push.change(kind, pk, action, channels) for pk in object_ids)
+
+    @classmethod
+    def record_sql(self, objects):
+        """Returns the INSERT of record(), for the object ids the objects SQL FROM item returns.
+
+        Takes the kind and action as query params, for statements recording changes themselves.
+        """
+        return self._RECORD.format(table=self._meta.db_table, objects=objects)
+
+    # The xid is recorded the same way the feed reads it, see visible().
+    _RECORD = """
+        INSERT INTO {table} (xid, kind, object_id, action, created_at)
+        SELECT txid_current(), %s, object_id, %s, now() FROM {objects} AS o(object_id)
+    """
+
+    @classmethod
+    def visible(self):
+        """Returns a queryset of the changes the feed can return, see the class docstring."""
+        return self.objects.filter(xid__lt=RawSQL(self._XMIN, []))
+
+    @classmethod
+    def current_xmin(self):
+        """Returns the xid every change recorded from now on is at least."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT {self._XMIN}")
+            return cursor.fetchone()[0]
+
+    _XMIN = "txid_snapshot_xmin(txid_current_snapshot())"
+
+    class Meta:
+        indexes = [models.Index(fields=["xid", "id"], name="change_feed_idx")]
+
+
+class ChangeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Change
+        fields = ["kind", "object_id", "action", "created_at"]
+        read_only_fields = fields
+
+
+# #########################
+# ####       Jobs       ###
+# #########################
+
+
+class Job(models.Model):
+    """A call of a background job function, run by the run_worker command. See docmngr.jobs.
+
+    Workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any number of them can poll
+    the table without waiting on each other or running a job twice at the same time.
+
+    run_after is when the job can next be claimed: when it's due while queued, and when its
+    worker is presumed lost while running (a lease of DOCMNGR_JOB_TIMEOUT seconds). A job whose
+    worker died is claimed again then, so jobs run at least once, and should be safe to repeat.
+    """
+
+    STATUSES = ["queued", "running", "succeeded", "failed"]
+
+    name = models.CharField(max_length=100)
+    arguments = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=20,
+        choices=[(status, status) for status in STATUSES],
+        default="queued",
+    )
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField()
+    run_after = models.DateTimeField(default=timezone.now)
+    # Return value of the job function, or the error of its last attempt
+    result = models.JSONField(null=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    @classmethod
+    def claim(self, timeout):
+        """Marks the next job that's due as running, returns it or None if none is due."""
+        jobs = list(
+            self.objects.raw(
+                f"""
+                UPDATE {self._meta.db_table} SET
+                    status = 'running',
+                    attempts = attempts + 1,
+                    started_at = now(),
+                    run_after = now() + make_interval(secs => %s)
+                WHERE id = (
+                    SELECT id FROM {self._meta.db_table}
+                    WHERE status IN ('queued', 'running') AND run_after <= now()
+                    ORDER BY run_after, id
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING *
+                """,
+                [timeout],
+            )
+        )
+        return jobs[0] if jobs else None
+
+    def finish(self, **fields):
+        """Updates the job with the outcome of its current attempt.
+
+        Does nothing if the job was claimed again meanwhile (its worker was presumed lost), so
+        the late outcome doesn't overwrite the new attempt's. Returns whether it was updated.
+        """
+        return bool(
+            Job.objects.filter(pk=self.pk, attempts=self.attempts).update(**fields)
+        )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["run_after", "id"],
+                name="job_queue_idx",
+                condition=models.Q(status__in=["queued", "running"]),
+            )
+        ]
+
+
+class JobSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            "id",
+            "name",
+            "status",
+            "attempts",
+            "result",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
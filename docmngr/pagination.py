@@ -0,0 +1,160 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Paginates a queryset by (created_at, id) using opaque cursors.
+
+    Rationale: Unlike OFFSET pagination, fetching a page is an index range scan starting right
+    after the last row of the previous page, so it costs the same no matter how deep you page.
+    Models paginated this way should have an index on their filter columns plus (created_at, id).
+
+    The response body is the plain list of results, same as an unpaginated response. If there
+    are more results the URL of the next page is given in a `Link: <url>; rel="next"` header.
+
+    Query params:
+        limit: Max number of results on the page, defaults to the DOCMNGR_PAGE_SIZE setting
+        cursor: Opaque cursor taken from the previous page's next link
+    """
+
+    limit_query_param = "limit"
+    cursor_query_param = "cursor"
+    max_limit = 1000
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._set_page(list(self._get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Same as paginate_queryset, for async views. See docmngr.async_views."""
+        queryset = self._get_page_queryset(queryset, request)
+        return self._set_page([obj async for obj in queryset])
+
+    def _get_page_queryset(self, queryset, request):
+        self.request = request
+        self.limit = self.get_limit(request)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            created_at, pk = position
+            # The redundant created_at__gte lets Postgres start the index scan at the cursor
+            # instead of filtering its way there.
+            queryset = queryset.filter(created_at__gte=created_at).filter(
+                Q(created_at__gt=created_at) | Q(id__gt=pk)
+            )
+
+        # Fetch one extra row to find out if there's a next page.
+        return queryset.order_by("created_at", "id")[: self.limit + 1]
+
+    def _set_page(self, results):
+        self.has_next = len(results) > self.limit
+        results = results[: self.limit]
+        self.last = results[-1] if results else None
+
+        return results
+
+    def get_paginated_response(self, data):
+        headers = {}
+        next_link = self.get_next_link()
+        if next_link is not None:
+            headers["Link"] = f'<{next_link}>; rel="next"'
+
+        return Response(data, headers=headers)
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return settings.DOCMNGR_PAGE_SIZE
+
+        return max(1, min(limit, self.max_limit))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.last)
+        )
+
+    def encode_cursor(self, obj):
+        # Pages of `.values()` querysets are dicts, see docmngr.fast_serializers.
+        if isinstance(obj, dict):
+            created_at, pk = obj["created_at"], obj["id"]
+        else:
+            created_at, pk = obj.created_at, obj.id
+        position = json.dumps([created_at.isoformat(), pk])
+        return urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, request):
+        """Returns the (created_at, id) position of the cursor, or None on the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            created_at, pk = json.loads(urlsafe_b64decode(encoded.encode()))
+            return datetime.fromisoformat(created_at), int(pk)
+        except (DecodeError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class ChangeFeedPagination(KeysetPagination):
+    """Paginates the change feed by (xid, id), see docmngr.models.Change.
+
+    Same as KeysetPagination, except that the cursor is the `since` query param and that the
+    next link is always given: while pages are full it leads to the next page, after that it's
+    where to poll for changes made later. Start from the beginning of the feed without `since`,
+    or from the current position with `since=now` (e.g. right before downloading everything).
+    """
+
+    cursor_query_param = "since"
+
+    def _get_page_queryset(self, queryset, request):
+        self.request = request
+        self.limit = self.get_limit(request)
+
+        if request.query_params.get(self.cursor_query_param) == "now":
+            self.position = (queryset.model.current_xmin(), 0)
+        else:
+            self.position = self.decode_cursor(request) or (0, 0)
+
+        xid, pk = self.position
+        # Same as in KeysetPagination, the redundant xid__gte starts the index scan at the cursor.
+        queryset = queryset.filter(xid__gte=xid).filter(Q(xid__gt=xid) | Q(id__gt=pk))
+        return queryset.order_by("xid", "id")[: self.limit + 1]
+
+    def get_next_link(self):
+        position = self.position
+        if self.last is not None:
+            position = (self.last.xid, self.last.id)
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_position(position)
+        )
+
+    def encode_position(self, position):
+        return urlsafe_b64encode(json.dumps(list(position)).encode()).decode()
+
+    def decode_cursor(self, request):
+        """Returns the (xid, id) position of the cursor, or None without one."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            xid, pk = json.loads(urlsafe_b64decode(encoded.encode()))
+            return int(xid), int(pk)
+        except (DecodeError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
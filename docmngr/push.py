@@ -0,0 +1,362 @@
+"""Live change events pushed to clients as Server-Sent Events, at /events/ of the ASGI app.
+
+Rationale: Clients used to poll folders and documents every few seconds to see other people's
+edits, which was most of the requests we served. Instead they can keep one connection open and
+be told when something they show changes, then fetch it (or sync with /changes/).
+
+Subscribe by opening `/events/?folders=1,2&documents=3&topics=4` (any of the params, up to
+MAX_CHANNELS ids in all), e.g. with the browser's EventSource. Each change is sent as
+
+    event: change
+    data: {"kind": "document", "object_id": 3, "action": "updated"}
+
+to the subscribers of its channel:
+
+    folder:<pk>     The folder, and its direct children (folders and documents)
+    document:<pk>   The document
+    topic:<pk>      The topic, and documents being added to/removed from it
+
+Views publish the same changes they record in the change feed (see Change.record), once their
+transaction commits. Deleting or restoring a folder is one event about that folder, like in the
+feed. Comments are sent every DOCMNGR_PUSH_HEARTBEAT seconds to keep idle connections open. A
+subscriber that falls DOCMNGR_PUSH_QUEUE_SIZE events behind gets an `overflow` event and is
+disconnected, it should sync from the change feed before subscribing again.
+
+Events go through the Broker of the process, which holds its subscriptions. An idle
+subscription is a queue and a couple of suspended coroutines, with no thread, timer or
+database connection of its own, so a worker can hold thousands. The backend in the
+DOCMNGR_PUSH_BACKEND setting carries events between processes:
+
+    InMemoryBackend     Only this process, e.g. in tests and development
+    PostgresBackend     Every process using the database, with NOTIFY/LISTEN
+
+This needs an ASGI server, see the README. Django 4.2 doesn't tell views a client went away
+while streaming a response, so this is a plain ASGI app rather than a view.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+import psycopg2
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Query params of /events/, by the kind of object they're ids of.
+KINDS = {"folders": "folder", "documents": "document", "topics": "topic"}
+MAX_CHANNELS = 1000
+
+_OVERFLOW = object()
+
+
+def folder_channels(folder):
+    """Channels of the folder a folder is in, to publish its changes to as well."""
+    if folder.parent_folder_id is None:
+        return []
+    return [f"folder:{folder.parent_folder_id}"]
+
+
+def document_channels(document):
+    """Channels of the folder a document is in, to publish its changes to as well."""
+    return [f"folder:{document.folder_id}"]
+
+
+def change(kind, object_id, action, channels=()):
+    """Returns the (channels, event) pair of a change to an object, see Change.record."""
+    event = {"kind": kind, "object_id": object_id, "action": action}
+    return [f"{kind}:{object_id}", *channels], event
+
+
+def publish(events):
+    """Publishes (channels, event) pairs once the current transaction commits."""
+    events = [(list(channels), event) for channels, event in events]
+    if events:
+        transaction.on_commit(lambda: _publish_committed(events))
+
+
+def _publish_committed(events):
+    # The writes are committed by now, failing to push them mustn't fail the request.
+    try:
+        get_broker().backend.publish(events)
+    except Exception:
+        logger.exception("Publishing %s push events failed", len(events))
+
+
+class Subscription:
+    """Queue of the events of a set of channels, read in the event loop that subscribed."""
+
+    def __init__(self, channels):
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(settings.DOCMNGR_PUSH_QUEUE_SIZE)
+
+    def put(self, event):
+        """Queues an event, or the overflow marker if the subscriber is too far behind."""
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = _OVERFLOW
+        self.queue.put_nowait(event)
+
+
+class Broker:
+    """Delivers events published by any process to the subscriptions of this one."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        # Subscriptions by channel. Events are delivered from the backend's thread, and
+        # published from the threads of sync views.
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = Subscription(set(channels))
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].add(subscription)
+        self.backend.start(self.deliver)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions[channel]
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[channel]
+
+    def deliver(self, events):
+        """Queues (channels, event) pairs for the subscriptions of any of their channels."""
+        for channels, event in events:
+            with self._lock:
+                subscriptions = set().union(
+                    *(self._subscriptions.get(channel, ()) for channel in channels)
+                )
+            for subscription in subscriptions:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+
+
+class InMemoryBackend:
+    """Delivers events to the subscriptions of this process only."""
+
+    def start(self, deliver):
+        self.deliver = deliver
+
+    def stop(self):
+        self.deliver = None
+
+    def publish(self, events):
+        deliver = getattr(self, "deliver", None)
+        if deliver is not None:
+            deliver(events)
+
+
+class PostgresBackend:
+    """Delivers events to every process with NOTIFY, on the database of the `default` alias.
+
+    Processes with subscriptions LISTEN on a connection of their own, in a daemon thread that
+    reconnects if the connection drops. Events published while it's down are lost, clients
+    recover from the change feed same as after an overflow.
+    """
+
+    channel = "docmngr_push"
+    # NOTIFY payloads must be under 8000 bytes.
+    max_payload = 7000
+    # Seconds between checks for stop() while waiting for notifications
+    poll_timeout = 5
+    reconnect_delay = 5
+
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def start(self, deliver):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._listen, args=(deliver,), daemon=True
+                )
+                self._thread.start()
+
+    def stop(self):
+        """Stops listening, within poll_timeout seconds."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def publish(self, events):
+        # As few NOTIFYs as fit the events.
+        batches = [[]]
+        size = 0
+        for pair in self._split(events):
+            length = len(json.dumps(pair))
+            if batches[-1] and size + length > self.max_payload:
+                batches.append([])
+                size = 0
+            batches[-1].append(pair)
+            size += length
+
+        # One statement, so listeners get all of the notifications or none.
+        with connections["default"].cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload",
+                [self.channel, [json.dumps(batch) for batch in batches]],
+            )
+
+    def _split(self, events):
+        """Yields [channels, event] pairs, splitting events with too many channels to notify.
+
+        A subscriber of channels in several parts of an event gets it once per part.
+        """
+        for channels, event in events:
+            part = []
+            size = len(json.dumps([[], event]))
+            for channel in channels:
+                # The channel in quotes, and a comma
+                length = len(json.dumps(channel)) + 1
+                if part and size + length > self.max_payload:
+                    yield [part, event]
+                    part = []
+                    size = len(json.dumps([[], event]))
+                part.append(channel)
+                size += length
+            yield [part, event]
+
+    def _listen(self, deliver):
+        params = connections["default"].get_connection_params()
+        while not self._stopped.is_set():
+            connection = None
+            try:
+                connection = psycopg2.connect(**params)
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel}")
+                while not self._stopped.is_set():
+                    select.select([connection], [], [], self.poll_timeout)
+                    connection.poll()
+                    while connection.notifies:
+                        notify = connection.notifies.pop(0)
+                        deliver(json.loads(notify.payload))
+            except Exception:
+                logger.exception("Listening for push events failed, reconnecting")
+                self._stopped.wait(self.reconnect_delay)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Returns the Broker of this process, with the backend in DOCMNGR_PUSH_BACKEND."""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = Broker(import_string(settings.DOCMNGR_PUSH_BACKEND)())
+        return _broker
+
+
+def parse_channels(query_string):
+    """Returns the channels /events/ query params subscribe to, see the module docstring.
+
+    Raises ValueError if the params are invalid.
+    """
+    params = parse_qs(query_string)
+    channels = set()
+    for param, values in params.items():
+        if param not in KINDS:
+            raise ValueError(f"Unknown parameter {param}")
+        for value in values:
+            channels.update(f"{KINDS[param]}:{int(pk)}" for pk in value.split(","))
+
+    if not channels:
+        raise ValueError(f"Give ids of any of {', '.join(KINDS)}")
+    if len(channels) > MAX_CHANNELS:
+        raise ValueError(f"At most {MAX_CHANNELS} ids can be given")
+
+    return channels
+
+
+async def event_stream(scope, receive, send):
+    """ASGI app sending the events of the channels in the query params, see module docstring."""
+    try:
+        channels = parse_channels(scope["query_string"].decode("latin1"))
+    except ValueError as error:
+        await _send_error(send, str(error))
+        return
+
+    broker = get_broker()
+    subscription = broker.subscribe(channels)
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    getting = None
+    try:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                ],
+            }
+        )
+        await _send_body(send, b": subscribed\n\n")
+
+        while True:
+            if getting is None:
+                getting = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait(
+                [getting, disconnected],
+                timeout=settings.DOCMNGR_PUSH_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnected in done:
+                return
+            if getting not in done:
+                await _send_body(send, b": heartbeat\n\n")
+                continue
+
+            event, getting = getting.result(), None
+            if event is _OVERFLOW:
+                await _send_body(send, b"event: overflow\ndata: {}\n\n")
+                break
+            data = json.dumps(event).encode()
+            await _send_body(send, b"event: change\ndata: " + data + b"\n\n")
+
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        broker.unsubscribe(subscription)
+        disconnected.cancel()
+        if getting is not None:
+            getting.cancel()
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _send_body(send, body):
+    await send({"type": "http.response.body", "body": body, "more_body": True})
+
+
+async def _send_error(send, message):
+    body = json.dumps({"detail": message}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 400,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
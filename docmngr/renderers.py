@@ -0,0 +1,70 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Renders JSON with orjson, which is several times faster than the json module.
+
+    Opt-in by setting the DOCMNGR_ORJSON environment variable, see settings.py. Needs the orjson
+    extra installed: `poetry install -E orjson`.
+
+    Output is the same as JSONRenderer's, except that floats outside of [1e-4, 1e16) are written
+    in a different (but equivalent) notation e.g. 1e-05 becomes 0.00001. Falls back to
+    JSONRenderer when orjson isn't installed, for indented output (e.g. `Accept:
+    application/json; indent=4`), and for non-default UNICODE_JSON/COMPACT_JSON/STRICT_JSON
+    settings.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (
+            orjson is None
+            or indent is not None
+            or not (
+                api_settings.UNICODE_JSON
+                and api_settings.COMPACT_JSON
+                and api_settings.STRICT_JSON
+            )
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Dates, times, lazy strings etc. are left to DRF's encoder, orjson formats them its own way.
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+
+        # Same as JSONRenderer, these are valid JSON but not valid JavaScript.
+        return ret.replace("\u2028".encode(), b"\\u2028").replace(
+            "\u2029".encode(), b"\\u2029"
+        )
+
+
+class NDJSONRenderer(JSONRenderer):
+    """Renders newline delimited JSON, lists get one item per line and anything else one line.
+
+    Document listings stream their results this way when it's the accepted media type, see
+    views._stream_documents. The counterpart of docmngr.parsers.NDJSONParser.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        items = data if isinstance(data, list) else [data]
+        return b"".join(self.render_line(item) for item in items)
+
+    def render_line(self, item):
+        return super().render(item) + b"\n"
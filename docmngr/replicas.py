@@ -0,0 +1,129 @@
+"""Routing of reads to read replicas, with clients that just wrote reading from the primary.
+
+Rationale: Reads of folders, documents and topics far outnumber writes, and all of them went to
+the primary. ReplicaMiddleware lets GET and HEAD requests to the DOCMNGR_REPLICA_PATHS read from
+one of the DOCMNGR_REPLICAS database aliases, picked at random per request, and ReplicaRouter
+sends their queries there. Writes, and reads inside a transaction, always go to the primary
+("default").
+
+Replicas lag behind the primary, so a client reading right after writing could get the data from
+before its write. A successful write request therefore sets a cookie pinning the client to the
+primary for DOCMNGR_REPLICA_PIN_SECONDS, which should exceed the usual replication lag. Other
+clients can see data that old, like they could before a write that happened a moment later.
+Clients that don't keep cookies aren't pinned, they can send `Cookie: docmngr_primary=1` to read
+from the primary.
+
+Cached responses (see docmngr.cache) rendered from a replica are only served to requests reading
+from a replica, and kept for at most DOCMNGR_REPLICA_PIN_SECONDS, as they could be from before
+the write that invalidated the previous ones. Streamed listings run their queries while being
+sent, after the middleware is done, so they read from the primary.
+
+Without replicas (DOCMNGR_REPLICAS empty, the default) everything reads from the primary and no
+cookie is set. See the settings for how replicas are configured.
+"""
+
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = "docmngr_primary"
+
+# Alias of the replica the current request reads from, None to read from the primary.
+_replica = ContextVar("docmngr_replica", default=None)
+
+
+def reading_from_replica():
+    """Whether queries of the current request outside of transactions go to a replica."""
+    return _replica.get() is not None
+
+
+class ReplicaRouter:
+    """Sends the reads of requests ReplicaMiddleware picked a replica for to it."""
+
+    def db_for_read(self, model, **hints):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Transactions should see their own writes, and the rows they lock.
+            return DEFAULT_DB_ALIAS
+        return _replica.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Not left to Django, which would write objects read from a replica back to it.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary.
+        return db not in settings.DOCMNGR_REPLICAS
+
+
+class ReplicaMiddleware:
+    """Picks the database the reads of a request go to, and pins clients that wrote.
+
+    See the module docstring.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = _replica.set(_pick_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica.reset(token)
+
+        return _pin_after_write(request, response)
+
+    async def __acall__(self, request):
+        token = _replica.set(_pick_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica.reset(token)
+
+        return _pin_after_write(request, response)
+
+
+def _pick_replica(request):
+    """Returns the alias of the replica to read from, None to read from the primary."""
+    replicas = settings.DOCMNGR_REPLICAS
+    if (
+        not replicas
+        or request.method not in ("GET", "HEAD")
+        or PIN_COOKIE in request.COOKIES
+        or not request.path_info.startswith(tuple(settings.DOCMNGR_REPLICA_PATHS))
+    ):
+        return None
+
+    return random.choice(replicas)
+
+
+def _pin_after_write(request, response):
+    if (
+        settings.DOCMNGR_REPLICAS
+        and request.method not in ("GET", "HEAD", "OPTIONS")
+        and response.status_code < 400
+    ):
+        response.set_cookie(
+            PIN_COOKIE,
+            "1",
+            max_age=settings.DOCMNGR_REPLICA_PIN_SECONDS,
+            httponly=True,
+            samesite="Lax",
+        )
+
+    return response
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+import dj_database_url
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -38,11 +41,14 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "docmngr.throttling.ThrottlingMiddleware",
+    "docmngr.replicas.ReplicaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -87,6 +93,30 @@ DATABASES = {
 }
 
 
+DATABASE_ROUTERS = ["docmngr.replicas.ReplicaRouter"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+if os.environ.get("REDIS_URL"):
+    # Shared between all processes, needs the redis package installed
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    # Per process, least recently used entries are evicted once full
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -128,7 +158,110 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-REST_FRAMEWORK = {"TEST_REQUEST_DEFAULT_FORMAT": "json"}
+REST_FRAMEWORK = {
+    "TEST_REQUEST_DEFAULT_FORMAT": "json",
+}
+
+if os.environ.get("DOCMNGR_ORJSON"):
+    # Faster JSON rendering, needs the orjson extra installed. See docmngr.renderers
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = [
+        "docmngr.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ]
+
+# Doc manager
+# Default page size of list endpoints, see docmngr.pagination
+DOCMNGR_PAGE_SIZE = 100
+# Max number of documents accepted by one bulk create request, and how many are inserted per query
+DOCMNGR_BULK_MAX_DOCUMENTS = 10000
+DOCMNGR_BULK_BATCH_SIZE = 1000
+# Max number of (document, topic) pairs one bulk (un)tagging request may touch
+DOCMNGR_BULK_MAX_TOPIC_PAIRS = 100000
+# Cache used for GET responses (see docmngr.cache), and how many seconds responses are kept for
+DOCMNGR_CACHE_ALIAS = "default"
+DOCMNGR_CACHE_TIMEOUT = 300
+# Number of documents read from the database and sent at a time by streamed listings
+DOCMNGR_STREAM_CHUNK_SIZE = 1000
+# Queries taking at least this many milliseconds are logged with DOCMNGR_TIMING on
+DOCMNGR_SLOW_QUERY_MS = 100
+# Carries live change events between processes (see docmngr.push), how many seconds idle event
+# streams send a heartbeat after, and how many events a subscriber can fall behind by
+DOCMNGR_PUSH_BACKEND = os.environ.get(
+    "DOCMNGR_PUSH_BACKEND", "docmngr.push.InMemoryBackend"
+)
+DOCMNGR_PUSH_HEARTBEAT = 15
+DOCMNGR_PUSH_QUEUE_SIZE = 100
+# Operations touching more rows than this are run by a background worker, see docmngr.jobs.
+# Attempts a job gets, seconds before retrying a failed one (doubling after each retry), and
+# seconds after which a job whose worker hasn't finished it is presumed lost and run again
+DOCMNGR_JOB_THRESHOLD = 5000
+DOCMNGR_JOB_MAX_ATTEMPTS = 3
+DOCMNGR_JOB_RETRY_DELAY = 10
+DOCMNGR_JOB_TIMEOUT = 3600
+# Token buckets of each route class, as (capacity, tokens added per second), every request of a
+# client takes a token of its bucket. See docmngr.throttling
+DOCMNGR_RATE_LIMITS = {
+    "read": (600, 10),
+    "write": (120, 2),
+    "bulk": (10, 0.1),
+}
+# Requests served at a time by all processes (None for no limit), more are answered with 503.
+# Keep it below the connections Postgres accepts. And seconds after which the count is reset
+DOCMNGR_MAX_CONCURRENT_REQUESTS = int(
+    os.environ.get("DOCMNGR_MAX_CONCURRENT_REQUESTS", 50)
+)
+DOCMNGR_CONCURRENCY_TIMEOUT = 300
+# Cache keeping the buckets and the count, and number of proxies adding to X-Forwarded-For
+DOCMNGR_THROTTLING_CACHE_ALIAS = "default"
+DOCMNGR_TRUSTED_PROXIES = int(os.environ.get("DOCMNGR_TRUSTED_PROXIES", 0))
+# Database aliases of the read replicas GET requests to DOCMNGR_REPLICA_PATHS read from (see
+# docmngr.replicas, set from DATABASE_REPLICA_URLS below), and how many seconds a client that
+# wrote reads from the primary for
+DOCMNGR_REPLICAS = []
+DOCMNGR_REPLICA_PATHS = ["/folders/", "/documents/", "/topics/", "/async/"]
+DOCMNGR_REPLICA_PIN_SECONDS = 10
+
 import django_heroku
 
 django_heroku.settings(locals())
+# Set by the call above, bound here so flake8 knows it and the loggers below can be added to it.
+LOGGING = locals()["LOGGING"]
+
+# Read replicas, as comma separated database URLs. Without them the "replica" alias is the
+# primary itself, enough to try the routing out by adding it to DOCMNGR_REPLICAS. Tests use the
+# primary's test database for every replica
+replica_urls = [
+    url for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url
+]
+if replica_urls:
+    DOCMNGR_REPLICAS = ["replica"] + [
+        f"replica_{number}" for number in range(2, len(replica_urls) + 1)
+    ]
+    for alias, url in zip(DOCMNGR_REPLICAS, replica_urls):
+        DATABASES[alias] = dj_database_url.parse(
+            url, conn_max_age=DATABASES["default"].get("CONN_MAX_AGE", 0)
+        )
+        DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+else:
+    DATABASES["replica"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+
+# Outcomes of background jobs, see docmngr.jobs
+LOGGING["loggers"]["docmngr.jobs"] = {
+    "handlers": ["console"],
+    "level": "INFO",
+}
+
+if os.environ.get("DOCMNGR_THROTTLING") == "off":
+    # No rate or concurrency limits, e.g. for load tests
+    MIDDLEWARE = [
+        m for m in MIDDLEWARE if m != "docmngr.throttling.ThrottlingMiddleware"
+    ]
+
+if os.environ.get("DOCMNGR_TIMING"):
+    # Server-Timing headers and logs of query/serialize/render times, see docmngr.timing. First,
+    # after django_heroku's middleware, so the timings include all the other middleware.
+    MIDDLEWARE = ["docmngr.timing.ServerTimingMiddleware", *MIDDLEWARE]
+    LOGGING["loggers"]["docmngr.timing"] = {
+        "handlers": ["console"],
+        "level": "INFO",
+    }
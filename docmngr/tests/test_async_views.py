@@ -0,0 +1,64 @@
+import pytest
+
+from docmngr.models import Document
+
+
+@pytest.fixture
+def corpus(document_1, document_2, deleted_document, topic_2, grandchild_folder):
+    document_1.topics.add(topic_2)
+    Document.objects.create(title="doc3 🎉", content="bar", folder=grandchild_folder)
+
+
+def sync_and_async_urls(
+    parent_folder, child_folder, deleted_folder, document_1, topic_1
+):
+    return [
+        "/folders/",
+        f"/folders/{parent_folder.id}/",
+        f"/folders/{parent_folder.id}/?depth=all",
+        f"/folders/{child_folder.id}/?depth=1",
+        "/folders/?depth=all",
+        "/folders/?depth=nope",
+        f"/folders/{deleted_folder.id}/",
+        f"/folders/{deleted_folder.id}/?depth=all",
+        f"/folders/{parent_folder.id}/documents/",
+        f"/folders/{parent_folder.id}/documents/?full=1",
+        f"/folders/{parent_folder.id}/documents/?topic={topic_1.id}",
+        f"/folders/{parent_folder.id}/documents/?limit=1",
+        f"/folders/{parent_folder.id}/documents/?cursor=nope",
+        f"/folders/{deleted_folder.id}/documents/",
+        f"/documents/{document_1.id}/",
+        "/documents/999/",
+        "/topics/",
+        "/topics/?limit=1",
+        f"/topics/{topic_1.id}/",
+        "/topics/999/",
+        f"/topics/{topic_1.id}/documents/",
+        "/topics/999/documents/",
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_views_respond_like_sync_views(
+    api_client, corpus, parent_folder, child_folder, deleted_folder, document_1, topic_1
+):
+    for url in sync_and_async_urls(
+        parent_folder, child_folder, deleted_folder, document_1, topic_1
+    ):
+        expected = api_client.get(url)
+        response = api_client.get(f"/async{url}")
+
+        assert response.status_code == expected.status_code, url
+        assert response.content == expected.content, url
+        assert response.get("Content-Type") == expected.get("Content-Type"), url
+        assert response.get("Link", "").replace("/async", "") == expected.get(
+            "Link", ""
+        ), url
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_views_are_read_only(api_client, parent_folder):
+    response = api_client.delete(f"/async/folders/{parent_folder.id}/")
+
+    assert response.status_code == 405
+    assert response.json() == {"detail": 'Method "DELETE" not allowed.'}
@@ -0,0 +1,176 @@
+import json
+
+import pytest
+
+from docmngr.models import Document
+
+
+# ##########################
+# ### Bulk Create Tests  ###
+# ##########################
+
+
+@pytest.mark.django_db(transaction=True)
+def test_creates_documents_in_bulk(api_client, parent_folder, topic_1, topic_2):
+    documents_data = [
+        {"title": "doc ✓", "content": "foo", "folder": parent_folder.id},
+        {
+            "title": "doc 2",
+            "content": "bar",
+            "folder": parent_folder.id,
+            "topics": [topic_1.id, topic_2.id, topic_1.id],
+        },
+    ]
+    response = api_client.post("/documents/bulk/", documents_data, format="json")
+    assert response.status_code == 201
+    assert response.data["errors"] == []
+
+    first, second = (Document.objects.get(pk=pk) for pk in response.data["created"])
+    assert first.title == "doc ✓"
+    assert list(first.topics.all()) == []
+    assert set(second.topics.all()) == {topic_1, topic_2}
+
+    # Bulk created documents get indexed for search like any other.
+    response = api_client.get("/documents/search/?q=bar", format="json")
+    assert [result["id"] for result in response.data] == [second.id]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_creates_documents_in_bulk_from_ndjson(api_client, parent_folder):
+    body = "\n".join(
+        json.dumps({"title": f"doc {i}", "content": "foo", "folder": parent_folder.id})
+        for i in range(3)
+    )
+    response = api_client.generic(
+        "POST", "/documents/bulk/", body, content_type="application/x-ndjson"
+    )
+    assert response.status_code == 201
+    assert len(response.data["created"]) == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reports_errors_of_invalid_documents_in_bulk(
+    api_client, parent_folder, deleted_folder, topic_1
+):
+    documents_data = [
+        {"title": "doc 1", "content": "foo", "folder": parent_folder.id},
+        {"content": "foo", "folder": parent_folder.id},
+        {"title": "doc 3", "content": "foo", "folder": deleted_folder.id},
+        {
+            "title": "doc 4",
+            "content": "foo",
+            "folder": parent_folder.id,
+            "topics": [999],
+        },
+    ]
+    response = api_client.post("/documents/bulk/", documents_data, format="json")
+    assert response.status_code == 201
+    assert len(response.data["created"]) == 1
+
+    errors = response.data["errors"]
+    assert [error["index"] for error in errors] == [1, 2, 3]
+    assert errors[0]["errors"]["title"][0].code == "required"
+    assert "folder" in errors[1]["errors"]
+    assert "topics" in errors[2]["errors"]
+
+    assert Document.objects.count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_create_documents_in_bulk_when_all_are_invalid(api_client):
+    response = api_client.post("/documents/bulk/", [{"title": "foo"}], format="json")
+    assert response.status_code == 400
+    assert response.data["created"] == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_create_documents_in_bulk_from_non_list(api_client, parent_folder):
+    document_data = {"title": "doc", "content": "foo", "folder": parent_folder.id}
+    response = api_client.post("/documents/bulk/", document_data, format="json")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_creates_documents_in_bulk_in_batches(
+    api_client, django_assert_num_queries, parent_folder, topic_1
+):
+    documents_data = [
+        {
+            "title": f"doc {i}",
+            "content": "foo",
+            "folder": parent_folder.id,
+            "topics": [topic_1.id],
+        }
+        for i in range(50)
+    ]
+
+    # Folder and topic checks, savepoint, 5 batches each of documents, revisions, contents (and
+    # the fields derived from them, see Document.save_contents) and topics, folder and topic
+    # counts, changes, folders to invalidate, release
+    with django_assert_num_queries(33):
+        response = api_client.post(
+            "/documents/bulk/?batch_size=10", documents_data, format="json"
+        )
+
+    assert response.status_code == 201
+    assert topic_1.documents.count() == 50
+
+
+# ##########################
+# ### Bulk Tagging Tests ###
+# ##########################
+
+
+@pytest.mark.django_db(transaction=True)
+def test_adds_documents_to_topics_in_bulk(
+    api_client,
+    django_assert_max_num_queries,
+    document_1,
+    document_2,
+    deleted_document,
+    topic_1,
+    topic_2,
+):
+    data = {
+        "documents": [
+            document_1.id,
+            document_2.id,
+            document_2.id,
+            deleted_document.id,
+            999,
+        ],
+        "topics": [topic_1.id, topic_2.id],
+    }
+    # Savepoint, insert, topic counts, release
+    with django_assert_max_num_queries(4):
+        response = api_client.post("/documents/topics/", data, format="json")
+    assert response.status_code == 200
+
+    # document_1 was already in topic_1, the deleted and unknown documents are skipped.
+    assert response.data == {"added": 3}
+    assert set(topic_1.documents.all()) == {document_1, document_2}
+    assert set(topic_2.documents.all()) == {document_1, document_2}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_removes_documents_from_topics_in_bulk(
+    api_client, document_1, document_2, topic_1, topic_2
+):
+    topic_1.documents.add(document_2)
+    topic_2.documents.add(document_1)
+
+    data = {"documents": [document_1.id, document_2.id], "topics": [topic_1.id]}
+    response = api_client.delete("/documents/topics/", data, format="json")
+    assert response.status_code == 200
+    assert response.data == {"removed": 2}
+
+    assert list(topic_1.documents.all()) == []
+    assert list(topic_2.documents.all()) == [document_1]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_modify_topics_in_bulk_without_documents(api_client, topic_1):
+    data = {"documents": [], "topics": [topic_1.id]}
+    response = api_client.post("/documents/topics/", data, format="json")
+    assert response.status_code == 400
+    assert response.data["documents"][0].code == "empty"
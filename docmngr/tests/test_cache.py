@@ -0,0 +1,210 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from docmngr import cache
+from docmngr.models import Document, Folder
+
+
+def assert_cached(api_client, url):
+    """Makes sure the url gets cached, and that it's served from cache without queries."""
+    response = api_client.get(url, format="json")
+    assert response.status_code == 200
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(url, format="json")
+    assert response["X-Cache"] == "HIT"
+    assert len(queries) == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_serves_cached_document(api_client, django_assert_num_queries, document_1):
+    url = f"/documents/{document_1.id}/"
+    response = api_client.get(url, format="json")
+    assert response["X-Cache"] == "MISS"
+
+    with django_assert_num_queries(0):
+        cached_response = api_client.get(url, format="json")
+
+    assert cached_response["X-Cache"] == "HIT"
+    assert cached_response.content == response.content
+    assert cached_response["Content-Type"] == response["Content-Type"]
+    assert cached_response["ETag"] == response["ETag"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_revalidates_cached_document(api_client, django_assert_num_queries, document_1):
+    url = f"/documents/{document_1.id}/"
+    etag = api_client.get(url, format="json")["ETag"]
+
+    with django_assert_num_queries(0):
+        response = api_client.get(url, format="json", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalidates_updated_document(api_client, document_1, parent_folder, topic_1):
+    urls = [
+        f"/documents/{document_1.id}/",
+        f"/folders/{parent_folder.id}/documents/",
+        f"/topics/{topic_1.id}/documents/",
+    ]
+    for url in urls:
+        assert_cached(api_client, url)
+
+    api_client.put(f"/documents/{document_1.id}/", {"title": "baz"}, format="json")
+
+    for url in urls:
+        response = api_client.get(url, format="json")
+        assert response["X-Cache"] == "MISS"
+        assert b"baz" in response.content
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalidates_moved_document(
+    api_client, document_1, parent_folder, child_folder
+):
+    assert_cached(api_client, f"/folders/{child_folder.id}/documents/")
+
+    api_client.put(
+        f"/documents/{document_1.id}/", {"folder": child_folder.id}, format="json"
+    )
+
+    response = api_client.get(f"/folders/{child_folder.id}/documents/", format="json")
+    assert [document["id"] for document in response.data] == [document_1.id]
+    response = api_client.get(f"/folders/{parent_folder.id}/documents/", format="json")
+    assert response.data == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalidates_document_topics(api_client, document_1, topic_1, topic_2):
+    assert_cached(api_client, f"/documents/{document_1.id}/")
+    assert_cached(api_client, f"/topics/{topic_1.id}/documents/")
+    assert_cached(api_client, f"/topics/{topic_2.id}/documents/")
+
+    api_client.post(f"/documents/{document_1.id}/topics/{topic_2.id}/", format="json")
+
+    response = api_client.get(f"/documents/{document_1.id}/", format="json")
+    assert len(response.data["topics"]) == 2
+    response = api_client.get(f"/topics/{topic_2.id}/documents/", format="json")
+    assert len(response.data) == 1
+    # The listing of the topic it was already in shows its new topic too.
+    response = api_client.get(f"/topics/{topic_1.id}/documents/", format="json")
+    assert response["X-Cache"] == "MISS"
+    assert len(response.data[0]["topics"]) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalidates_documents_in_bulk(api_client, document_1, parent_folder, topic_2):
+    assert_cached(api_client, f"/topics/{topic_2.id}/documents/")
+    assert_cached(api_client, f"/folders/{parent_folder.id}/documents/")
+
+    api_client.post(
+        "/documents/topics/",
+        {"documents": [document_1.id], "topics": [topic_2.id]},
+        format="json",
+    )
+    response = api_client.get(f"/topics/{topic_2.id}/documents/", format="json")
+    assert len(response.data) == 1
+
+    api_client.post(
+        "/documents/bulk/",
+        [{"title": "new", "content": "foo", "folder": parent_folder.id}],
+        format="json",
+    )
+    response = api_client.get(f"/folders/{parent_folder.id}/documents/", format="json")
+    assert len(response.data) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalidates_folders(api_client, parent_folder, child_folder):
+    urls = [
+        "/folders/",
+        "/folders/?depth=all",
+        f"/folders/{parent_folder.id}/",
+        f"/folders/{parent_folder.id}/?depth=all",
+    ]
+    for url in urls:
+        assert_cached(api_client, url)
+
+    api_client.post(
+        "/folders/", {"name": "new", "parent_folder": child_folder.id}, format="json"
+    )
+
+    # The top folders and the direct children of parent_folder didn't change.
+    assert api_client.get("/folders/", format="json")["X-Cache"] == "HIT"
+    assert (
+        api_client.get(f"/folders/{parent_folder.id}/", format="json")["X-Cache"]
+        == "HIT"
+    )
+
+    response = api_client.get(f"/folders/{parent_folder.id}/?depth=all", format="json")
+    assert response.data["children"][0]["children"][0]["name"] == "new"
+    response = api_client.get("/folders/?depth=all", format="json")
+    assert response.data[0]["children"][0]["children"][0]["name"] == "new"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalidates_moved_folder(api_client, parent_folder, child_folder):
+    other_folder = Folder.objects.create(name="top_2")
+    assert_cached(api_client, f"/folders/{parent_folder.id}/")
+    assert_cached(api_client, f"/folders/{other_folder.id}/")
+
+    api_client.put(
+        f"/folders/{child_folder.id}/",
+        {"parent_folder": other_folder.id},
+        format="json",
+    )
+
+    response = api_client.get(f"/folders/{parent_folder.id}/", format="json")
+    assert len(response.data) == 1
+    response = api_client.get(f"/folders/{other_folder.id}/", format="json")
+    assert len(response.data) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalidates_deleted_subtree(
+    api_client, parent_folder, child_folder, document_1
+):
+    urls = [f"/folders/{child_folder.id}/", f"/documents/{document_1.id}/"]
+    for url in urls:
+        assert_cached(api_client, url)
+
+    api_client.delete(f"/folders/{parent_folder.id}/", format="json")
+
+    for url in urls:
+        assert api_client.get(url, format="json").status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_does_not_invalidate_on_rolled_back_write(document_1):
+    url_generation = cache._generation_key(f"document:{document_1.id}")
+    cache.invalidate(f"document:{document_1.id}")
+    generation = cache._get_cache().get(url_generation)
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            cache.invalidate(f"document:{document_1.id}")
+            raise RuntimeError
+
+    assert cache._get_cache().get(url_generation) == generation
+
+
+@pytest.mark.django_db(transaction=True)
+def test_counts_hits_and_misses(api_client, document_1):
+    api_client.get(f"/documents/{document_1.id}/", format="json")
+    api_client.get(f"/documents/{document_1.id}/", format="json")
+    api_client.get(f"/documents/{document_1.id}/", format="json")
+
+    response = api_client.get("/cache/stats/", format="json")
+    assert response.data == {"hits": 2, "misses": 1}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_does_not_cache_errors(api_client):
+    api_client.get("/documents/999/", format="json")
+    Document.objects.create(
+        id=999, title="doc", content="foo", folder=Folder.objects.create(name="f")
+    )
+
+    response = api_client.get("/documents/999/", format="json")
+    assert response.status_code == 200
@@ -0,0 +1,134 @@
+import re
+
+import pytest
+from django.db import connection
+
+from docmngr.models import Change
+
+
+def next_link(response):
+    match = re.match(r'<(.*)>; rel="next"', response["Link"])
+    return match.group(1)
+
+
+def get_changes(api_client, url="/changes/"):
+    response = api_client.get(url, format="json")
+    assert response.status_code == 200
+    changes = [
+        (change["kind"], change["object_id"], change["action"])
+        for change in response.data
+    ]
+    return changes, next_link(response)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_records_changes_to_folders(api_client, parent_folder, child_folder):
+    _, since = get_changes(api_client, "/changes/?since=now")
+
+    response = api_client.post("/folders/", {"name": "new"}, format="json")
+    new_id = response.data["id"]
+    api_client.put(f"/folders/{new_id}/", {"name": "renamed"}, format="json")
+    api_client.put(
+        f"/folders/{new_id}/", {"parent_folder": parent_folder.id}, format="json"
+    )
+    api_client.put(f"/folders/{new_id}/", {"parent_folder": None}, format="json")
+    api_client.delete(f"/folders/{parent_folder.id}/")
+    api_client.post(f"/folders/{parent_folder.id}/restore/")
+
+    changes, _ = get_changes(api_client, since)
+    assert changes == [
+        ("folder", new_id, "created"),
+        ("folder", new_id, "updated"),
+        ("folder", new_id, "moved"),
+        ("folder", new_id, "moved"),
+        # One change for the whole subtree
+        ("folder", parent_folder.id, "deleted"),
+        ("folder", parent_folder.id, "restored"),
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_records_changes_to_documents(
+    api_client, document_1, topic_1, topic_2, child_folder
+):
+    _, since = get_changes(api_client, "/changes/?since=now")
+
+    api_client.put(
+        f"/documents/{document_1.id}/", {"folder": child_folder.id}, format="json"
+    )
+    api_client.post(f"/documents/{document_1.id}/topics/{topic_2.id}/")
+    api_client.delete(f"/documents/{document_1.id}/topics/{topic_1.id}/")
+    api_client.post(
+        "/documents/topics/",
+        {"documents": [document_1.id], "topics": [topic_1.id]},
+        format="json",
+    )
+    api_client.post(f"/documents/{document_1.id}/revisions/1/restore/")
+
+    changes, _ = get_changes(api_client, since)
+    assert changes == [
+        ("document", document_1.id, "moved"),
+        ("document", document_1.id, "tagged"),
+        ("document", document_1.id, "untagged"),
+        ("document", document_1.id, "tagged"),
+        ("document", document_1.id, "updated"),
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_does_not_record_failed_changes(api_client, parent_folder, child_folder):
+    _, since = get_changes(api_client, "/changes/?since=now")
+
+    response = api_client.put(
+        f"/folders/{parent_folder.id}/",
+        {"parent_folder": child_folder.id},
+        format="json",
+    )
+    assert response.status_code == 400
+
+    assert get_changes(api_client, since)[0] == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pages_through_changes_since_cursor(api_client):
+    for i in range(5):
+        api_client.post("/topics/", {"name": f"topic {i}"}, format="json")
+
+    first, since = get_changes(api_client, "/changes/?limit=3")
+    second, since = get_changes(api_client, since)
+    assert [action for _, _, action in first + second] == ["created"] * 5
+
+    # The last page's link polls for later changes.
+    assert get_changes(api_client, since)[0] == []
+    response = api_client.post("/topics/", {"name": "later"}, format="json")
+    changes, _ = get_changes(api_client, since)
+    assert changes == [("topic", response.data["id"], "created")]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_hides_changes_of_running_transactions(api_client, parent_folder):
+    _, since = get_changes(api_client, "/changes/?since=now")
+
+    # Make the change in a transaction that stays open, on a connection of its own.
+    other = connection.copy()
+    try:
+        with other.cursor() as cursor:
+            cursor.execute("BEGIN")
+            cursor.execute(
+                Change.record_sql("unnest(%s::bigint[])"),
+                ["folder", "updated", [parent_folder.id]],
+            )
+            assert get_changes(api_client, since)[0] == []
+
+            cursor.execute("COMMIT")
+    finally:
+        other.close()
+
+    changes, _ = get_changes(api_client, since)
+    assert changes == [("folder", parent_folder.id, "updated")]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_get_changes_with_invalid_cursor(api_client):
+    response = api_client.get("/changes/?since=nonsense", format="json")
+    assert response.status_code == 404
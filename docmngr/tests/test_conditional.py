@@ -0,0 +1,186 @@
+import pytest
+from django.core.cache import cache
+
+from docmngr.models import Topic
+
+
+def get_revalidated(api_client, url):
+    """GETs the url, then revalidates it with the ETag, returning the second response."""
+    response = api_client.get(url, format="json")
+    assert response.status_code == 200
+    return api_client.get(url, format="json", HTTP_IF_NONE_MATCH=response["ETag"])
+
+
+# ##########################
+# ###  Change Tracking   ###
+# ##########################
+
+
+@pytest.mark.django_db(transaction=True)
+def test_updates_updated_at_on_change(api_client, document_1):
+    updated_at = document_1.updated_at
+
+    api_client.put(f"/documents/{document_1.id}/", {"title": "baz"}, format="json")
+
+    document_1.refresh_from_db()
+    assert document_1.updated_at > updated_at
+
+
+@pytest.mark.django_db(transaction=True)
+def test_updates_updated_at_on_topic_change(api_client, document_1, topic_2):
+    updated_at = document_1.updated_at
+
+    api_client.post(f"/documents/{document_1.id}/topics/{topic_2.id}/", format="json")
+
+    document_1.refresh_from_db()
+    assert document_1.updated_at > updated_at
+
+
+@pytest.mark.django_db(transaction=True)
+def test_updates_updated_at_on_bulk_topic_change(
+    document_1, document_2, topic_1, topic_2
+):
+    document_1_updated_at = document_1.updated_at
+    document_2_updated_at = document_2.updated_at
+
+    # document_1 is already in topic_1, so only document_2 changes.
+    assert (
+        Topic.add_documents_in_bulk([topic_1.id], [document_1.id, document_2.id]) == 1
+    )
+
+    document_1.refresh_from_db()
+    document_2.refresh_from_db()
+    assert document_1.updated_at == document_1_updated_at
+    assert document_2.updated_at > document_2_updated_at
+
+
+# ##########################
+# ###  Conditional GETs  ###
+# ##########################
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gets_unmodified_document(api_client, django_assert_num_queries, document_1):
+    url = f"/documents/{document_1.id}/"
+    response = api_client.get(url, format="json")
+    assert response.status_code == 200
+    assert "Last-Modified" in response
+
+    # Only the validators are computed, the document isn't loaded. The response cache is
+    # cleared as it would answer without any queries at all.
+    cache.clear()
+    with django_assert_num_queries(2):
+        response = api_client.get(
+            url, format="json", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gets_modified_document(api_client, document_1, topic_1):
+    url = f"/documents/{document_1.id}/"
+    etag = api_client.get(url, format="json")["ETag"]
+
+    api_client.put(f"/topics/{topic_1.id}/", {"name": "renamed topic"}, format="json")
+
+    response = api_client.get(url, format="json", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data["topics"][0]["name"] == "renamed topic"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gets_document_modified_since(api_client, document_1):
+    url = f"/documents/{document_1.id}/"
+    last_modified = api_client.get(url, format="json")["Last-Modified"]
+
+    response = api_client.get(url, format="json", HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gets_modified_folder(api_client, parent_folder, child_folder):
+    url = f"/folders/{parent_folder.id}/"
+    assert get_revalidated(api_client, url).status_code == 304
+
+    etag = api_client.get(url, format="json")["ETag"]
+    api_client.delete(f"/folders/{child_folder.id}/", format="json")
+
+    response = api_client.get(url, format="json", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert len(response.data) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gets_modified_folder_subtree(api_client, parent_folder, grandchild_folder):
+    url = f"/folders/{parent_folder.id}/?depth=all"
+    assert get_revalidated(api_client, url).status_code == 304
+
+    etag = api_client.get(url, format="json")["ETag"]
+    api_client.put(
+        f"/folders/{grandchild_folder.id}/", {"name": "renamed"}, format="json"
+    )
+
+    response = api_client.get(url, format="json", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gets_modified_docs_for_folder(
+    api_client, parent_folder, document_1, document_2, topic_2
+):
+    url = f"/folders/{parent_folder.id}/documents/"
+    assert get_revalidated(api_client, url).status_code == 304
+
+    etag = api_client.get(url, format="json")["ETag"]
+    api_client.post(
+        "/documents/topics/",
+        {"documents": [document_2.id], "topics": [topic_2.id]},
+        format="json",
+    )
+
+    response = api_client.get(url, format="json", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gets_modified_docs_for_topic(api_client, topic_1, document_1, parent_folder):
+    url = f"/topics/{topic_1.id}/documents/"
+    assert get_revalidated(api_client, url).status_code == 304
+
+    etag = api_client.get(url, format="json")["ETag"]
+    api_client.delete(f"/folders/{parent_folder.id}/", format="json")
+
+    response = api_client.get(url, format="json", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gets_modified_topics(api_client, topic_1):
+    assert get_revalidated(api_client, "/topics/").status_code == 304
+
+    etag = api_client.get("/topics/", format="json")["ETag"]
+    Topic.objects.create(name="new topic")
+
+    response = api_client.get("/topics/", format="json", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+def test_etag_depends_on_query_params(api_client, parent_folder, document_1):
+    url = f"/folders/{parent_folder.id}/documents/"
+    etag = api_client.get(url, format="json")["ETag"]
+
+    response = api_client.get(url + "?full=1", format="json", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+def test_does_not_revalidate_deleted_document(api_client, parent_folder, document_1):
+    url = f"/documents/{document_1.id}/"
+    etag = api_client.get(url, format="json")["ETag"]
+
+    api_client.delete(f"/folders/{parent_folder.id}/", format="json")
+
+    response = api_client.get(url, format="json", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 404
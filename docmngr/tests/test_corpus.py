@@ -0,0 +1,108 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from docmngr.models import Document, DocumentRevision, Folder, Topic
+
+
+# ##########################
+# ### Export/Import Tests ##
+# ##########################
+
+
+@pytest.fixture
+def corpus(child_folder, document_1, deleted_document):
+    Document.objects.create(
+        title="nested",
+        content="<p>Tabs\tand\nnewlines \\ ✓</p>",
+        folder=child_folder,
+    )
+
+
+def _export(tmp_path, format):
+    call_command("export_corpus", str(tmp_path), format=format)
+
+
+def _snapshot():
+    return (
+        list(
+            Folder.objects.order_by("id").values("id", "name", "parent_folder", "path")
+        ),
+        list(Topic.objects.order_by("id").values("id", "name", "documents")),
+        [
+            (document.id, document.title, document.folder_id, document.content)
+            for document in Document.objects.order_by("id")
+        ],
+        list(Document.objects.order_by("id").values("excerpt", "is_deleted")),
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize("format", ["ndjson", "csv"])
+def test_exports_and_imports_corpus(tmp_path, corpus, format):
+    expected = _snapshot()
+    _export(tmp_path, format)
+
+    Folder.objects.all().delete()
+    Topic.objects.all().delete()
+    call_command("import_corpus", str(tmp_path), format=format)
+
+    assert _snapshot() == expected
+    assert Document.objects.filter(search_vector="newlines").count() == 1
+    assert Document.recount() == (0, 0)
+    assert DocumentRevision.objects.count() == Document.objects.count()
+    # Sequences continue after the imported ids.
+    assert Folder.objects.create(name="new").id > max(f["id"] for f in expected[0])
+
+
+@pytest.mark.django_db(transaction=True)
+def test_imports_corpus_with_new_ids(tmp_path, corpus, parent_folder, topic_1):
+    _export(tmp_path, "ndjson")
+    call_command("import_corpus", str(tmp_path), remap_ids=True)
+
+    copy = Folder.objects.exclude(pk=parent_folder.id).get(name="top_1")
+    child = copy.children.get()
+    assert child.path == f"/{copy.id}/{child.id}/"
+    assert child.documents.get().content == "<p>Tabs\tand\nnewlines \\ ✓</p>"
+
+    # Topics are merged by name
+    assert Topic.objects.count() == 1
+    assert topic_1.documents.count() == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_failed_import_imports_nothing(tmp_path, corpus):
+    _export(tmp_path, "ndjson")
+    expected = _snapshot()
+
+    # The ids are taken
+    with pytest.raises(CommandError):
+        call_command("import_corpus", str(tmp_path))
+
+    assert _snapshot() == expected
+
+
+# ##########################
+# ### Generator Tests ######
+# ##########################
+
+
+@pytest.mark.django_db(transaction=True)
+def test_generates_same_corpus_for_same_seed():
+    options = {"folders": 30, "documents": 50, "topics": 5, "seed": 3}
+    call_command("generate_corpus", **options)
+    first = _snapshot()
+
+    Folder.objects.all().delete()
+    Topic.objects.all().delete()
+    call_command("generate_corpus", **options)
+    second = _snapshot()
+
+    # Ids differ between the runs, everything else is the same.
+    assert [f["name"] for f in first[0]] == [f["name"] for f in second[0]]
+    assert [d[1:4:2] for d in first[2]] == [d[1:4:2] for d in second[2]]
+    assert Document.objects.count() == 50
+    # Nothing to fix, the counts were kept up to date.
+    assert Document.recount() == (0, 0)
+    for folder in Folder.objects.select_related("parent_folder"):
+        parent_path = folder.parent_folder.path if folder.parent_folder else "/"
+        assert folder.path == f"{parent_path}{folder.id}/"
@@ -0,0 +1,210 @@
+import threading
+
+import pytest
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.utils import timezone
+
+from docmngr import jobs
+from docmngr.models import Document, Folder, Job
+
+failures = []
+
+
+@jobs.job
+def fail_at_first(times):
+    """Test job raising an error the first `times` times it's run."""
+    if len(failures) < times:
+        failures.append(times)
+        raise RuntimeError("failed")
+    return "done"
+
+
+@pytest.fixture(autouse=True)
+def reset_failures():
+    failures.clear()
+
+
+def make_due(job):
+    Job.objects.filter(pk=job.id).update(run_after=timezone.now())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_runs_queued_jobs(api_client):
+    job = jobs.enqueue("fail_at_first", times=0)
+
+    response = api_client.get(f"/jobs/{job.id}/")
+    assert response.status_code == 200
+    assert response.data["status"] == "queued"
+
+    assert jobs.run_next().id == job.id
+    assert jobs.run_next() is None
+
+    response = api_client.get(f"/jobs/{job.id}/")
+    assert response.data["status"] == "succeeded"
+    assert response.data["attempts"] == 1
+    assert response.data["result"] == "done"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_retries_failed_jobs_with_backoff(settings):
+    settings.DOCMNGR_JOB_MAX_ATTEMPTS = 3
+    settings.DOCMNGR_JOB_RETRY_DELAY = 10
+    job = jobs.enqueue("fail_at_first", times=5)
+
+    delays = []
+    for attempt in range(1, 4):
+        started = timezone.now()
+        jobs.run_next()
+        job.refresh_from_db()
+        assert job.attempts == attempt
+        assert "RuntimeError: failed" in job.error
+        delays.append((job.run_after - started).total_seconds())
+        make_due(job)
+
+    assert job.status == "failed"
+    assert job.finished_at is not None
+    # Retries wait 10s then 20s, give or take the jitter. The last attempt doesn't retry.
+    assert 5 <= delays[0] <= 15.1
+    assert 10 <= delays[1] <= 30.1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_retried_job_can_succeed():
+    job = jobs.enqueue("fail_at_first", times=1)
+
+    jobs.run_next()
+    make_due(job)
+    jobs.run_next()
+
+    job.refresh_from_db()
+    assert job.status == "succeeded"
+    assert job.attempts == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reruns_jobs_of_lost_workers(settings):
+    settings.DOCMNGR_JOB_MAX_ATTEMPTS = 2
+    jobs.enqueue("fail_at_first", times=0)
+
+    lost = Job.claim(timeout=60)
+    assert Job.claim(timeout=60) is None
+
+    # Once its lease runs out the job is claimed again, the lost attempt can't finish it.
+    make_due(lost)
+    assert jobs.run_next().id == lost.id
+    assert not lost.finish(status="failed")
+    lost.refresh_from_db()
+    assert lost.status == "succeeded"
+
+    # Unless it was its last attempt.
+    job = jobs.enqueue("fail_at_first", times=0)
+    Job.objects.filter(pk=job.id).update(attempts=2, status="running")
+    jobs.run_next()
+    job.refresh_from_db()
+    assert job.status == "failed"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_workers_skip_jobs_claimed_by_others():
+    first = jobs.enqueue("fail_at_first", times=0)
+    second = jobs.enqueue("fail_at_first", times=0)
+    claimed = threading.Event()
+    release = threading.Event()
+
+    def claim_and_hold():
+        try:
+            with transaction.atomic():
+                assert Job.claim(timeout=60).id == first.id
+                claimed.set()
+                release.wait(5)
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=claim_and_hold)
+    thread.start()
+    try:
+        assert claimed.wait(5)
+        # The first job's row is locked by the other transaction, so this doesn't wait for it.
+        assert Job.claim(timeout=60).id == second.id
+    finally:
+        release.set()
+        thread.join()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_does_not_run_jobs_of_rolled_back_transactions():
+    with transaction.atomic():
+        jobs.enqueue("fail_at_first", times=0)
+        transaction.set_rollback(True)
+
+    assert jobs.run_next() is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_enqueue_unknown_job():
+    with pytest.raises(ValueError):
+        jobs.enqueue("nope")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_get_nonexistent_job(api_client):
+    response = api_client.get("/jobs/999/")
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_deletes_big_subtree_in_background(
+    api_client, settings, parent_folder, child_folder, document_1
+):
+    settings.DOCMNGR_JOB_THRESHOLD = 2
+
+    response = api_client.delete(f"/folders/{parent_folder.id}/")
+    assert response.status_code == 202
+    assert response["Location"] == f"/jobs/{response.data['id']}/"
+    assert response.data["status"] == "queued"
+    assert Folder.without_deleted().count() == 2
+
+    call_command("run_worker", "--threads", "2", "--burst")
+
+    assert not Folder.without_deleted().exists()
+    assert not Document.without_deleted().exists()
+    response = api_client.get(response["Location"])
+    assert response.data["status"] == "succeeded"
+    assert response.data["result"] == {"folders": 2, "documents": 1}
+
+    response = api_client.post(f"/folders/{parent_folder.id}/restore/")
+    assert response.status_code == 202
+    call_command("run_worker", "--burst")
+    assert Folder.without_deleted().count() == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_tags_many_documents_in_background(
+    api_client, settings, document_1, document_2, topic_2
+):
+    settings.DOCMNGR_JOB_THRESHOLD = 1
+
+    response = api_client.post(
+        "/documents/topics/",
+        {"documents": [document_1.id, document_2.id], "topics": [topic_2.id]},
+        format="json",
+    )
+    assert response.status_code == 202
+    assert not topic_2.documents.exists()
+
+    call_command("run_worker", "--burst")
+
+    assert topic_2.documents.count() == 2
+    assert Job.objects.get(pk=response.data["id"]).result == {"added": 2}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reindexes_documents_in_background(document_1):
+    Document.objects.update(search_vector=None)
+
+    call_command("reindex_documents", "--background")
+    call_command("run_worker", "--burst")
+
+    assert Job.objects.get().result == {"documents": 1}
+    assert Document.objects.get().search_vector
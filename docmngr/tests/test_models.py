@@ -0,0 +1,348 @@
+import threading
+
+import pytest
+from django.core.management import call_command
+from django.db import connections, transaction
+from rest_framework.exceptions import ValidationError
+
+from docmngr.models import (
+    Document,
+    DocumentContent,
+    DocumentRevision,
+    Folder,
+    Topic,
+)
+
+# #########################
+# ####  Folder Tests    ###
+# #########################
+
+
+@pytest.mark.django_db(transaction=True)
+def test_folder_paths_are_set_on_create(parent_folder, child_folder):
+    assert parent_folder.path == f"/{parent_folder.id}/"
+    assert child_folder.path == f"/{parent_folder.id}/{child_folder.id}/"
+
+    assert Folder.objects.get(pk=child_folder.id).path == child_folder.path
+
+
+@pytest.mark.django_db(transaction=True)
+def test_folder_ancestors(
+    django_assert_num_queries, parent_folder, child_folder, grandchild_folder
+):
+    with django_assert_num_queries(1):
+        ancestors = list(grandchild_folder.ancestors())
+
+    assert ancestors == [parent_folder, child_folder]
+    assert list(parent_folder.ancestors()) == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_folder_descendants(parent_folder, child_folder, grandchild_folder):
+    assert set(parent_folder.descendants()) == {child_folder, grandchild_folder}
+    assert set(child_folder.descendants(include_self=True)) == {
+        child_folder,
+        grandchild_folder,
+    }
+    assert list(grandchild_folder.descendants()) == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_folder_descendants_skip_similar_prefixes(parent_folder):
+    """Make sure folder 1 doesn't consider folder 12 a descendant."""
+    others = [Folder.objects.create(name=f"top_{i}") for i in range(12)]
+
+    assert not any(other.is_within(parent_folder) for other in others)
+    assert list(parent_folder.descendants()) == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_renaming_folder_keeps_path(child_folder):
+    path = child_folder.path
+    child_folder.name = "renamed"
+    child_folder.save()
+
+    child_folder.refresh_from_db()
+    assert child_folder.path == path
+
+
+@pytest.mark.django_db(transaction=True)
+def test_saving_stale_folder_keeps_ancestor_move(
+    parent_folder, child_folder, grandchild_folder
+):
+    stale = Folder.objects.get(pk=grandchild_folder.id)
+    other_folder = Folder.objects.create(name="top_2")
+    child_folder.parent_folder = other_folder
+    child_folder.save()
+
+    stale.name = "renamed"
+    stale.save()
+
+    expected = f"/{other_folder.id}/{child_folder.id}/{grandchild_folder.id}/"
+    assert stale.path == expected
+    assert Folder.objects.get(pk=grandchild_folder.id).path == expected
+
+
+@pytest.mark.django_db(transaction=True)
+def test_moving_folder_not_loaded_from_database(parent_folder, child_folder):
+    other_folder = Folder.objects.create(name="top_2")
+    folder = Folder(id=child_folder.id, name="moved", parent_folder=other_folder)
+    folder._state.adding = False
+    folder.save(update_fields=["name", "parent_folder"])
+
+    assert folder.path == f"/{other_folder.id}/{child_folder.id}/"
+    # Only the moved subtree is rewritten.
+    assert Folder.objects.get(pk=parent_folder.id).path == f"/{parent_folder.id}/"
+    assert Folder.objects.get(pk=other_folder.id).path == f"/{other_folder.id}/"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_saving_folder_into_its_subtree_fails(parent_folder, grandchild_folder):
+    # Passed the serializer's check when it was made with an older path, say.
+    parent_folder.parent_folder = grandchild_folder
+    with pytest.raises(ValidationError):
+        parent_folder.save()
+
+    assert Folder.objects.get(pk=parent_folder.id).parent_folder_id is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_moves_cannot_make_a_cycle():
+    a, b = Folder.objects.create(name="a"), Folder.objects.create(name="b")
+    a_child = Folder.objects.create(name="a child", parent_folder=a)
+    b_child = Folder.objects.create(name="b child", parent_folder=b)
+    moved = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def move(folder, parent, hold=False):
+        try:
+            with transaction.atomic():
+                folder.parent_folder = parent
+                folder.save()
+                if hold:
+                    moved.set()
+                    release.wait(5)
+        except ValidationError as error:
+            errors.append(error)
+        finally:
+            connections.close_all()
+
+    first = threading.Thread(target=move, args=(a, b_child, True))
+    first.start()
+    assert moved.wait(5)
+    # Checked before the first move commits, this one would pass.
+    second = threading.Thread(target=move, args=(b, a_child))
+    second.start()
+    release.set()
+    first.join()
+    second.join()
+
+    assert len(errors) == 1
+    b.refresh_from_db()
+    assert b.parent_folder_id is None
+    a.refresh_from_db()
+    assert a.path == f"/{b.id}/{b_child.id}/{a.id}/"
+
+
+# #########################
+# ####  Document Tests  ###
+# #########################
+
+
+@pytest.mark.django_db(transaction=True)
+def test_document_content_is_stored_compressed(parent_folder):
+    content = "<p>Hello   <b>world</b></p>" * 100
+    document = Document.objects.create(
+        title="doc", content=content, folder=parent_folder
+    )
+
+    stored = DocumentContent.objects.get(document=document)
+    assert len(stored.data) < len(content) / 10
+    assert Document.objects.get(pk=document.id).content == content
+
+
+@pytest.mark.django_db(transaction=True)
+def test_document_content_is_loaded_on_demand(django_assert_num_queries, document_1):
+    with django_assert_num_queries(1):
+        document = Document.objects.get(pk=document_1.id)
+    with django_assert_num_queries(1):
+        assert document.content == ""
+        assert document.content == ""
+
+    with django_assert_num_queries(1):
+        document = Document.objects.select_related("stored_content").get(
+            pk=document_1.id
+        )
+        assert document.content == ""
+
+
+@pytest.mark.django_db(transaction=True)
+def test_document_derived_fields_follow_content(parent_folder):
+    document = Document.objects.create(
+        title="doc", content="<p>Hello   world</p>", folder=parent_folder
+    )
+    document.refresh_from_db()
+    assert (document.excerpt, document.content_length) == ("Hello world", 11)
+
+    document.content = "<p>Goodbye</p>"
+    document.save()
+    document.refresh_from_db()
+    assert (document.excerpt, document.content_length) == ("Goodbye", 7)
+
+    document.title = "farewell"
+    document.save()
+    assert Document.objects.filter(search_vector="farewell").exists()
+    assert Document.objects.filter(search_vector="goodbye").exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_document_contents_are_stored_by_bulk_create(parent_folder):
+    documents = Document.objects.bulk_create(
+        [
+            Document(
+                title=f"doc {i}", content=f"<p>content {i}</p>", folder=parent_folder
+            )
+            for i in range(3)
+        ],
+        batch_size=2,
+    )
+
+    for i, document in enumerate(documents):
+        document = Document.objects.get(pk=document.id)
+        assert document.content == f"<p>content {i}</p>"
+        assert document.excerpt == f"content {i}"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_document_highlight():
+    snippets = Document.highlight(
+        ["<p>The quick brown fox</p>", "<p>jumps over</p>"], "fox"
+    )
+
+    # Tags are replaced by spaces
+    assert snippets == [" The quick brown <mark>fox</mark> ", " jumps over "]
+
+
+# #########################
+# #### Count Tests       ###
+# #########################
+
+
+def counts(*objs):
+    return [type(obj).objects.get(pk=obj.pk).documents_count for obj in objs]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_counts_follow_document_changes(parent_folder, child_folder, topic_1):
+    document = Document.objects.create(title="a", content="a", folder=parent_folder)
+    topic_1.documents.add(document)
+    assert counts(parent_folder, child_folder, topic_1) == [1, 0, 1]
+
+    document.folder = child_folder
+    document.save()
+    assert counts(parent_folder, child_folder, topic_1) == [0, 1, 1]
+
+    document.is_deleted = True
+    document.save()
+    assert counts(parent_folder, child_folder, topic_1) == [0, 0, 0]
+
+    document = Document.objects.get(pk=document.pk)
+    document.is_deleted = False
+    document.save()
+    assert counts(parent_folder, child_folder, topic_1) == [0, 1, 1]
+
+    document.topics.remove(topic_1)
+    document.topics.remove(topic_1)
+    assert counts(topic_1) == [0]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_counts_follow_bulk_changes(parent_folder, child_folder, topic_1, topic_2):
+    documents = Document.objects.bulk_create(
+        [Document(title=str(i), content="x", folder=child_folder) for i in range(3)]
+        + [Document(title="gone", content="x", folder=child_folder, is_deleted=True)]
+    )
+    ids = [document.id for document in documents]
+    assert Topic.add_documents_in_bulk([topic_1.id, topic_2.id], ids) == 6
+    assert counts(child_folder, topic_1, topic_2) == [3, 3, 3]
+
+    parent_folder.set_subtree_deleted(True)
+    assert counts(child_folder, topic_1, topic_2) == [0, 0, 0]
+
+    parent_folder.set_subtree_deleted(False)
+    # The document that was deleted on its own stays deleted.
+    assert counts(child_folder, topic_1, topic_2) == [3, 3, 3]
+
+    assert Topic.remove_documents_in_bulk([topic_1.id], ids) == 3
+    assert counts(topic_1, topic_2) == [0, 3]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_recount_fixes_drifted_counts(parent_folder, document_1, topic_1, topic_2):
+    Folder.objects.update(documents_count=42)
+    Topic.objects.filter(pk=topic_2.pk).update(documents_count=-1)
+
+    call_command("recount_documents")
+
+    assert counts(parent_folder, topic_1, topic_2) == [1, 1, 0]
+    assert Document.recount() == (0, 0)
+
+
+# #########################
+# #### Revision Tests    ###
+# #########################
+
+
+@pytest.mark.django_db(transaction=True)
+def test_document_saves_add_revisions(parent_folder):
+    unchanged = "".join(f"<p>unchanged text {i}</p>" for i in range(50))
+    document = Document.objects.create(
+        title="doc", content="<p>version 1</p>" + unchanged, folder=parent_folder
+    )
+    for i in range(2, DocumentRevision.SNAPSHOT_INTERVAL + 3):
+        document.content = f"<p>version {i}</p>" + unchanged
+        document.save()
+
+    revisions = list(document.revisions.order_by("number"))
+    assert [revision.number for revision in revisions] == list(
+        range(1, DocumentRevision.SNAPSHOT_INTERVAL + 3)
+    )
+    # Deltas in between snapshots.
+    assert [revision.number for revision in revisions if revision.is_snapshot] == [
+        1,
+        DocumentRevision.SNAPSHOT_INTERVAL + 1,
+    ]
+    assert len(revisions[-1].data) < len(revisions[-2].data)
+
+    for i in range(1, DocumentRevision.SNAPSHOT_INTERVAL + 3):
+        content = DocumentRevision.load(document.id, i).content
+        assert content.startswith(f"<p>version {i}</p>")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_unchanged_document_saves_add_no_revision(parent_folder):
+    document = Document.objects.create(title="doc", content="foo", folder=parent_folder)
+    document.content = "foo"
+    document.save()
+    assert document.revisions.count() == 1
+
+    document.title = "renamed"
+    document.save()
+    revision = DocumentRevision.load(document.id, 2)
+    assert (revision.title, revision.content) == ("renamed", "foo")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_loading_missing_revision_fails(document_1):
+    with pytest.raises(DocumentRevision.DoesNotExist):
+        DocumentRevision.load(document_1.id, 2)
+
+
+def test_revision_diff_and_patch():
+    old = "<p>The quick brown fox</p>\n<p>jumps over the lazy dog</p>"
+    new = "<h1>Title</h1><p>The quick red fox</p>\n<p>jumps over the dog</p>"
+
+    assert DocumentRevision.patch(old, DocumentRevision.diff(old, new)) == new
+    assert DocumentRevision.patch(old, DocumentRevision.diff(old, "")) == ""
+    assert DocumentRevision.patch("", DocumentRevision.diff("", new)) == new
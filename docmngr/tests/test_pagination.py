@@ -0,0 +1,88 @@
+import re
+
+import pytest
+from django.utils import timezone
+
+from docmngr.models import Document, Topic
+
+
+def next_link(response):
+    match = re.match(r'<(.*)>; rel="next"', response.get("Link", ""))
+    return match.group(1) if match else None
+
+
+def get_all_pages(api_client, url):
+    """Follows next links until the last page, returning each page's results."""
+    pages = []
+    while url is not None:
+        response = api_client.get(url, format="json")
+        assert response.status_code == 200
+        pages.append([item["id"] for item in response.data])
+        url = next_link(response)
+    return pages
+
+
+@pytest.fixture
+def many_documents(transactional_db, parent_folder, topic_1):
+    documents = [
+        Document.objects.create(title=f"doc {i}", content="foo", folder=parent_folder)
+        for i in range(7)
+    ]
+    topic_1.documents.add(*documents)
+
+    # Give some documents identical timestamps to make sure ties are paged through correctly.
+    Document.objects.filter(pk__in=[d.id for d in documents[2:5]]).update(
+        created_at=timezone.now()
+    )
+
+    return documents
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pages_through_docs_for_folder(api_client, parent_folder, many_documents):
+    pages = get_all_pages(api_client, f"/folders/{parent_folder.id}/documents/?limit=3")
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sorted(sum(pages, [])) == sorted(d.id for d in many_documents)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pages_through_docs_for_topic(api_client, topic_1, many_documents):
+    pages = get_all_pages(api_client, f"/topics/{topic_1.id}/documents/?limit=2")
+
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert sorted(sum(pages, [])) == sorted(d.id for d in many_documents)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pages_through_topics(api_client):
+    topics = [Topic.objects.create(name=f"topic {i}") for i in range(5)]
+
+    pages = get_all_pages(api_client, "/topics/?limit=2")
+
+    assert pages == [
+        [t.id for t in topics[0:2]],
+        [t.id for t in topics[2:4]],
+        [topics[4].id],
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_last_page_has_no_next_link(api_client, parent_folder, document_1):
+    response = api_client.get(f"/folders/{parent_folder.id}/documents/", format="json")
+    assert response.status_code == 200
+    assert "Link" not in response
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_page_with_invalid_cursor(api_client, parent_folder):
+    response = api_client.get(
+        f"/folders/{parent_folder.id}/documents/?cursor=garbage", format="json"
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_get_docs_for_nonexistent_topic(api_client):
+    response = api_client.get("/topics/999/documents/", format="json")
+    assert response.status_code == 404
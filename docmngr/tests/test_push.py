@@ -0,0 +1,263 @@
+import asyncio
+import json
+import queue
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import transaction
+
+from docmngr import push
+from docmngr.models import Change
+
+
+@pytest.fixture(autouse=True)
+def broker(monkeypatch):
+    """A broker of its own for every test, with the in-memory backend."""
+    monkeypatch.setattr(push, "_broker", None)
+    broker = push.get_broker()
+    yield broker
+    broker.backend.stop()
+
+
+class Stream:
+    """Requests /events/ from push.event_stream like an ASGI server would."""
+
+    def __init__(self, query_string):
+        self.received = asyncio.Queue()
+        self.sent = asyncio.Queue()
+        scope = {
+            "type": "http",
+            "path": "/events/",
+            "query_string": query_string.encode(),
+        }
+        self.task = asyncio.ensure_future(
+            push.event_stream(scope, self.received.get, self.sent.put)
+        )
+
+    async def start(self):
+        """Returns the status of the response, and the body if it's not streamed."""
+        start = await self.next_message()
+        body = await self.next_message()
+        return start["status"], body["body"]
+
+    async def next_message(self):
+        return await asyncio.wait_for(self.sent.get(), 5)
+
+    async def next_event(self):
+        """Returns the (name, data) of the next event sent."""
+        body = (await self.next_message())["body"].decode()
+        name, data = body.strip().split("\n")
+        return name.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+    async def disconnect(self):
+        await self.received.put({"type": "http.disconnect"})
+        await self.task
+
+
+async def subscribe(query_string):
+    stream = Stream(query_string)
+    assert await stream.start() == (200, b": subscribed\n\n")
+    return stream
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pushes_changes_to_subscribers(api_client, document_1, child_folder):
+    async def scenario():
+        document_stream = await subscribe(f"documents={document_1.id}")
+        folder_stream = await subscribe(f"folders={child_folder.id},999")
+        other_stream = await subscribe("documents=999&topics=999")
+
+        await sync_to_async(api_client.put)(
+            f"/documents/{document_1.id}/", {"folder": child_folder.id}, format="json"
+        )
+
+        moved = {"kind": "document", "object_id": document_1.id, "action": "moved"}
+        assert await document_stream.next_event() == ("change", moved)
+        assert await folder_stream.next_event() == ("change", moved)
+        for stream in (document_stream, folder_stream, other_stream):
+            await stream.disconnect()
+        assert other_stream.sent.empty()
+
+    async_to_sync(scenario)()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pushes_bulk_tagging_to_topic_subscribers(
+    api_client, document_1, document_2, topic_1, topic_2
+):
+    async def scenario():
+        stream = await subscribe(f"topics={topic_2.id}")
+
+        await sync_to_async(api_client.post)(
+            "/documents/topics/",
+            {"documents": [document_1.id, document_2.id], "topics": [topic_2.id]},
+            format="json",
+        )
+
+        events = [await stream.next_event(), await stream.next_event()]
+        assert sorted(data["object_id"] for _, data in events) == sorted(
+            [document_1.id, document_2.id]
+        )
+        assert {data["action"] for _, data in events} == {"tagged"}
+        await stream.disconnect()
+
+    async_to_sync(scenario)()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pushes_changes_once_committed(parent_folder):
+    def change(action):
+        with transaction.atomic():
+            Change.record("folder", [parent_folder.id], action)
+            transaction.set_rollback(action == "rolled back")
+
+    async def scenario():
+        stream = await subscribe(f"folders={parent_folder.id}")
+
+        await sync_to_async(change)("rolled back")
+        await sync_to_async(change)("updated")
+
+        _, data = await stream.next_event()
+        assert data["action"] == "updated"
+        await stream.disconnect()
+
+    async_to_sync(scenario)()
+
+
+@pytest.mark.parametrize(
+    "query_string", ["", "folders=", "folders=abc", "things=1", "topics=1,nope"]
+)
+def test_fails_to_subscribe_with_invalid_params(query_string):
+    async def scenario():
+        status, body = await Stream(query_string).start()
+        assert status == 400
+        assert "detail" in json.loads(body)
+
+    async_to_sync(scenario)()
+
+
+def test_fails_to_subscribe_to_too_many_ids():
+    async def scenario():
+        ids = ",".join(str(pk) for pk in range(push.MAX_CHANNELS + 1))
+        status, _ = await Stream(f"documents={ids}").start()
+        assert status == 400
+
+    async_to_sync(scenario)()
+
+
+def test_sends_heartbeats_while_idle(settings):
+    settings.DOCMNGR_PUSH_HEARTBEAT = 0.01
+
+    async def scenario():
+        stream = await subscribe("folders=1")
+        message = await stream.next_message()
+        assert message["body"] == b": heartbeat\n\n"
+        await stream.disconnect()
+
+    async_to_sync(scenario)()
+
+
+def test_disconnects_subscribers_that_fall_behind(settings, broker):
+    settings.DOCMNGR_PUSH_QUEUE_SIZE = 3
+
+    async def scenario():
+        stream = await subscribe("documents=1")
+        broker.deliver([push.change("document", 1, "updated") for _ in range(5)])
+
+        assert await stream.next_event() == ("overflow", {})
+        assert not (await stream.next_message()).get("more_body")
+        await stream.task
+
+    async_to_sync(scenario)()
+    assert broker._subscriptions == {}
+
+
+def test_unsubscribes_on_disconnect(broker):
+    async def scenario():
+        first = await subscribe("documents=1,2")
+        second = await subscribe("documents=2")
+        await first.disconnect()
+        assert set(broker._subscriptions) == {"document:2"}
+        await second.disconnect()
+
+    async_to_sync(scenario)()
+    assert broker._subscriptions == {}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_postgres_backend_delivers_notifications():
+    delivered = queue.Queue()
+    backend = push.PostgresBackend()
+    backend.poll_timeout = 0.1
+    backend.start(delivered.put)
+    try:
+        events = [push.change("document", pk, "updated") for pk in range(500)]
+        # Publish until the listener has connected.
+        received = []
+        while not received:
+            backend.publish(events)
+            try:
+                received = delivered.get(timeout=0.5)
+            except queue.Empty:
+                pass
+
+        # Split over several notifications, each under the payload limit.
+        notifications = 1
+        while len(received) < len(events):
+            received += delivered.get(timeout=5)
+            notifications += 1
+        assert notifications > 1
+        assert [tuple(pair) for pair in received] == events
+    finally:
+        backend.stop()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_postgres_backend_splits_events_with_many_channels():
+    delivered = queue.Queue()
+    backend = push.PostgresBackend()
+    backend.poll_timeout = 0.1
+    backend.start(delivered.put)
+    try:
+        # Publish until the listener has connected.
+        probe = push.change("document", 0, "updated")
+        while True:
+            backend.publish([probe])
+            try:
+                delivered.get(timeout=0.5)
+                break
+            except queue.Empty:
+                pass
+        while not delivered.empty():
+            delivered.get()
+
+        channels, event = push.change(
+            "document", 1, "tagged", [f"topic:{pk}" for pk in range(2000)]
+        )
+        backend.publish([(channels, event)])
+
+        # Too big for one notification, split by channel.
+        received = []
+        while sum(len(part) for part, _ in received) < len(channels):
+            received += delivered.get(timeout=5)
+        assert len(received) > 1
+        assert [channel for part, _ in received for channel in part] == channels
+        assert all(data == event for _, data in received)
+    finally:
+        backend.stop()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_committed_writes_succeed_when_pushing_fails(
+    api_client, broker, monkeypatch, caplog, document_1
+):
+    def fail(events):
+        raise RuntimeError("payload string too long")
+
+    monkeypatch.setattr(broker.backend, "publish", fail)
+
+    response = api_client.put(
+        f"/documents/{document_1.id}/", {"title": "renamed"}, format="json"
+    )
+    assert response.status_code == 200
+    assert "Publishing 1 push events failed" in caplog.text
@@ -0,0 +1,79 @@
+"""Guards against N+1 queries by checking how many queries each read endpoint runs.
+
+Every endpoint is exercised with differently sized results and must run the same, fixed number
+of queries regardless of size. If one of these fails after a change, look for a missing
+select_related/prefetch_related before bumping the expected count.
+"""
+
+import pytest
+
+from docmngr.models import Document, Folder, Topic
+
+
+SIZES = [1, 10, 50]
+
+
+@pytest.fixture
+def corpus(request, transactional_db):
+    """A folder with `size` subfolders and `size` documents, each in two topics."""
+    size = request.param
+
+    folder = Folder.objects.create(name="top")
+    for i in range(size):
+        Folder.objects.create(name=f"sub {i}", parent_folder=folder)
+
+    topics = [Topic.objects.create(name=f"topic {i}") for i in range(2)]
+    documents = Document.objects.bulk_create(
+        Document(title=f"doc {i}", content="quick brown dog", folder=folder)
+        for i in range(size)
+    )
+    for topic in topics:
+        topic.documents.add(*documents)
+
+    return folder, topics[0], documents[0]
+
+
+def urls_for(folder, topic, document):
+    """Maps endpoint names to their URL and the number of queries they should run.
+
+    Most counts include an aggregate query per validator queryset, see docmngr.conditional.
+    """
+    return {
+        # Validator, folders
+        "top folders": ("/folders/", 2),
+        "folder with children": (f"/folders/{folder.id}/", 2),
+        # Folder path and validator, recursive subtree query
+        "folder subtree": (f"/folders/{folder.id}/?depth=all", 3),
+        # 2 validators, document, topics of the document
+        "document": (f"/documents/{document.id}/", 4),
+        "topics": ("/topics/", 2),
+        "topic": (f"/topics/{topic.id}/", 2),
+        # 3 validators, folder lookup, page of documents, topics of the page
+        "folder documents": (f"/folders/{folder.id}/documents/", 6),
+        "full folder documents": (f"/folders/{folder.id}/documents/?full=1", 6),
+        "folder documents for topic": (
+            f"/folders/{folder.id}/documents/?topic={topic.id}",
+            6,
+        ),
+        # 2 validators, topic lookup, page of documents, topics of the page
+        "topic documents": (f"/topics/{topic.id}/documents/", 5),
+        # Ranked documents, snippets of their (decompressed) contents
+        "document search": ("/documents/search/?q=dog", 2),
+    }
+
+
+ENDPOINTS = list(urls_for(Folder(id=0), Topic(id=0), Document(id=0)).keys())
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize("corpus", SIZES, indirect=True)
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_query_count_does_not_grow_with_results(
+    api_client, django_assert_num_queries, corpus, endpoint
+):
+    url, expected_queries = urls_for(*corpus)[endpoint]
+
+    with django_assert_num_queries(expected_queries):
+        response = api_client.get(url, format="json")
+
+    assert response.status_code == 200
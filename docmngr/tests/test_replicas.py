@@ -0,0 +1,98 @@
+import pytest
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from docmngr.replicas import PIN_COOKIE
+
+# The "replica" alias is the primary's test database, see the settings.
+databases = ["default", "replica"]
+
+
+@pytest.fixture
+def replica(settings):
+    settings.DOCMNGR_REPLICAS = ["replica"]
+
+
+def count_queries(request):
+    """Makes the request, returns its response and its number of queries per database."""
+    with CaptureQueriesContext(connections["default"]) as primary:
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            response = request()
+    return response, {"default": len(primary), "replica": len(replica)}
+
+
+@pytest.mark.django_db(transaction=True, databases=databases)
+def test_reads_from_replica(api_client, replica, parent_folder, document_1, topic_1):
+    for path in (
+        f"/folders/{parent_folder.id}/",
+        f"/documents/{document_1.id}/",
+        f"/topics/{topic_1.id}/",
+        f"/async/documents/{document_1.id}/",
+    ):
+        response, queries = count_queries(lambda: api_client.get(path))
+        assert response.status_code == 200
+        assert queries["default"] == 0
+        assert queries["replica"] > 0
+
+    # Endpoints outside of DOCMNGR_REPLICA_PATHS read from the primary.
+    _, queries = count_queries(lambda: api_client.get("/changes/"))
+    assert queries == {"default": 1, "replica": 0}
+
+
+@pytest.mark.django_db(transaction=True, databases=databases)
+def test_reads_own_writes_from_primary(api_client, replica, parent_folder):
+    path = f"/folders/{parent_folder.id}/"
+
+    response, queries = count_queries(
+        lambda: api_client.put(path, {"name": "renamed"}, format="json")
+    )
+    assert response.status_code == 200
+    assert queries["replica"] == 0
+    assert response.cookies[PIN_COOKIE]["max-age"] == 10
+
+    # The client that wrote reads from the primary, others still from the replica.
+    response, queries = count_queries(lambda: api_client.get(path))
+    assert response["X-Cache"] == "MISS"
+    assert queries["replica"] == 0
+    assert queries["default"] > 0
+
+    response, queries = count_queries(lambda: APIClient().get(path))
+    assert response["X-Cache"] == "MISS"
+    assert queries["default"] == 0
+    assert queries["replica"] > 0
+
+
+@pytest.mark.django_db(transaction=True, databases=databases)
+def test_does_not_serve_responses_cached_from_replica_to_pinned_clients(
+    api_client, replica, parent_folder
+):
+    path = f"/folders/{parent_folder.id}/"
+    api_client.put(path, {"name": "renamed"}, format="json")
+
+    # Cached from the replica, which could still have the folder from before the write.
+    response = APIClient().get(path)
+    assert response["X-Cache"] == "MISS"
+    response = APIClient().get(path)
+    assert response["X-Cache"] == "HIT"
+
+    response, queries = count_queries(lambda: api_client.get(path))
+    assert response["X-Cache"] == "MISS"
+    assert queries["default"] > 0
+    assert queries["replica"] == 0
+
+
+@pytest.mark.django_db(transaction=True, databases=databases)
+def test_does_not_pin_after_failed_writes(api_client, replica):
+    response = api_client.put("/folders/999/", {"name": "nope"}, format="json")
+    assert response.status_code == 404
+    assert PIN_COOKIE not in response.cookies
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reads_from_primary_without_replicas(api_client, parent_folder):
+    response = api_client.put(
+        f"/folders/{parent_folder.id}/", {"name": "renamed"}, format="json"
+    )
+    assert PIN_COOKIE not in response.cookies
+    assert api_client.get(f"/folders/{parent_folder.id}/").status_code == 200
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from docmngr.models import Document
+
+
+@pytest.fixture
+def many_documents(transactional_db, parent_folder, topic_1):
+    documents = [
+        Document.objects.create(title=f"doc {i}", content="foo", folder=parent_folder)
+        for i in range(5)
+    ]
+    topic_1.documents.add(*documents)
+    return documents
+
+
+def get_page(api_client, url):
+    response = api_client.get(url, format="json")
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize("full", ["0", "1"])
+def test_streams_json_array(api_client, settings, parent_folder, many_documents, full):
+    settings.DOCMNGR_STREAM_CHUNK_SIZE = 2
+    url = f"/folders/{parent_folder.id}/documents/?full={full}"
+
+    response = api_client.get(f"{url}&stream=1")
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "application/json"
+    chunks = list(response.streaming_content)
+    # Opening bracket, 3 chunks of at most 2 documents, closing bracket
+    assert len(chunks) == 5
+    assert json.loads(b"".join(chunks)) == get_page(api_client, url)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_streams_ndjson(api_client, settings, topic_1, many_documents):
+    settings.DOCMNGR_STREAM_CHUNK_SIZE = 2
+    url = f"/topics/{topic_1.id}/documents/"
+
+    response = api_client.get(url, HTTP_ACCEPT="application/x-ndjson")
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = b"".join(response.streaming_content).splitlines()
+    assert [json.loads(line) for line in lines] == get_page(api_client, url)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_streams_empty_listing(api_client, parent_folder):
+    response = api_client.get(f"/folders/{parent_folder.id}/documents/?stream=1")
+
+    assert b"".join(response.streaming_content) == b"[]"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_does_not_cache_streams(api_client, parent_folder, many_documents):
+    url = f"/folders/{parent_folder.id}/documents/?stream=1"
+    b"".join(api_client.get(url).streaming_content)
+
+    response = api_client.get(url)
+
+    assert response["X-Cache"] == "MISS"
+    assert len(json.loads(b"".join(response.streaming_content))) == 5
+
+
+@pytest.mark.django_db(transaction=True)
+def test_streamed_listing_not_found_as_ndjson(api_client, deleted_folder):
+    response = api_client.get(
+        f"/folders/{deleted_folder.id}/documents/", HTTP_ACCEPT="application/x-ndjson"
+    )
+
+    assert response.status_code == 404
+    assert response.content.endswith(b"}\n")
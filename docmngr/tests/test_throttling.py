@@ -0,0 +1,168 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache, caches
+from django.test import AsyncClient, Client
+
+from docmngr import throttling
+
+
+@pytest.fixture
+def now(monkeypatch):
+    """Frozen time of the token buckets, in a list so tests can move it."""
+    now = [1000.0]
+    monkeypatch.setattr(throttling.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.mark.django_db(transaction=True)
+def test_throttles_reads_past_the_limit(api_client, settings, now, parent_folder):
+    settings.DOCMNGR_RATE_LIMITS = {"read": (3, 0.5)}
+
+    for _ in range(3):
+        assert api_client.get(f"/folders/{parent_folder.id}/").status_code == 200
+
+    response = api_client.get(f"/folders/{parent_folder.id}/")
+    assert response.status_code == 429
+    assert response["Retry-After"] == "2"
+
+    # Other route classes have buckets of their own.
+    response = api_client.put(
+        f"/folders/{parent_folder.id}/", {"name": "renamed"}, format="json"
+    )
+    assert response.status_code == 200
+
+    now[0] += 1.5
+    response = api_client.get(f"/folders/{parent_folder.id}/")
+    assert response.status_code == 429
+    assert response["Retry-After"] == "1"
+
+    now[0] += 0.5
+    assert api_client.get(f"/folders/{parent_folder.id}/").status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+def test_throttles_bulk_requests_separately(
+    api_client, settings, now, parent_folder, topic_1
+):
+    settings.DOCMNGR_RATE_LIMITS = {
+        "read": (100, 1),
+        "write": (100, 1),
+        "bulk": (1, 0.1),
+    }
+
+    def create():
+        return api_client.post(
+            "/documents/bulk/",
+            [{"title": "new", "content": "new", "folder": parent_folder.id}],
+            format="json",
+        )
+
+    assert create().status_code == 201
+    response = create()
+    assert response.status_code == 429
+    assert response["Retry-After"] == "10"
+
+    response = api_client.delete(
+        "/documents/topics/", {"documents": [], "topics": [topic_1.id]}, format="json"
+    )
+    assert response.status_code == 429
+    assert api_client.get(f"/topics/{topic_1.id}/").status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+def test_throttles_each_client_separately(settings, now, parent_folder):
+    settings.DOCMNGR_RATE_LIMITS = {"read": (1, 0.1)}
+    settings.DOCMNGR_TRUSTED_PROXIES = 1
+    path = f"/folders/{parent_folder.id}/"
+
+    def get(**headers):
+        return Client(headers=headers).get(path).status_code
+
+    assert get(x_api_key="first") == 200
+    assert get(x_api_key="first") == 429
+    assert get(x_api_key="second") == 200
+
+    # By the address the trusted proxy got the request from.
+    assert get(x_forwarded_for="10.0.0.1") == 200
+    assert get(x_forwarded_for="10.0.0.1") == 429
+    assert get(x_forwarded_for="10.0.0.1, 10.0.0.2") == 200
+    assert get(x_forwarded_for="10.0.0.9, 10.0.0.2") == 429
+
+
+@pytest.mark.django_db(transaction=True)
+def test_sheds_requests_past_the_concurrency_limit(api_client, settings, parent_folder):
+    settings.DOCMNGR_MAX_CONCURRENT_REQUESTS = 2
+
+    # As if two requests were being served already.
+    cache.set("docmngr-throttling:concurrent", 2)
+    response = api_client.get(f"/folders/{parent_folder.id}/")
+    assert response.status_code == 503
+    assert response["Retry-After"] == "1"
+    assert cache.get("docmngr-throttling:concurrent") == 2
+
+    cache.decr("docmngr-throttling:concurrent")
+    assert api_client.get(f"/folders/{parent_folder.id}/").status_code == 200
+    assert cache.get("docmngr-throttling:concurrent") == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_counts_streamed_responses_until_done(api_client, parent_folder, document_1):
+    response = api_client.get(
+        f"/folders/{parent_folder.id}/documents/", HTTP_ACCEPT="application/x-ndjson"
+    )
+    assert response.streaming
+    assert cache.get("docmngr-throttling:concurrent") == 1
+
+    b"".join(response.streaming_content)
+    assert cache.get("docmngr-throttling:concurrent") == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_keeps_counting_after_the_count_expired(
+    api_client, settings, parent_folder, document_1
+):
+    settings.DOCMNGR_MAX_CONCURRENT_REQUESTS = 1
+    path = f"/folders/{parent_folder.id}/documents/"
+
+    held = api_client.get(path, HTTP_ACCEPT="application/x-ndjson")
+    assert cache.get("docmngr-throttling:concurrent") == 1
+
+    # Expires while the streamed response is still being sent.
+    cache.delete("docmngr-throttling:concurrent")
+    assert api_client.get(f"/folders/{parent_folder.id}/").status_code == 200
+    b"".join(held.streaming_content)
+    assert cache.get("docmngr-throttling:concurrent") == 0
+
+    # The limit still holds.
+    held = api_client.get(path, HTTP_ACCEPT="application/x-ndjson")
+    assert api_client.get(f"/folders/{parent_folder.id}/").status_code == 503
+    b"".join(held.streaming_content)
+    assert api_client.get(f"/folders/{parent_folder.id}/").status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+def test_extends_the_count_while_requests_start(
+    api_client, settings, monkeypatch, parent_folder
+):
+    settings.DOCMNGR_CONCURRENCY_TIMEOUT = 7
+    touched = []
+    monkeypatch.setattr(
+        caches["default"], "touch", lambda key, timeout: touched.append((key, timeout))
+    )
+
+    api_client.get(f"/folders/{parent_folder.id}/")
+    assert touched == [("docmngr-throttling:concurrent", 7)]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_throttles_async_requests(settings, now, parent_folder):
+    settings.DOCMNGR_RATE_LIMITS = {"read": (1, 0.1)}
+
+    async def get():
+        return (
+            await AsyncClient().get(f"/async/folders/{parent_folder.id}/")
+        ).status_code
+
+    assert async_to_sync(get)() == 200
+    assert async_to_sync(get)() == 429
+    assert cache.get("docmngr-throttling:concurrent") == 0
@@ -0,0 +1,88 @@
+import logging
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from docmngr import timing
+
+
+@pytest.fixture
+def timed_settings(settings):
+    settings.MIDDLEWARE = [
+        "docmngr.timing.ServerTimingMiddleware",
+        *settings.MIDDLEWARE,
+    ]
+    return settings
+
+
+def parse_server_timing(header):
+    """Returns {metric: (duration, description)} of a Server-Timing header."""
+    metrics = {}
+    for metric in header.split(", "):
+        match = re.fullmatch(r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?', metric)
+        assert match, metric
+        metrics[match[1]] = (float(match[2]), match[3])
+
+    return metrics
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize("prefix", ["", "/async"])
+def test_adds_server_timing_header(api_client, timed_settings, document_1, prefix):
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(f"{prefix}/documents/{document_1.id}/")
+
+    assert response.status_code == 200
+    metrics = parse_server_timing(response["Server-Timing"])
+    assert list(metrics) == ["db", "serialize", "render", "total"]
+    assert metrics["db"][1] == f"{len(queries)} queries"
+    assert metrics["total"][0] >= metrics["db"][0]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_logs_timings(api_client, timed_settings, caplog, parent_folder):
+    with caplog.at_level(logging.INFO, logger="docmngr.timing"):
+        api_client.get(f"/folders/{parent_folder.id}/")
+
+    [record] = caplog.records
+    assert record.timings["path"] == f"/folders/{parent_folder.id}/"
+    assert record.timings["status"] == 200
+    assert record.timings["queries"] > 0
+    assert f"queries={record.timings['queries']}" in record.getMessage()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_logs_slow_queries(api_client, timed_settings, caplog, parent_folder):
+    timed_settings.DOCMNGR_SLOW_QUERY_MS = 0
+    with caplog.at_level(logging.WARNING, logger="docmngr.timing"):
+        api_client.get("/topics/")
+
+    assert caplog.records
+    for record in caplog.records:
+        assert record.slow_query["view"] == "docmngr.views.TopicsView"
+        assert "docmngr_topic" in record.slow_query["sql"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_no_timings_without_middleware(api_client, parent_folder):
+    response = api_client.get(f"/folders/{parent_folder.id}/")
+
+    assert "Server-Timing" not in response
+    assert timing.measure("serialize") is timing.measure("render")
+
+
+def test_counts_nested_measurements_once():
+    timings = timing._Timings(request=None)
+    token = timing._timings.set(timings)
+    try:
+        with timing.measure("serialize"):
+            with timing.measure("serialize"):
+                pass
+            outer_only = timings.durations["serialize"]
+    finally:
+        timing._timings.reset(token)
+
+    assert outer_only == 0
+    assert timings.durations["serialize"] > 0
@@ -1,6 +1,6 @@
 import pytest
 
-from docmngr.models import Document, Folder
+from docmngr.models import Document, DocumentContent, Folder
 
 
 # #########################
@@ -23,6 +23,68 @@ def test_gets_folder(api_client, parent_folder, child_folder, deleted_folder):
     assert folders[1]["name"] == "child_1 ✓"
 
 
+@pytest.mark.django_db(transaction=True)
+def test_gets_folder_subtree(
+    api_client, parent_folder, child_folder, grandchild_folder, deleted_folder
+):
+    response = api_client.get(f"/folders/{parent_folder.id}/?depth=all", format="json")
+    assert response.status_code == 200
+
+    folder = response.data
+    assert folder["name"] == "top_1"
+
+    # Make sure deleted folder was excluded.
+    assert len(folder["children"]) == 1
+    assert folder["children"][0]["name"] == "child_1 ✓"
+    assert folder["children"][0]["children"][0]["name"] == "grandchild_1"
+    assert folder["children"][0]["children"][0]["children"] == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gets_folder_subtree_to_limited_depth(
+    api_client, parent_folder, child_folder, grandchild_folder
+):
+    response = api_client.get(f"/folders/{parent_folder.id}/?depth=1", format="json")
+    assert response.status_code == 200
+    assert response.data["children"][0]["children"] == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gets_whole_hierarchy(api_client, parent_folder, child_folder):
+    response = api_client.get("/folders/?depth=all", format="json")
+    assert response.status_code == 200
+    assert response.data[0]["name"] == "top_1"
+    assert response.data[0]["children"][0]["name"] == "child_1 ✓"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gets_folder_subtree_in_one_query(
+    api_client,
+    django_assert_num_queries,
+    parent_folder,
+    child_folder,
+    grandchild_folder,
+):
+    # The folder path and aggregate for the ETag (see docmngr.conditional), then the whole
+    # subtree in one go.
+    with django_assert_num_queries(3) as captured:
+        api_client.get(f"/folders/{parent_folder.id}/?depth=all", format="json")
+
+    assert "WITH RECURSIVE" in captured.captured_queries[-1]["sql"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_get_subtree_with_invalid_depth(api_client, parent_folder):
+    response = api_client.get(f"/folders/{parent_folder.id}/?depth=-1", format="json")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_get_subtree_of_deleted_folder(api_client, deleted_folder):
+    response = api_client.get(f"/folders/{deleted_folder.id}/?depth=all", format="json")
+    assert response.status_code == 404
+
+
 @pytest.mark.django_db(transaction=True)
 def test_gets_top_folders(api_client, parent_folder, child_folder):
     response = api_client.get("/folders/", format="json")
@@ -90,6 +152,54 @@ def test_renames_folder_to_invalid_name(api_client, parent_folder):
     assert response.data["name"][0].code == "max_length"
 
 
+@pytest.mark.django_db(transaction=True)
+def test_moves_folder(api_client, parent_folder, child_folder, grandchild_folder):
+    other_folder = Folder.objects.create(name="top_2")
+
+    response = api_client.put(
+        f"/folders/{child_folder.id}/",
+        {"parent_folder": other_folder.id},
+        format="json",
+    )
+    assert response.status_code == 200
+    assert response.data["parent_folder"] == other_folder.id
+
+    # The whole subtree should have followed the moved folder.
+    grandchild_folder.refresh_from_db()
+    assert (
+        grandchild_folder.path
+        == f"/{other_folder.id}/{child_folder.id}/{grandchild_folder.id}/"
+    )
+    assert grandchild_folder.is_within(other_folder)
+    assert not grandchild_folder.is_within(parent_folder)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_move_folder_into_its_descendant(
+    api_client, parent_folder, child_folder, grandchild_folder
+):
+    response = api_client.put(
+        f"/folders/{parent_folder.id}/",
+        {"parent_folder": grandchild_folder.id},
+        format="json",
+    )
+    assert response.status_code == 400
+    assert "parent_folder" in response.data
+
+    parent_folder.refresh_from_db()
+    assert parent_folder.parent_folder is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_move_folder_into_itself(api_client, parent_folder):
+    response = api_client.put(
+        f"/folders/{parent_folder.id}/",
+        {"parent_folder": parent_folder.id},
+        format="json",
+    )
+    assert response.status_code == 400
+
+
 @pytest.mark.django_db(transaction=True)
 def test_tries_to_rename_not_existing_folder(api_client):
     folder_data = {"name": "foobar"}
@@ -106,6 +216,120 @@ def test_tries_to_rename_deleted_folder(api_client, deleted_folder):
     assert response.status_code == 404
 
 
+@pytest.mark.django_db(transaction=True)
+def test_deletes_folder_subtree(
+    api_client, parent_folder, child_folder, grandchild_folder, document_1
+):
+    nested_document = Document.objects.create(
+        title="nested", content="foo", folder=grandchild_folder
+    )
+
+    response = api_client.delete(f"/folders/{child_folder.id}/", format="json")
+    assert response.status_code == 204
+
+    assert Folder.objects.get(pk=child_folder.id).is_deleted
+    assert Folder.objects.get(pk=grandchild_folder.id).is_deleted
+    assert Document.objects.get(pk=nested_document.id).is_deleted
+
+    # Things outside the deleted subtree are untouched.
+    assert not Folder.objects.get(pk=parent_folder.id).is_deleted
+    assert not Document.objects.get(pk=document_1.id).is_deleted
+
+    response = api_client.get(f"/folders/{grandchild_folder.id}/", format="json")
+    assert response.status_code == 404
+    response = api_client.get(f"/documents/{nested_document.id}/", format="json")
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_deletes_folder_subtree_in_fixed_number_of_queries(
+    api_client, django_assert_num_queries, parent_folder, child_folder
+):
+    for i in range(20):
+        folder = Folder.objects.create(name=f"sub_{i}", parent_folder=child_folder)
+        Document.objects.create(title=f"doc_{i}", content="foo", folder=folder)
+
+    # Lookup, subtree size, savepoint, folder lock, folder update, document update, folder and
+    # topic counts, change, release savepoint.
+    with django_assert_num_queries(10):
+        response = api_client.delete(f"/folders/{parent_folder.id}/", format="json")
+    assert response.status_code == 204
+
+    assert not Folder.without_deleted().exists()
+    assert not Document.without_deleted().exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_tries_to_delete_deleted_folder(api_client, deleted_folder):
+    response = api_client.delete(f"/folders/{deleted_folder.id}/", format="json")
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_restores_folder_subtree(api_client, parent_folder, child_folder, document_1):
+    api_client.delete(f"/folders/{parent_folder.id}/", format="json")
+
+    response = api_client.post(f"/folders/{parent_folder.id}/restore/", format="json")
+    assert response.status_code == 200
+    assert response.data["name"] == "top_1"
+
+    assert not Folder.objects.get(pk=child_folder.id).is_deleted
+    assert not Document.objects.get(pk=document_1.id).is_deleted
+
+
+@pytest.mark.django_db(transaction=True)
+def test_restores_only_what_deleting_the_folder_deleted(
+    api_client,
+    parent_folder,
+    child_folder,
+    grandchild_folder,
+    document_1,
+    deleted_document,
+):
+    api_client.delete(f"/folders/{grandchild_folder.id}/", format="json")
+    api_client.delete(f"/folders/{parent_folder.id}/", format="json")
+
+    response = api_client.post(f"/folders/{parent_folder.id}/restore/", format="json")
+    assert response.status_code == 200
+
+    assert not Folder.objects.get(pk=child_folder.id).is_deleted
+    assert not Document.objects.get(pk=document_1.id).is_deleted
+    # Deleted on their own before, they stay deleted.
+    assert Folder.objects.get(pk=grandchild_folder.id).is_deleted
+    assert Document.objects.get(pk=deleted_document.id).is_deleted
+
+    response = api_client.post(
+        f"/folders/{grandchild_folder.id}/restore/", format="json"
+    )
+    assert response.status_code == 200
+    assert not Folder.objects.get(pk=grandchild_folder.id).is_deleted
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_restore_folder_under_deleted_folder(
+    api_client, parent_folder, child_folder
+):
+    api_client.delete(f"/folders/{parent_folder.id}/", format="json")
+
+    response = api_client.post(f"/folders/{child_folder.id}/restore/", format="json")
+    assert response.status_code == 409
+    assert Folder.objects.get(pk=child_folder.id).is_deleted
+
+
+@pytest.mark.django_db(transaction=True)
+def test_tries_to_restore_folder_that_is_not_deleted(api_client, parent_folder):
+    response = api_client.post(f"/folders/{parent_folder.id}/restore/", format="json")
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_create_folder_in_deleted_folder(api_client, deleted_folder):
+    folder_data = {"name": "foobar", "parent_folder": deleted_folder.id}
+    response = api_client.post("/folders/", folder_data, format="json")
+    assert response.status_code == 400
+    assert response.data["parent_folder"][0].code == "does_not_exist"
+
+
 # ##########################
 # ### Document API Tests ###
 # ##########################
@@ -158,6 +382,14 @@ def test_fails_to_create_invalid_document(api_client, parent_folder):
     assert response.data["content"][0].code == "required"
 
 
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_create_document_in_deleted_folder(api_client, deleted_folder):
+    document_data = {"title": "foobar", "content": "foo", "folder": deleted_folder.id}
+    response = api_client.post("/documents/", document_data, format="json")
+    assert response.status_code == 400
+    assert response.data["folder"][0].code == "does_not_exist"
+
+
 @pytest.mark.django_db(transaction=True)
 def test_move_document(api_client, document_1, child_folder):
     document_data = {"folder": child_folder.id}
@@ -179,6 +411,62 @@ def test_tries_to_move_not_existing_document(api_client):
     assert response.status_code == 404
 
 
+@pytest.mark.django_db(transaction=True)
+def test_lists_and_gets_document_revisions(api_client, document_1):
+    api_client.put(
+        f"/documents/{document_1.id}/",
+        {"title": "doc1 v2", "content": "<p>second</p>"},
+        format="json",
+    )
+
+    response = api_client.get(f"/documents/{document_1.id}/revisions/", format="json")
+    assert response.status_code == 200
+    assert [(r["number"], r["title"]) for r in response.data] == [
+        (1, "doc1"),
+        (2, "doc1 v2"),
+    ]
+    assert "content" not in response.data[0]
+
+    response = api_client.get(f"/documents/{document_1.id}/revisions/2/", format="json")
+    assert response.status_code == 200
+    assert response.data["content"] == "<p>second</p>"
+
+    response = api_client.get(f"/documents/{document_1.id}/revisions/3/", format="json")
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_restores_document_revision(api_client, document_1):
+    api_client.put(
+        f"/documents/{document_1.id}/", {"content": "<p>oops</p>"}, format="json"
+    )
+    # Make sure the cached document gets replaced.
+    api_client.get(f"/documents/{document_1.id}/", format="json")
+
+    response = api_client.post(
+        f"/documents/{document_1.id}/revisions/1/restore/", format="json"
+    )
+    assert response.status_code == 200
+    assert response.data["content"] == ""
+
+    response = api_client.get(f"/documents/{document_1.id}/", format="json")
+    assert response.data["content"] == ""
+    assert document_1.revisions.count() == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_get_revisions_of_deleted_document(api_client, deleted_document):
+    response = api_client.get(
+        f"/documents/{deleted_document.id}/revisions/", format="json"
+    )
+    assert response.status_code == 404
+
+    response = api_client.post(
+        f"/documents/{deleted_document.id}/revisions/1/restore/", format="json"
+    )
+    assert response.status_code == 404
+
+
 # ##########################
 # ###   Topic API Tests  ###
 # ##########################
@@ -201,6 +489,30 @@ def test_gets_all_topics(api_client, topic_1, topic_2):
     assert len(response.data) == 2
 
 
+@pytest.mark.django_db(transaction=True)
+def test_lists_document_counts(api_client, parent_folder, document_1, topic_1, topic_2):
+    folders = api_client.get("/folders/", format="json").data
+    assert folders[0]["documents_count"] == 1
+    topics = api_client.get("/topics/", format="json").data
+    assert [topic["documents_count"] for topic in topics] == [1, 0]
+
+    # Counts shown by cached and conditional responses follow changes.
+    api_client.post(
+        "/documents/",
+        {"title": "new", "content": "new", "folder": parent_folder.id},
+        format="json",
+    )
+    api_client.post(f"/documents/{document_1.id}/topics/{topic_2.id}/", format="json")
+
+    folders = api_client.get("/folders/", format="json").data
+    assert folders[0]["documents_count"] == 2
+    topic = api_client.get(f"/topics/{topic_2.id}/", format="json").data
+    assert topic["documents_count"] == 1
+    # Documents only show the id and name of their topics.
+    document = api_client.get(f"/documents/{document_1.id}/", format="json").data
+    assert document["topics"][0] == {"id": topic_1.id, "name": topic_1.name}
+
+
 @pytest.mark.django_db(transaction=True)
 def test_add_document_to_topic(api_client, document_1, topic_1, topic_2):
     response = api_client.post(
@@ -239,6 +551,43 @@ def test_gets_docs_for_folder(api_client, parent_folder, document_1):
     assert response.data[0]["title"] == "doc1"
 
 
+@pytest.mark.django_db(transaction=True)
+def test_gets_doc_summaries_for_folder(
+    api_client, django_assert_max_num_queries, parent_folder
+):
+    Document.objects.create(
+        title="doc1", content="<p>quick <b>brown</b> dog</p>", folder=parent_folder
+    )
+
+    with django_assert_max_num_queries(10) as captured:
+        response = api_client.get(
+            f"/folders/{parent_folder.id}/documents/", format="json"
+        )
+    assert response.status_code == 200
+
+    document = response.data[0]
+    assert "content" not in document
+    assert document["excerpt"] == "quick brown dog"
+    assert document["content_length"] == len("quick brown dog")
+
+    # The content column should never be read for summaries.
+    for query in captured.captured_queries:
+        assert '"docmngr_document"."content",' not in query["sql"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gets_full_docs_for_folder(api_client, parent_folder):
+    Document.objects.create(
+        title="doc1", content="quick brown dog", folder=parent_folder
+    )
+
+    response = api_client.get(
+        f"/folders/{parent_folder.id}/documents/?full=1", format="json"
+    )
+    assert response.status_code == 200
+    assert response.data[0]["content"] == "quick brown dog"
+
+
 @pytest.mark.django_db(transaction=True)
 def test_gets_docs_for_folder_and_topic(
     api_client, parent_folder, topic_1, document_1, document_2
@@ -249,3 +598,134 @@ def test_gets_docs_for_folder_and_topic(
     assert response.status_code == 200
     assert len(response.data) == 1
     assert response.data[0]["title"] == "doc1"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gets_docs_for_folder_without_deleted_docs(
+    api_client, parent_folder, document_1, deleted_document
+):
+    response = api_client.get(f"/folders/{parent_folder.id}/documents/", format="json")
+    assert response.status_code == 200
+    assert [document["title"] for document in response.data] == ["doc1"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_get_docs_for_deleted_folder(api_client, deleted_folder):
+    response = api_client.get(f"/folders/{deleted_folder.id}/documents/", format="json")
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gets_docs_for_topic_without_deleted_docs(
+    api_client, topic_1, document_1, deleted_document
+):
+    deleted_document.topics.add(topic_1)
+
+    response = api_client.get(f"/topics/{topic_1.id}/documents/", format="json")
+    assert response.status_code == 200
+    assert [document["title"] for document in response.data] == ["doc1"]
+
+
+# ##########################
+# ###  Search API Tests  ###
+# ##########################
+@pytest.fixture
+def searchable_documents(transactional_db, parent_folder, child_folder, topic_1):
+    in_title = Document.objects.create(
+        title="Returning shipments",
+        content="<p>Fill out the form at the front desk.</p>",
+        folder=parent_folder,
+    )
+    in_content = Document.objects.create(
+        title="Mail room procedures",
+        content="<p>Incoming <b>shipments</b> are sorted by noon.</p>",
+        folder=child_folder,
+    )
+    in_content.topics.add(topic_1)
+    unrelated = Document.objects.create(
+        title="Bathroom",
+        content="Take a left at the water cooler",
+        folder=parent_folder,
+    )
+    return in_title, in_content, unrelated
+
+
+@pytest.mark.django_db(transaction=True)
+def test_searches_documents(api_client, searchable_documents):
+    in_title, in_content, _ = searchable_documents
+
+    response = api_client.get("/documents/search/?q=shipment", format="json")
+    assert response.status_code == 200
+
+    # Title matches rank above content matches.
+    assert [result["id"] for result in response.data] == [in_title.id, in_content.id]
+    assert "<mark>shipments</mark>" in response.data[1]["snippet"]
+    # Markup from the rich text content is stripped from snippets.
+    assert "<b>" not in response.data[1]["snippet"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_searches_updated_documents(api_client, searchable_documents):
+    _, _, unrelated = searchable_documents
+    unrelated.content = "Shipments go out at five"
+    unrelated.save()
+
+    response = api_client.get("/documents/search/?q=shipment", format="json")
+    assert unrelated.id in [result["id"] for result in response.data]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_searches_documents_in_folder(api_client, parent_folder, searchable_documents):
+    _, in_content, _ = searchable_documents
+    other_folder = Folder.objects.create(name="top_2")
+
+    response = api_client.get(
+        f"/documents/search/?q=shipment&folder={parent_folder.id}", format="json"
+    )
+    # Documents in folders below the searched folder are included.
+    assert len(response.data) == 2
+
+    in_content.folder = other_folder
+    in_content.save()
+    response = api_client.get(
+        f"/documents/search/?q=shipment&folder={parent_folder.id}", format="json"
+    )
+    assert len(response.data) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_searches_documents_in_topic(api_client, topic_1, searchable_documents):
+    _, in_content, _ = searchable_documents
+
+    response = api_client.get(
+        f"/documents/search/?q=shipment&topic={topic_1.id}", format="json"
+    )
+    assert [result["id"] for result in response.data] == [in_content.id]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_searches_documents_without_stored_content(api_client, searchable_documents):
+    in_title, _, _ = searchable_documents
+    DocumentContent.objects.filter(document=in_title).delete()
+
+    response = api_client.get("/documents/search/?q=shipment", format="json")
+    assert response.data[0]["id"] == in_title.id
+    assert "content_data" not in response.data[0]
+    assert response.data[0]["snippet"] == ""
+
+
+@pytest.mark.django_db(transaction=True)
+def test_search_excludes_deleted_documents(api_client, searchable_documents):
+    in_title, _, _ = searchable_documents
+    in_title.is_deleted = True
+    in_title.save()
+
+    response = api_client.get("/documents/search/?q=shipment", format="json")
+    assert in_title.id not in [result["id"] for result in response.data]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fails_to_search_without_query(api_client):
+    response = api_client.get("/documents/search/", format="json")
+    assert response.status_code == 400
+    assert response.data["q"][0].code == "required"
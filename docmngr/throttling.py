@@ -0,0 +1,219 @@
+"""Per-client rate limits and a global limit of concurrent requests, to keep Postgres responsive.
+
+Rationale: A single client requesting in a loop could take up every database connection and
+slow everyone else down. ThrottlingMiddleware turns away requests past those limits before they
+reach the database, which is cheap, rather than queueing them on it.
+
+Rate limits are token buckets per client and route class, DOCMNGR_RATE_LIMITS sets the
+(capacity, tokens added per second) of each class:
+
+    read    GET, HEAD and OPTIONS requests
+    write   Other requests
+    bulk    Views decorated with @route_class("bulk"), the bulk endpoints
+
+Every request takes a token from its client's bucket of the class, and is answered with 429
+when there is none, with a Retry-After header of the seconds until there will be. Clients are
+identified by their X-Api-Key header, or their IP address without one (DOCMNGR_TRUSTED_PROXIES
+sets how many proxies in front of us add to X-Forwarded-For, e.g. 1 on Heroku).
+
+At most DOCMNGR_MAX_CONCURRENT_REQUESTS requests are served at a time across all processes (per
+process with the default cache, see below), more get a 503 with `Retry-After: 1`. Set it below
+the number of connections Postgres accepts, a request uses at most one. Streamed responses count
+until they're done.
+
+State is kept in the cache of DOCMNGR_THROTTLING_CACHE_ALIAS. Without REDIS_URL that's the
+local memory cache, which makes both limits per process: each process has buckets and a count
+of its own, and N processes serve up to N times DOCMNGR_MAX_CONCURRENT_REQUESTS at a time. Only
+with Redis are they shared between processes. Reading and updating a bucket isn't atomic,
+concurrent requests of one client can get a few more requests through than its limit.
+
+The count of concurrent requests is atomic (cache.incr()). So that requests of processes that
+died don't count forever, it expires DOCMNGR_CONCURRENCY_TIMEOUT seconds after the last request
+started (or sooner when evicted from a full cache). Requests still being served then aren't
+counted anymore, and releasing them doesn't take the count of the requests started since below
+zero.
+
+Set DOCMNGR_RATE_LIMITS to {} or DOCMNGR_MAX_CONCURRENT_REQUESTS to None to turn either off, or
+the DOCMNGR_THROTTLING environment variable to "off" for both.
+"""
+
+import math
+import time
+from hashlib import md5
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+
+_CONCURRENCY_KEY = "docmngr-throttling:concurrent"
+
+
+def route_class(name):
+    """Decorator setting the route class of a view, whose rate limit applies to its requests.
+
+    Goes above @api_view, see the module docstring.
+    """
+
+    def decorator(view_func):
+        view_func.route_class = name
+        return view_func
+
+    return decorator
+
+
+class ThrottlingMiddleware:
+    """Applies the rate limits and the concurrency limit, see the module docstring."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if not _acquire():
+            return _overloaded()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            _release()
+            raise
+
+        return _release_when_done(response)
+
+    async def __acall__(self, request):
+        if not _acquire():
+            return _overloaded()
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            _release()
+            raise
+
+        return _release_when_done(response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        limits = settings.DOCMNGR_RATE_LIMITS
+        name = getattr(view_func, "route_class", None)
+        if name is None:
+            name = "read" if request.method in ("GET", "HEAD", "OPTIONS") else "write"
+        if name not in limits:
+            return None
+
+        capacity, rate = limits[name]
+        wait = _take_token(f"{name}:{_client_id(request)}", capacity, rate)
+        if wait:
+            return JsonResponse(
+                {"detail": "Request was throttled."},
+                status=429,
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+        return None
+
+
+def _cache():
+    return caches[settings.DOCMNGR_THROTTLING_CACHE_ALIAS]
+
+
+def _client_id(request):
+    key = request.headers.get("X-Api-Key")
+    if key:
+        return "key:" + md5(key.encode()).hexdigest()
+
+    address = request.META.get("REMOTE_ADDR")
+    proxies = settings.DOCMNGR_TRUSTED_PROXIES
+    if proxies:
+        # Each proxy appends the address it got the request from, the ones before could be
+        # made up by the client.
+        forwarded = request.headers.get("X-Forwarded-For", "").split(",")
+        if len(forwarded) >= proxies:
+            address = forwarded[-proxies].strip()
+
+    return f"ip:{address}"
+
+
+def _take_token(bucket, capacity, rate):
+    """Takes a token from the bucket, returns 0 or the seconds until there's one to take."""
+    cache = _cache()
+    key = f"docmngr-throttling:{bucket}"
+    now = time.time()
+
+    tokens, updated = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens < 1:
+        return (1 - tokens) / rate
+
+    # Once it would be full again the bucket can be forgotten.
+    cache.set(key, (tokens - 1, now), timeout=math.ceil(capacity / rate) + 1)
+    return 0
+
+
+def _acquire():
+    """Counts a request as being served, returns False if too many are."""
+    limit = settings.DOCMNGR_MAX_CONCURRENT_REQUESTS
+    if limit is None:
+        return True
+
+    cache = _cache()
+    timeout = settings.DOCMNGR_CONCURRENCY_TIMEOUT
+    cache.add(_CONCURRENCY_KEY, 0, timeout=timeout)
+    try:
+        count = cache.incr(_CONCURRENCY_KEY)
+    except ValueError:
+        # Expired since it was added, count from scratch.
+        cache.add(_CONCURRENCY_KEY, 1, timeout=timeout)
+        return True
+    # Expires once no request started for a while, not while requests keep coming.
+    cache.touch(_CONCURRENCY_KEY, timeout=timeout)
+
+    if count > limit:
+        _release()
+        return False
+    return True
+
+
+def _release():
+    if settings.DOCMNGR_MAX_CONCURRENT_REQUESTS is None:
+        return
+
+    cache = _cache()
+    try:
+        if cache.decr(_CONCURRENCY_KEY) < 0:
+            # Started before the count expired, see the module docstring.
+            cache.incr(_CONCURRENCY_KEY)
+    except ValueError:
+        # Expired meanwhile.
+        pass
+
+
+def _release_when_done(response):
+    """Releases the request once the response is done, after streaming it if it's streamed."""
+    # Async iterators can't be wrapped from sync code, those are released when they start.
+    if not response.streaming or response.is_async:
+        _release()
+        return response
+
+    content = response.streaming_content
+
+    def release_after():
+        try:
+            yield from content
+        finally:
+            _release()
+
+    response.streaming_content = release_after()
+    return response
+
+
+def _overloaded():
+    return JsonResponse(
+        {"detail": "Too many requests are being served, try again."},
+        status=503,
+        headers={"Retry-After": "1"},
+    )
@@ -0,0 +1,235 @@
+"""Per-request timings of the database, serialization and rendering.
+
+Opt-in by setting the DOCMNGR_TIMING environment variable, which adds ServerTimingMiddleware to
+the settings. For every request the middleware then records:
+
+    db          Time spent executing queries, and how many were made
+    serialize   Time spent turning objects/rows into data, see measure() for what's counted
+    render      Time spent rendering data to the response body
+    total       Time from the middleware receiving the request to it having a response
+
+and sends them in a `Server-Timing` header, which browsers' developer tools display, e.g.
+
+    Server-Timing: db;dur=4.2;desc="3 queries", serialize;dur=1.3, render;dur=0.8, total;dur=9.1
+
+They're also logged on the "docmngr.timing" logger, at INFO, as a line of key=value pairs (and
+the same values in the `timings` attribute of the log record). Queries slower than the
+DOCMNGR_SLOW_QUERY_MS setting are logged at WARNING, with their SQL and the view making them.
+
+Durations overlap: queries run by lazy querysets while serializing count as both db and
+serialize time. Streamed responses are rendered after the middleware is done with them, so
+their timings only cover what happened before the response started.
+
+When the middleware isn't installed, measure() costs a context variable lookup and nothing is
+recorded.
+"""
+
+import logging
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Timings of the current request, None outside of ServerTimingMiddleware.
+_timings = ContextVar("docmngr_timings", default=None)
+
+_NOT_MEASURED = nullcontext()
+
+
+class _Timings:
+    def __init__(self, request):
+        self.request = request
+        self.queries = 0
+        self.durations = {"db": 0.0, "serialize": 0.0, "render": 0.0}
+        # Names being measured, so nested measurements aren't counted twice.
+        self.measuring = set()
+
+
+class _Measurement:
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.nested = self.name in self.timings.measuring
+        self.timings.measuring.add(self.name)
+
+    def __exit__(self, *exc_info):
+        if not self.nested:
+            self.timings.measuring.discard(self.name)
+            self.timings.durations[self.name] += time.perf_counter() - self.started
+
+
+def measure(name):
+    """Context manager adding the time spent in it to the named timing of the current request.
+
+    Time spent in a measurement of the same name is only counted once, e.g. a nested serializer
+    doesn't add to the time of the serializer it's in.
+    """
+    timings = _timings.get()
+    if timings is None:
+        return _NOT_MEASURED
+
+    return _Measurement(timings, name)
+
+
+def timed(name):
+    """Decorator measuring the time spent in a function, see measure()."""
+
+    def decorator(func):
+        @wraps(func)
+        def inner(*args, **kwargs):
+            with measure(name):
+                return func(*args, **kwargs)
+
+        return inner
+
+    return decorator
+
+
+class TimedSerializerMixin:
+    """Mixin for DRF serializers, measuring to_representation as serialize time."""
+
+    def to_representation(self, instance):
+        with measure("serialize"):
+            return super().to_representation(instance)
+
+
+class ServerTimingMiddleware:
+    """Records the timings of each request, see the module docstring.
+
+    Add it first in MIDDLEWARE, so total includes the other middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+        # Connections are per thread, async views query from other threads than this one.
+        connection_created.connect(_add_query_recorder)
+        for connection in connections.all(initialized_only=True):
+            _add_query_recorder(connection=connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        for connection in connections.all(initialized_only=True):
+            _add_query_recorder(connection=connection)
+
+        timings = _Timings(request)
+        token = _timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+
+        _finish(timings, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        timings = _Timings(request)
+        token = _timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timings.reset(token)
+
+        _finish(timings, response, time.perf_counter() - started)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns, by the request handler.
+        render = response.render
+
+        def timed_render():
+            with measure("render"):
+                return render()
+
+        response.render = timed_render
+        return response
+
+
+def _add_query_recorder(sender=None, connection=None, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _record_query(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        timings.queries += 1
+        timings.durations["db"] += duration
+
+        if duration * 1000 >= settings.DOCMNGR_SLOW_QUERY_MS:
+            view = _view_name(timings.request)
+            logger.warning(
+                "slow query duration_ms=%.1f view=%s sql=%s",
+                duration * 1000,
+                view,
+                sql,
+                extra={
+                    "slow_query": {
+                        "duration_ms": round(duration * 1000, 1),
+                        "view": view,
+                        "sql": sql,
+                        "params": params,
+                    }
+                },
+            )
+
+
+def _finish(timings, response, total):
+    """Adds the Server-Timing header to the response and logs the timings."""
+    milliseconds = {
+        name: round(duration * 1000, 1) for name, duration in timings.durations.items()
+    }
+    milliseconds["total"] = round(total * 1000, 1)
+
+    metrics = [
+        f'db;dur={milliseconds["db"]};desc="{timings.queries} queries"',
+        *(f"{name};dur={milliseconds[name]}" for name in ("serialize", "render")),
+        f'total;dur={milliseconds["total"]}',
+    ]
+    response["Server-Timing"] = ", ".join(metrics)
+
+    request = timings.request
+    values = {
+        "method": request.method,
+        "path": request.path,
+        "view": _view_name(request),
+        "status": response.status_code,
+        "queries": timings.queries,
+        **{f"{name}_ms": value for name, value in milliseconds.items()},
+    }
+    logger.info(
+        " ".join(f"{key}=%s" for key in values),
+        *values.values(),
+        extra={"timings": values},
+    )
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else None
@@ -13,11 +13,23 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.urls import path
+
+from django.urls import include, path
 from django.views.generic import TemplateView
 from rest_framework.schemas import get_schema_view
 
-from docmngr import views
+from docmngr import async_views, views
+
+# Async versions of the read endpoints, see docmngr.async_views
+async_urlpatterns = [
+    path("folders/", async_views.get_folders),
+    path("folders/<int:pk>/", async_views.get_folders),
+    path("folders/<int:folder_pk>/documents/", async_views.get_documents_for_folder),
+    path("documents/<int:pk>/", async_views.get_document),
+    path("topics/<int:pk>/", async_views.get_topics),
+    path("topics/<int:topic_pk>/documents/", async_views.get_documents_for_topic),
+    path("topics/", async_views.get_topics),
+]
 
 urlpatterns = [
     path(
@@ -39,8 +51,21 @@ urlpatterns = [
     ),
     path("folders/", views.FoldersView.as_view()),
     path("folders/<int:pk>/", views.FoldersView.as_view()),
+    path("folders/<int:pk>/restore/", views.restore_folder),
     path("folders/<int:folder_pk>/documents/", views.get_documents_for_folder),
+    path("documents/search/", views.search_documents),
+    path("documents/bulk/", views.create_documents_in_bulk),
+    path("documents/topics/", views.modify_topics_in_bulk),
     path("documents/<int:pk>/", views.DocumentsView.as_view()),
+    path("documents/<int:document_pk>/revisions/", views.get_document_revisions),
+    path(
+        "documents/<int:document_pk>/revisions/<int:number>/",
+        views.get_document_revision,
+    ),
+    path(
+        "documents/<int:document_pk>/revisions/<int:number>/restore/",
+        views.restore_document_revision,
+    ),
     path("documents/", views.DocumentsView.as_view()),
     path("topics/<int:pk>/", views.TopicsView.as_view()),
     path("topics/<int:topic_pk>/documents/", views.get_documents_for_topic),
@@ -49,4 +74,8 @@ urlpatterns = [
         "documents/<int:document_pk>/topics/<int:topic_pk>/",
         views.modify_document_topics,
     ),
+    path("changes/", views.get_changes),
+    path("jobs/<int:pk>/", views.get_job),
+    path("cache/stats/", views.get_cache_stats),
+    path("async/", include(async_urlpatterns)),
 ]
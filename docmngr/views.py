@@ -1,21 +1,53 @@
 from abc import ABC, abstractproperty
-
-from django.db import IntegrityError
-from django.db.models import Q
-from django.http import Http404
-from rest_framework import status
-from rest_framework.decorators import api_view
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.http import Http404, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from rest_framework import serializers, status
+from rest_framework.decorators import api_view, parser_classes, renderer_classes
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
+from docmngr import cache, jobs, push
+from docmngr.cache import cached, folder_generations
+from docmngr.conditional import conditional
+from docmngr.fast_serializers import (
+    document_values,
+    serialize_document_rows,
+    serialize_rows,
+    value_fields,
+)
 from docmngr.models import (
+    BulkDocumentSerializer,
+    BulkTopicsSerializer,
+    Change,
+    ChangeSerializer,
     Document,
+    DocumentContent,
+    DocumentRevision,
+    DocumentRevisionSerializer,
+    DocumentRevisionSummarySerializer,
     DocumentSerializer,
+    DocumentSummarySerializer,
     Folder,
     FolderSerializer,
+    Job,
+    JobSerializer,
     Topic,
     TopicSerializer,
 )
+from docmngr.pagination import ChangeFeedPagination, KeysetPagination
+from docmngr.parsers import NDJSONParser
+from docmngr.renderers import NDJSONRenderer
+from docmngr.throttling import route_class
 
 
 class BaseView(APIView, ABC):
@@ -38,6 +70,17 @@ class BaseView(APIView, ABC):
     def model_class():
         """The Django model class associated with this view's main model."""
 
+    def _get_cache_generations(self, obj):
+        """Names of the cached response generations a change to obj affects, see docmngr.cache."""
+        return []
+
+    def _get_channels(self, obj):
+        """Push channels of where obj is in the folder hierarchy, see docmngr.push.
+
+        A change of them is recorded as a move.
+        """
+        return []
+
     def post(self, request):
         """Create a new object.
 
@@ -49,7 +92,14 @@ class BaseView(APIView, ABC):
 
         if serializer.is_valid():
             try:
-                serializer.save()
+                with transaction.atomic():
+                    serializer.save()
+                    Change.record(
+                        self.model_class._meta.model_name,
+                        [serializer.instance.id],
+                        "created",
+                        self._get_channels(serializer.instance),
+                    )
             # This is a hack to return a proper error when a custom model constraint
             # error (such as the unique within constraint on folders.) This should be handled
             # outside the view layer, in serializer probably.
@@ -58,6 +108,7 @@ class BaseView(APIView, ABC):
                     {"name": ["this name already exists"]},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            cache.invalidate(*self._get_cache_generations(serializer.instance))
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -77,18 +128,47 @@ class BaseView(APIView, ABC):
         serializer = self.serializer_class(obj, data=request.data, partial=True)
 
         if serializer.is_valid():
+            # The object could be moved, so responses for where it was are stale too.
+            generations = self._get_cache_generations(obj)
+            channels = self._get_channels(obj)
             try:
-                serializer.save()
+                with transaction.atomic():
+                    serializer.save()
+                    moved_to = self._get_channels(obj)
+                    # Both where the object was and where it went get the change.
+                    Change.record(
+                        self.model_class._meta.model_name,
+                        [obj.id],
+                        "moved" if moved_to != channels else "updated",
+                        {*channels, *moved_to},
+                    )
             except IntegrityError:
                 return Response(
                     {"name": ["this name already exists"]},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            cache.invalidate(*generations, *self._get_cache_generations(obj))
             return Response(serializer.data)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _folder_querysets(request, pk=None):
+    """The folders a FoldersView.get response is made of, see conditional."""
+    if "depth" not in request.query_params:
+        if pk is not None:
+            return [Folder.without_deleted().filter(Q(pk=pk) | Q(parent_folder=pk))]
+        return [Folder.without_deleted().filter(parent_folder=None)]
+
+    # For subtrees, deleted folders are included so deletes show up in their updated_at.
+    if pk is None:
+        return [Folder.objects.all()]
+    path = Folder.objects.filter(pk=pk).values_list("path", flat=True).first()
+    if path is None:
+        return [Folder.objects.none()]
+    return [Folder.objects.filter(path__startswith=path)]
+
+
 class FoldersView(BaseView):
     model_class = Folder
     serializer_class = FolderSerializer
@@ -101,6 +181,24 @@ class FoldersView(BaseView):
         """
         return Folder.without_deleted()
 
+    def _get_cache_generations(self, folder):
+        return folder_generations(folder)
+
+    def _get_channels(self, folder):
+        return push.folder_channels(folder)
+
+    @method_decorator(
+        cached(
+            lambda request, pk=None: [
+                (
+                    f"subtree:{pk or 'root'}"
+                    if "depth" in request.query_params
+                    else f"folder:{pk or 'root'}"
+                )
+            ]
+        )
+    )
+    @method_decorator(conditional(_folder_querysets))
     def get(self, request, pk=None):
         """Returns a folder along with its children.
 
@@ -109,20 +207,107 @@ class FoldersView(BaseView):
         This is intended to be convenient for a client application that
         will be browsing the folder hierarchy from the top down.
 
+        Pass `?depth=N` (or `?depth=all`) to instead get the nested hierarchy down to N levels
+        below the folder, each folder carrying a `children` list. See _get_subtree.
+
         If a matching folder exists: Returns 200
         If a matching folder does not exist: Returns 404
         If no pk was specified and no folders exist: Returns 200
+        If depth is not a non-negative integer or "all": Returns 400
         """
+        if "depth" in request.query_params:
+            return self._get_subtree(request, pk)
+
         if pk:
             folders = self._get_objects().filter(Q(pk=pk) | Q(parent_folder=pk))
         else:
             folders = self._get_objects().filter(parent_folder=None)
+        folders = folders.values(*value_fields(self.serializer_class))
 
-        if not folders.exists() and pk is not None:
+        # Evaluating the queryset here caches the folders for serialization, saving a query
+        # compared to exists().
+        if pk is not None and not folders:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
-        serializer = self.serializer_class(folders, many=True)
-        return Response(serializer.data)
+        return Response(serialize_rows(folders, self.serializer_class))
+
+    def _get_subtree(self, request, pk):
+        """Returns a folder with its descendants nested under `children`.
+
+        If no pk is supplied, returns the list of top folders, each with their descendants.
+
+        The whole subtree is fetched with a single query, see nest_folders.
+        """
+        try:
+            max_depth = parse_depth(request.query_params["depth"])
+        except ValueError as error:
+            return Response({"depth": [str(error)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        folders = Folder.subtree_values(pk=pk, max_depth=max_depth)
+        roots = nest_folders(serialize_rows(folders, self.serializer_class))
+
+        if pk is None:
+            return Response(roots)
+
+        if not roots:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        return Response(roots[0])
+
+    def delete(self, request, pk):
+        """Delete a folder along with all folders and documents below it.
+
+        This is a soft delete, see restore_folder for undoing it.
+
+        If delete was successful: Returns 204
+        If the subtree is too big to delete right away: Returns 202 and the job deleting it
+        If folder does not exist or was already deleted: Returns 404
+        """
+        try:
+            folder = self._get_objects().get(pk=pk)
+        except Folder.DoesNotExist:
+            raise Http404
+
+        if folder.subtree_size() > settings.DOCMNGR_JOB_THRESHOLD:
+            return _accepted(
+                jobs.enqueue(
+                    "set_subtree_deleted", folder_id=folder.id, is_deleted=True
+                )
+            )
+
+        folder.set_subtree_deleted(True)
+        cache.invalidate(cache.GLOBAL)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def parse_depth(depth):
+    """Parses the `?depth=` of a subtree request into the max_depth of Folder.subtree."""
+    if depth == "all":
+        return None
+    if depth.isdigit():
+        return int(depth)
+    raise ValueError('must be a non-negative integer or "all"')
+
+
+def nest_folders(folders):
+    """Nests serialized subtree folders under the `children` of their parents.
+
+    Returns the top folders of the subtree. Done in one pass, parents always come before their
+    children in the results of Folder.subtree.
+    """
+    by_id = {}
+    roots = []
+    for folder in folders:
+        folder["children"] = []
+        by_id[folder["id"]] = folder
+        parent = by_id.get(folder["parent_folder"])
+        if parent is not None:
+            parent["children"].append(folder)
+        else:
+            roots.append(folder)
+
+    return roots
 
 
 class DocumentsView(BaseView):
@@ -137,10 +322,34 @@ class DocumentsView(BaseView):
         """
         return Document.without_deleted()
 
+    def _get_cache_generations(self, document):
+        # The folder's documents_count changes when a document is created or moved.
+        return [
+            f"document:{document.id}",
+            f"folder-documents:{document.folder_id}",
+            *folder_generations(document.folder),
+        ] + [
+            f"topic-documents:{pk}"
+            for pk in document.topics.values_list("id", flat=True)
+        ]
+
+    def _get_channels(self, document):
+        return push.document_channels(document)
+
+    @method_decorator(cached(lambda request, pk: [f"document:{pk}", "topics"]))
+    @method_decorator(
+        conditional(
+            lambda request, pk: [
+                Document.without_deleted().filter(pk=pk),
+                Topic.objects.filter(documents=pk),
+            ]
+        )
+    )
     def get(self, request, pk):
         """Gets a single document."""
         try:
-            document = self._get_objects().get(pk=pk)
+            # Fetch the content along with the document, see Document.content
+            document = self._get_objects().select_related("stored_content").get(pk=pk)
         except Document.DoesNotExist:
             raise Http404
 
@@ -149,10 +358,151 @@ class DocumentsView(BaseView):
         return Response(serializer.data)
 
 
+@route_class("bulk")
+@api_view(["POST"])
+@parser_classes([JSONParser, NDJSONParser])
+def create_documents_in_bulk(request):
+    """Create many documents at once, optionally adding them to topics.
+
+    Takes a JSON array of documents, or NDJSON (one document per line) when sent with a
+    `Content-Type: application/x-ndjson` header. Each document looks like:
+
+        {"title": "...", "content": "...", "folder": <pk>, "topics": [<pk>, ...]}
+
+    All documents are validated before anything is written. The valid ones are then inserted in
+    batches of `?batch_size=` (DOCMNGR_BULK_BATCH_SIZE by default), along with their topics.
+
+    Returns the ids of the created documents, in the order they were sent, and the errors of the
+    invalid ones by their position in the request:
+
+        {"created": [12, 13], "errors": [{"index": 2, "errors": {"title": ["..."]}}]}
+
+    If any document was created (or none were sent): Returns 201
+    If all documents were invalid, or the request is malformed: Returns 400
+    """
+    items = request.data
+    if not isinstance(items, list):
+        return Response(
+            {"non_field_errors": ["expected a list of documents"]},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(items) > settings.DOCMNGR_BULK_MAX_DOCUMENTS:
+        return Response(
+            {
+                "non_field_errors": [
+                    f"at most {settings.DOCMNGR_BULK_MAX_DOCUMENTS} documents per request"
+                ]
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        batch_size = max(
+            1,
+            int(
+                request.query_params.get("batch_size", settings.DOCMNGR_BULK_BATCH_SIZE)
+            ),
+        )
+    except ValueError:
+        return Response(
+            {"batch_size": ["must be an integer"]}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    valid = []
+    errors = []
+    for index, item in enumerate(items):
+        serializer = BulkDocumentSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors.append({"index": index, "errors": serializer.errors})
+
+    # Check the referenced folders and topics exist with one query each.
+    folder_ids = set(
+        Folder.without_deleted()
+        .filter(pk__in={data["folder"] for _, data in valid})
+        .values_list("id", flat=True)
+    )
+    topic_ids = set(
+        Topic.objects.filter(
+            pk__in={pk for _, data in valid for pk in data["topics"]}
+        ).values_list("id", flat=True)
+    )
+
+    documents = []
+    document_topics = []
+    for index, data in valid:
+        item_errors = {}
+        if data["folder"] not in folder_ids:
+            item_errors["folder"] = [
+                f'Invalid pk "{data["folder"]}" - object does not exist.'
+            ]
+        missing_topics = [pk for pk in data["topics"] if pk not in topic_ids]
+        if missing_topics:
+            item_errors["topics"] = [
+                f'Invalid pk "{pk}" - object does not exist.' for pk in missing_topics
+            ]
+
+        if item_errors:
+            errors.append({"index": index, "errors": item_errors})
+            continue
+
+        documents.append(
+            Document(
+                title=data["title"], content=data["content"], folder_id=data["folder"]
+            )
+        )
+        document_topics.append(set(data["topics"]))
+
+    Membership = Topic.documents.through
+    with transaction.atomic():
+        Document.objects.bulk_create(documents, batch_size=batch_size)
+        Membership.objects.bulk_create(
+            (
+                Membership(document_id=document.id, topic_id=topic_id)
+                for document, topic_ids in zip(documents, document_topics)
+                for topic_id in topic_ids
+            ),
+            batch_size=batch_size,
+        )
+        Document.update_counts(
+            topics=Counter(pk for pks in document_topics for pk in pks)
+        )
+        created = defaultdict(list)
+        for document in documents:
+            created[document.folder_id].append(document.id)
+        for folder_id, pks in created.items():
+            Change.record("document", pks, "created", [f"folder:{folder_id}"])
+        folder_ids = {document.folder_id for document in documents}
+        cache.invalidate(
+            *{f"folder-documents:{pk}" for pk in folder_ids},
+            *{f"topic-documents:{pk}" for pks in document_topics for pk in pks},
+            *{
+                name
+                for folder in Folder.objects.filter(pk__in=folder_ids)
+                for name in folder_generations(folder)
+            },
+        )
+
+    errors.sort(key=lambda error: error["index"])
+
+    return Response(
+        {"created": [document.id for document in documents], "errors": errors},
+        status=(
+            status.HTTP_201_CREATED
+            if documents or not errors
+            else status.HTTP_400_BAD_REQUEST
+        ),
+    )
+
+
 class TopicsView(BaseView):
     model_class = Topic
     serializer_class = TopicSerializer
 
+    def _get_cache_generations(self, topic):
+        return ["topics"]
+
     def _get_topic(self, request, pk):
         """Gets a single topic."""
         try:
@@ -165,16 +515,27 @@ class TopicsView(BaseView):
         return Response(serializer.data)
 
     def _get_all_topics(self, request):
-        """Gets all topics."""
-        try:
-            topics = self._get_objects().all()
-        except self.model_class.DoesNotExist:
-            raise Http404
-
-        serializer = self.serializer_class(topics, many=True)
-
-        return Response(serializer.data)
-
+        """Gets all topics, a page at a time. See KeysetPagination."""
+        paginator = KeysetPagination()
+        # created_at is needed for the cursor.
+        topics = paginator.paginate_queryset(
+            self._get_objects().values(
+                "created_at", *value_fields(self.serializer_class)
+            ),
+            request,
+        )
+
+        return paginator.get_paginated_response(
+            serialize_rows(topics, self.serializer_class)
+        )
+
+    @method_decorator(
+        conditional(
+            lambda request, pk=None: [
+                Topic.objects.filter(pk=pk) if pk is not None else Topic.objects.all()
+            ]
+        )
+    )
     def get(self, request, pk=None):
         if pk is not None:
             return self._get_topic(request, pk)
@@ -190,37 +551,414 @@ def modify_document_topics(request, document_pk, topic_pk):
     except Document.DoesNotExist:
         raise Http404
 
-    if request.method == "POST":
-        document.topics.add(topic_pk)
-    else:
-        document.topics.remove(topic_pk)
+    with transaction.atomic():
+        # Listings of the document's other topics show its topics too.
+        topic_pks = {*document.topics.values_list("id", flat=True), topic_pk}
+        if request.method == "POST":
+            document.topics.add(topic_pk)
+            action = "tagged"
+        else:
+            document.topics.remove(topic_pk)
+            action = "untagged"
+        Change.record(
+            "document",
+            [document.id],
+            action,
+            [f"topic:{topic_pk}", *push.document_channels(document)],
+        )
+
+        # Topics are part of the document as far as clients are concerned.
+        document.save(update_fields=["updated_at"])
+
+        cache.invalidate(
+            f"document:{document.id}",
+            f"folder-documents:{document.folder_id}",
+            *(f"topic-documents:{pk}" for pk in topic_pks),
+        )
+
+    serializer = DocumentSerializer(document)
+    return Response(serializer.data)
+
+
+@api_view(["GET"])
+def get_document_revisions(request, document_pk):
+    """List a document's revisions, oldest first, leaving out their content.
+
+    Paginated, see KeysetPagination.
+    """
+    if not Document.without_deleted().filter(pk=document_pk).exists():
+        raise Http404
+
+    paginator = KeysetPagination()
+    revisions = paginator.paginate_queryset(
+        DocumentRevision.objects.filter(document=document_pk).defer("data"), request
+    )
+    serializer = DocumentRevisionSummarySerializer(revisions, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
-    document.save()
+
+def _get_document_revision(document_pk, number):
+    if not Document.without_deleted().filter(pk=document_pk).exists():
+        raise Http404
+
+    try:
+        return DocumentRevision.load(document_pk, number)
+    except DocumentRevision.DoesNotExist:
+        raise Http404
+
+
+@api_view(["GET"])
+def get_document_revision(request, document_pk, number):
+    """Gets a single revision of a document, content included."""
+    revision = _get_document_revision(document_pk, number)
+
+    serializer = DocumentRevisionSerializer(revision)
+    return Response(serializer.data)
+
+
+@api_view(["POST"])
+def restore_document_revision(request, document_pk, number):
+    """Set a document's title and content back to those of one of its revisions.
+
+    This adds a new revision, later revisions are kept.
+
+    If restore was successful: Returns 200 and restored document
+    If document or revision does not exist: Returns 404
+    """
+    revision = _get_document_revision(document_pk, number)
+    document = Document.objects.get(pk=document_pk)
+
+    document.title = revision.title
+    document.content = revision.content
+    with transaction.atomic():
+        document.save()
+        Change.record(
+            "document", [document.id], "updated", push.document_channels(document)
+        )
+
+    cache.invalidate(
+        f"document:{document.id}",
+        f"folder-documents:{document.folder_id}",
+        *(
+            f"topic-documents:{pk}"
+            for pk in document.topics.values_list("id", flat=True)
+        ),
+    )
 
     serializer = DocumentSerializer(document)
     return Response(serializer.data)
 
 
+@api_view(["POST"])
+def restore_folder(request, pk):
+    """Restore a deleted folder along with all folders and documents below it.
+
+    If restore was successful: Returns 200 and restored folder
+    If the subtree is too big to restore right away: Returns 202 and the job restoring it
+    If folder does not exist or isn't deleted: Returns 404
+    If one of the folders above it is still deleted: Returns 409
+    """
+    try:
+        folder = Folder.objects.get(pk=pk, is_deleted=True)
+    except Folder.DoesNotExist:
+        raise Http404
+
+    if Folder.objects.filter(pk__in=folder.ancestor_ids, is_deleted=True).exists():
+        return Response(
+            {"parent_folder": ["restore the deleted folders above this one first"]},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    if folder.subtree_size() > settings.DOCMNGR_JOB_THRESHOLD:
+        return _accepted(
+            jobs.enqueue("set_subtree_deleted", folder_id=folder.id, is_deleted=False)
+        )
+
+    folder.set_subtree_deleted(False)
+    cache.invalidate(cache.GLOBAL)
+
+    serializer = FolderSerializer(folder)
+    return Response(serializer.data)
+
+
+@route_class("bulk")
+@api_view(["POST", "DELETE"])
+def modify_topics_in_bulk(request):
+    """Add or remove many documents to/from many topics at once.
+
+    Takes the documents and topics to (un)pair, every document is added to (or removed from)
+    every topic:
+
+        {"documents": [<pk>, ...], "topics": [<pk>, ...]}
+
+    Unknown ids, deleted documents and pairs that already (or no longer) exist are skipped.
+
+    Returns 200 and the number of pairs that changed e.g. `{"added": 120}` or `{"removed": 5}`
+    If there are too many pairs to change right away: Returns 202 and the job changing them,
+    whose result is the number of pairs
+    If the request is invalid: Returns 400 and list of errors
+    """
+    serializer = BulkTopicsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    document_ids = serializer.validated_data["documents"]
+    topic_ids = serializer.validated_data["topics"]
+
+    if len(document_ids) * len(topic_ids) > settings.DOCMNGR_BULK_MAX_TOPIC_PAIRS:
+        return Response(
+            {
+                "non_field_errors": [
+                    f"at most {settings.DOCMNGR_BULK_MAX_TOPIC_PAIRS} document/topic pairs per request"
+                ]
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    arguments = {
+        "topic_ids": topic_ids,
+        "document_ids": document_ids,
+        "add": request.method == "POST",
+    }
+    if len(document_ids) * len(topic_ids) > settings.DOCMNGR_JOB_THRESHOLD:
+        return _accepted(jobs.enqueue("modify_topics_in_bulk", **arguments))
+
+    return Response(jobs.modify_topics_in_bulk(**arguments))
+
+
 @api_view(["GET"])
+@renderer_classes([*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer])
+@cached(lambda request, topic_pk: [f"topic-documents:{topic_pk}", "topics"])
+@conditional(
+    lambda request, topic_pk: [
+        Document.objects.filter(topics=topic_pk, is_deleted=False),
+        # Includes the topic itself and the other topics of the documents.
+        Topic.objects.all(),
+    ]
+)
 def get_documents_for_topic(request, topic_pk):
-    """Get all documents for topic."""
-    topic = Topic.objects.prefetch_related("documents").get(pk=topic_pk)
-    documents = topic.documents
-    serializer = DocumentSerializer(documents, many=True)
-    return Response(serializer.data)
+    """Get summaries of all documents for topic, a page at a time. See _list_documents."""
+    try:
+        topic = Topic.objects.get(pk=topic_pk)
+    except Topic.DoesNotExist:
+        raise Http404
+
+    return _list_documents(request, topic.documents.filter(is_deleted=False))
 
 
 @api_view(["GET"])
+@renderer_classes([*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer])
+@cached(lambda request, folder_pk: [f"folder-documents:{folder_pk}", "topics"])
+@conditional(
+    lambda request, folder_pk: [
+        Folder.without_deleted().filter(pk=folder_pk),
+        Document.objects.filter(folder=folder_pk, is_deleted=False),
+        Topic.objects.all(),
+    ]
+)
 def get_documents_for_folder(request, folder_pk):
-    """Get all documents for topic."""
+    """Get summaries of all documents for folder, a page at a time. See _list_documents.
+
+    Pass `?topic=<pk>` to only get the folder's documents for that topic.
+    """
     topic_id = request.query_params.get("topic")
 
-    folder = Folder.objects.prefetch_related("documents").get(pk=folder_pk)
+    try:
+        folder = Folder.without_deleted().get(pk=folder_pk)
+    except Folder.DoesNotExist:
+        raise Http404
 
-    documents = folder.documents
+    documents = folder.documents.filter(is_deleted=False)
     if topic_id is not None:
         # Not sure what exact database interactions this triggers, but I suspect it is unhealthy.
         documents = documents.filter(topics__id=topic_id)
 
-    serializer = DocumentSerializer(documents, many=True)
-    return Response(serializer.data)
+    return _list_documents(request, documents)
+
+
+def _list_documents(request, documents):
+    """Returns a page of document summaries (see DocumentSummarySerializer).
+
+    Pass `?full=1` to get the full documents, content included, instead.
+    Paging is done with the `limit` and `cursor` params, see KeysetPagination.
+
+    Pass `?stream=1`, or send `Accept: application/x-ndjson`, to get all the documents in one
+    streamed response instead of paging, see _stream_documents.
+
+    Documents are serialized straight from their rows, with the topics of the whole page fetched
+    in one go. See docmngr.fast_serializers.
+    """
+    if request.query_params.get("full") in ("1", "true"):
+        serializer_class = DocumentSerializer
+    else:
+        serializer_class = DocumentSummarySerializer
+
+    if request.query_params.get("stream") in ("1", "true") or isinstance(
+        request.accepted_renderer, NDJSONRenderer
+    ):
+        return _stream_documents(request, documents, serializer_class)
+
+    paginator = KeysetPagination()
+    rows = paginator.paginate_queryset(
+        document_values(documents, serializer_class), request
+    )
+    return paginator.get_paginated_response(
+        serialize_document_rows(rows, serializer_class)
+    )
+
+
+def _stream_documents(request, documents, serializer_class):
+    """Streams all the documents, as NDJSON if that's the accepted media type or else a JSON array.
+
+    Rationale: Building the whole response of a listing with 100k documents takes a lot of memory
+    and the client waits for all of it. This reads the documents from a server-side cursor and
+    serializes and sends them DOCMNGR_STREAM_CHUNK_SIZE at a time, so memory stays constant and
+    the first bytes go out right away.
+
+    Documents are in the same order as when paging.
+    """
+    chunk_size = settings.DOCMNGR_STREAM_CHUNK_SIZE
+    rows = (
+        document_values(documents, serializer_class)
+        .order_by("created_at", "id")
+        .iterator(chunk_size=chunk_size)
+    )
+
+    renderer = request.accepted_renderer
+    ndjson = isinstance(renderer, NDJSONRenderer)
+    if not isinstance(renderer, JSONRenderer):
+        # e.g. the browsable API
+        renderer = JSONRenderer()
+
+    def render_chunks():
+        if not ndjson:
+            yield b"["
+        separator = b""
+        while chunk := list(islice(rows, chunk_size)):
+            items = serialize_document_rows(chunk, serializer_class)
+            if ndjson:
+                yield b"".join(renderer.render_line(item) for item in items)
+            else:
+                yield separator + b",".join(renderer.render(item) for item in items)
+                separator = b","
+        if not ndjson:
+            yield b"]"
+
+    return StreamingHttpResponse(
+        render_chunks(),
+        content_type=NDJSONRenderer.media_type if ndjson else JSONRenderer.media_type,
+    )
+
+
+class DocumentSearchParamsSerializer(serializers.Serializer):
+    q = serializers.CharField()
+    folder = serializers.IntegerField(required=False)
+    topic = serializers.IntegerField(required=False)
+    limit = serializers.IntegerField(
+        required=False, default=20, min_value=1, max_value=100
+    )
+
+
+@api_view(["GET"])
+def search_documents(request):
+    """Full text search over document titles and contents.
+
+    Query params:
+        q: The search terms, web search syntax is supported e.g. `"exact phrase" -excluded or other`
+        folder: Only search documents in this folder or the folders below it
+        topic: Only search documents in this topic
+        limit: Max number of results, defaults to 20
+
+    Returns 200 and the best matching documents first, each with a highlighted `snippet` of its
+    content. Matches in titles rank above matches in contents.
+    If the params are invalid: Returns 400 and list of errors
+    """
+    params = DocumentSearchParamsSerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    params = params.validated_data
+
+    query = SearchQuery(
+        params["q"], config=Document.SEARCH_CONFIG, search_type="websearch"
+    )
+
+    # Filtering on the search vector itself lets Postgres use the GIN index.
+    documents = Document.without_deleted().filter(search_vector=query)
+
+    if "folder" in params:
+        try:
+            folder = Folder.without_deleted().get(pk=params["folder"])
+        except Folder.DoesNotExist:
+            raise Http404
+        documents = documents.filter(folder__path__startswith=folder.path)
+
+    if "topic" in params:
+        documents = documents.filter(topics__id=params["topic"])
+
+    results = list(
+        documents.annotate(rank=SearchRank(F("search_vector"), query))
+        .order_by("-rank", "id")
+        .values(
+            "id",
+            "title",
+            "folder",
+            "rank",
+            content_data=F("stored_content__data"),
+        )[: params["limit"]]
+    )
+
+    # The database can't read the compressed contents, so highlight them in a second query.
+    contents = []
+    for result in results:
+        data = result.pop("content_data")
+        contents.append(DocumentContent.decompress(data) if data is not None else "")
+    for result, snippet in zip(
+        results, Document.highlight(contents, params["q"]) if results else []
+    ):
+        result["snippet"] = snippet
+
+    return Response(results)
+
+
+@api_view(["GET"])
+def get_changes(request):
+    """Get the changes to folders, documents and topics, a page at a time, oldest first.
+
+    Pass the `since` cursor of the previous response's next link to only get later changes. The
+    next link is always given, see ChangeFeedPagination. Changes only say what changed, fetch
+    the objects for their new state.
+
+    If the cursor is invalid: Returns 404
+    """
+    paginator = ChangeFeedPagination()
+    changes = paginator.paginate_queryset(Change.visible(), request)
+    return paginator.get_paginated_response(ChangeSerializer(changes, many=True).data)
+
+
+@api_view(["GET"])
+def get_job(request, pk):
+    """Get the status of a background job, see docmngr.jobs.
+
+    The status is one of queued, running, succeeded and failed. Once succeeded the job has the
+    result of the operation, e.g. the number of pairs bulk tagging changed.
+
+    If job does not exist: Returns 404
+    """
+    try:
+        job = Job.objects.get(pk=pk)
+    except Job.DoesNotExist:
+        raise Http404
+
+    return Response(JobSerializer(job).data)
+
+
+def _accepted(job):
+    """Response to a request whose operation was queued as a job."""
+    return Response(
+        JobSerializer(job).data,
+        status=status.HTTP_202_ACCEPTED,
+        headers={"Location": f"/jobs/{job.id}/"},
+    )
+
+
+@api_view(["GET"])
+def get_cache_stats(request):
+    """Returns the number of response cache hits and misses, see docmngr.cache."""
+    return Response(cache.get_stats())